@@ -0,0 +1,141 @@
+# benchmarks/bench_menu.py
+#
+# Builds MenuBarApp on the fake rumps backend with generated configs of 10, 1k and
+# 10k items and reports the build time, the latency of opening a submenu, renaming
+# and deleting an item, and the menu objects and memory allocated. Runs headless,
+# so it works on Linux and in CI. Each size runs in its own process with its own
+# home folder.
+#
+#   python benchmarks/bench_menu.py [--sizes 10 1000 10000] [--samples 20]
+
+import argparse
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "menuscript"))
+
+
+def timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def generate_config(path: pathlib.Path, size: int, source: str) -> None:
+    from controller.parser import format_line
+
+    with open(path, "w") as f:
+        f.write("# generated config\n")
+        f.write("(setting)[precompile](value)[off]\n")
+        for i in range(size):
+            f.write(format_line(f"script-{i}", source, sys.executable))
+
+
+def bench(size: int, samples: int) -> None:
+    import logging
+    import fake_rumps
+
+    recorder = fake_rumps.install()
+    logging.getLogger("log").disabled = True
+
+    from resources import paths
+
+    paths.init()
+
+    import controller.controller as controller
+    import menu.classes as classes
+    from menu.menu import MenuBarApp
+
+    class Answer:
+        # stands in for the rename popup, which needs AppKit
+        text = ""
+
+        def __init__(self, *args) -> None:
+            pass
+
+        def run(self):
+            return self
+
+        clicked = 1
+
+    classes.EditName = Answer
+
+    controller.create_user_data()
+    source = paths.user_data_path / "script.py"
+    source.write_text("print('hello')\n")
+    generate_config(paths.user_data_path / ".config.txt", size, str(source))
+    items = controller.load_items()
+
+    recorder.reset()
+    tracemalloc.start()
+    t_build, app = timed(lambda: MenuBarApp(name="MenuScript", icon="", items=items))
+    build_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    build_ops = sum(recorder.ops.values())
+    build_allocs = dict(recorder.allocs)
+    nodes = sum(node.count() for node in app.view.root)
+
+    # spread the samples over the menu, so positions are not all at one end
+    step = max(1, len(app.items) // (samples + 1))
+    targets = list(app.items)[step::step][:samples]
+
+    def latency(action, target) -> tuple:
+        recorder.reset()
+        elapsed, _ = timed(lambda: action(target))
+        return elapsed, sum(recorder.ops.values())
+
+    opens = [latency(lambda item: app.menu[repr(("item", item.id))]._menu.open(), item) for item in targets]
+
+    def rename(item) -> None:
+        Answer.text = f"{item.name}-renamed"
+        app.edit_name(item, None)
+
+    edits = [latency(rename, app.items.by_id(item.id)) for item in targets]
+    deletes = [latency(lambda item: app.delete(item, None), app.items.by_id(item.id)) for item in targets]
+
+    app.before_quit()
+
+    def ms(samples: list) -> str:
+        times = sorted(elapsed * 1000 for elapsed, _ in samples)
+        return f"{statistics.median(times):10.3f} ms median {times[-1]:10.3f} ms max"
+
+    def ops(samples: list) -> str:
+        return f"{statistics.median(count for _, count in samples):6.0f} ops"
+
+    print(f"{size} items")
+    print(f"    build                 {t_build * 1000:10.2f} ms {build_ops:8} ops {build_bytes / 1024:10.0f} KiB")
+    print(f"    objects               {nodes:8} nodes " + " ".join(f"{n} {k}" for k, n in sorted(build_allocs.items())))
+    print(f"    open submenu          {ms(opens)} {ops(opens)}")
+    print(f"    rename item           {ms(edits)} {ops(edits)}")
+    print(f"    delete item           {ms(deletes)} {ops(deletes)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)  # a single size, in this process
+    args = parser.parse_args()
+
+    if args.one is not None:
+        bench(args.one, min(args.samples, max(1, args.one // 2)))
+        return
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as home:
+            subprocess.run(
+                [sys.executable, __file__, "--one", str(size), "--samples", str(args.samples)],
+                env={**os.environ, "HOME": home},
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_parser.py
+#
+# Times config parsing on generated configs of 1k, 100k and 1M lines.
+#
+#   python benchmarks/bench_parser.py [--sizes 1000 100000 1000000]
+
+import argparse
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "menuscript"))
+
+from controller.parser import format_line, iter_items  # noqa: E402
+from controller.store import ConfigStore  # noqa: E402
+
+logging.getLogger("log").disabled = True
+
+
+def generate_config(path: pathlib.Path, size: int) -> None:
+    """
+    Writes a config with `size` lines: a comment header, script items and the odd
+    malformed line, as tooling-generated configs tend to have.
+    """
+    with open(path, "w") as f:
+        f.write("# generated config\n#\n")
+        for i in range(size - 2):
+            if i % 1000 == 999:
+                f.write(f"(name)[broken-{i}](source)/tmp/scripts/{i}.py\n")
+            else:
+                f.write(format_line(f"script-{i}", f"/tmp/scripts/{i}/main.py", "/usr/bin/python3"))
+
+
+def legacy_config_to_items(lines) -> list:
+    """
+    The previous index/slice parser, kept as a baseline. Malformed lines raise
+    `ValueError` there, so they are skipped here to keep the comparison fair.
+    """
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith("("):
+            continue
+        try:
+            start = line.index("[")
+            end = line.index("]", start + 1)
+            name = line[start + 1 : end]
+            line = line[end:]
+            start = line.index("[")
+            end = line.index("]", start + 1)
+            source = line[start + 1 : end]
+            line = line[end:]
+            start = line.index("[")
+            end = line.index("]", start + 1)
+            interpreter = line[start + 1 : end]
+        except ValueError:
+            continue
+        items.append((name, source, interpreter))
+    return items
+
+
+def timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench(size: int, directory: pathlib.Path) -> None:
+    path = directory / f"config-{size}.txt"
+    generate_config(path, size)
+
+    def legacy():
+        with open(path) as f:
+            return len(legacy_config_to_items(f.readlines()))
+
+    def streaming():
+        errors = []
+        with open(path) as f:
+            count = sum(1 for _ in iter_items(f, errors))
+        return count, len(errors)
+
+    def store():
+        return len(ConfigStore(path).load(errors=[]))
+
+    t_legacy, n_legacy = timed(legacy)
+    t_stream, (n_stream, n_errors) = timed(streaming)
+    t_store, n_store = timed(store)
+
+    print(f"{size:>9} lines")
+    print(f"    legacy index parser   {t_legacy * 1000:10.1f} ms  {n_legacy} items")
+    print(f"    streaming tokenizer   {t_stream * 1000:10.1f} ms  {n_stream} items, {n_errors} errors")
+    print(f"    ConfigStore.load      {t_store * 1000:10.1f} ms  {n_store} items")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            bench(size, pathlib.Path(directory))
+
+
+if __name__ == "__main__":
+    main()
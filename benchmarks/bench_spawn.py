@@ -0,0 +1,83 @@
+# benchmarks/bench_spawn.py
+#
+# Times spawning a trivial script with a virtualenv interpreter, activated by
+# sourcing bin/activate in a shell versus exec'd directly with the environment
+# from controller.envresolve.
+#
+#   python benchmarks/bench_spawn.py [--runs 50]
+
+import argparse
+import logging
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "menuscript"))
+
+from controller import envresolve  # noqa: E402
+
+logging.getLogger("log").disabled = True
+
+
+def timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench(runs: int, directory: pathlib.Path) -> None:
+    venv = directory / "venv"
+    subprocess.run([sys.executable, "-m", "venv", "--without-pip", str(venv)], check=True)
+    interpreter = venv / "bin" / "python"
+    script = directory / "script.py"
+    script.write_text("import os\nassert os.environ['VIRTUAL_ENV']\n")
+
+    def shell():
+        for _ in range(runs):
+            subprocess.run(
+                ["/bin/bash", "-c", f"source {venv}/bin/activate && python {script}"],
+                check=True,
+            )
+
+    def direct():
+        for _ in range(runs):
+            subprocess.run(
+                [str(interpreter), str(script)],
+                env=envresolve.environment(interpreter),
+                check=True,
+            )
+
+    def uncached():
+        for _ in range(runs):
+            envresolve.invalidate()
+            envresolve.resolve(interpreter)
+
+    def cached():
+        for _ in range(runs):
+            envresolve.resolve(interpreter)
+
+    t_shell, _ = timed(shell)
+    t_direct, _ = timed(direct)
+    t_uncached, _ = timed(uncached)
+    t_cached, _ = timed(cached)
+
+    print(f"{runs} runs of a venv interpreter")
+    print(f"    source bin/activate   {t_shell / runs * 1000:10.2f} ms per run")
+    print(f"    direct exec           {t_direct / runs * 1000:10.2f} ms per run")
+    print(f"    resolve, uncached     {t_uncached / runs * 1e6:10.1f} us per call")
+    print(f"    resolve, cached       {t_cached / runs * 1e6:10.1f} us per call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        bench(args.runs, pathlib.Path(directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# benchmarks/fake_rumps.py
+#
+# Headless stand-in for rumps and the PyObjC modules the app imports, so the menu
+# can be built and measured on any platform. Menus keep rumps' semantics (keys are
+# titles at insertion, O(1) insert_after/insert_before, auto-named separators,
+# submenus created with the first child) and every operation and allocation is
+# counted in `recorder`.
+#
+#   import fake_rumps
+#   recorder = fake_rumps.install()  # before anything imports rumps
+#   from menu.menu import MenuBarApp
+
+import collections
+import sys
+import types
+
+separator = object()
+
+
+class Recorder:
+    """
+    Counts the menu operations applied and the menu objects created.
+    """
+
+    def __init__(self) -> None:
+        self.ops = collections.Counter()
+        self.allocs = collections.Counter()
+        self.notifications = []
+
+    def reset(self) -> None:
+        self.ops.clear()
+        self.allocs.clear()
+        self.notifications.clear()
+
+
+recorder = Recorder()
+
+
+class _Stub:
+    """
+    Any PyObjC class or function the app imports but the benchmarks never reach.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def __getattr__(self, name):
+        return _Stub()
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Stub
+
+
+class NSObject:
+    @classmethod
+    def alloc(cls):
+        return cls()
+
+    def init(self):
+        return self
+
+
+class NSMenu:
+    """
+    The native menu behind a rumps menu; only keeps its delegate, so benchmarks can
+    `open` a submenu the way AppKit would.
+    """
+
+    def __init__(self) -> None:
+        recorder.allocs["NSMenu"] += 1
+        self.delegate = None
+
+    def setDelegate_(self, delegate) -> None:
+        recorder.ops["set_delegate"] += 1
+        self.delegate = delegate
+
+    def open(self) -> None:
+        if self.delegate is not None:
+            self.delegate.menuNeedsUpdate_(self)
+
+
+class Menu:
+    """
+    rumps.Menu: an ordered mapping with O(1) insertion next to an existing key.
+    """
+
+    _choose_key = object()
+
+    def __init__(self) -> None:
+        self._values = {}
+        self._next = {}  # key -> following key, None for the last one
+        self._prev = {}  # key -> preceding key, None for the first one
+        self._first = self._last = None
+        self._counts = {}
+        if not hasattr(self, "_menu"):
+            self._menu = NSMenu()
+
+    def __iter__(self):
+        key = self._first
+        while key is not None:
+            yield key
+            key = self._next[key]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key) -> bool:
+        return key in self._values
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __setitem__(self, key, value) -> None:
+        if key not in self:
+            key, value = self._process_new_menuitem(key, value)
+            self._link(key, self._last, None)
+            self._values[key] = value
+            recorder.ops["add"] += 1
+
+    def __delitem__(self, key) -> None:
+        del self._values[key]
+        prev, next = self._prev.pop(key), self._next.pop(key)
+        if prev is None:
+            self._first = next
+        else:
+            self._next[prev] = next
+        if next is None:
+            self._last = prev
+        else:
+            self._prev[next] = prev
+        recorder.ops["remove"] += 1
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self._values[key] for key in self]
+
+    def items(self):
+        return [(key, self._values[key]) for key in self]
+
+    def pop(self, key, *default):
+        if key not in self and default:
+            return default[0]
+        value = self._values[key]
+        del self[key]
+        return value
+
+    def clear(self) -> None:
+        Menu.__init__(self)
+        recorder.ops["clear"] += 1
+
+    def add(self, menuitem) -> None:
+        self[self._choose_key] = menuitem
+
+    def insert_after(self, existing_key, menuitem) -> None:
+        key, menuitem = self._process_new_menuitem(self._choose_key, menuitem)
+        self._link(key, existing_key, self._next[existing_key])
+        self._values[key] = menuitem
+        recorder.ops["insert"] += 1
+
+    def insert_before(self, existing_key, menuitem) -> None:
+        key, menuitem = self._process_new_menuitem(self._choose_key, menuitem)
+        self._link(key, self._prev[existing_key], existing_key)
+        self._values[key] = menuitem
+        recorder.ops["insert"] += 1
+
+    def update(self, iterable) -> None:
+        for ele in iterable:
+            if isinstance(ele, (list, tuple)) and len(ele) == 2 and isinstance(ele[1], (list, tuple)):
+                menuitem = MenuItem(ele[0])
+                self.add(menuitem)
+                menuitem.update(ele[1])
+            else:
+                self.add(ele)
+
+    def _link(self, key, prev, next) -> None:
+        self._prev[key], self._next[key] = prev, next
+        if prev is None:
+            self._first = key
+        else:
+            self._next[prev] = key
+        if next is None:
+            self._last = key
+        else:
+            self._prev[next] = key
+
+    def _process_new_menuitem(self, key, value):
+        if value is None or value is separator:
+            value = SeparatorMenuItem()
+        elif not isinstance(value, (MenuItem, SeparatorMenuItem)):
+            value = MenuItem(value)
+        if key is self._choose_key:
+            if isinstance(value, SeparatorMenuItem):
+                count = self._counts[SeparatorMenuItem] = self._counts.get(SeparatorMenuItem, 0) + 1
+                key = f"SeparatorMenuItem_{count}"
+            else:
+                key = value.title
+        return key, value
+
+
+class MenuItem(Menu):
+    """
+    rumps.MenuItem. Like the real one it is a menu that gets its NSMenu with its
+    first child.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if args and isinstance(args[0], MenuItem):
+            return args[0]
+        return super().__new__(cls)
+
+    def __init__(self, title, callback=None, key=None, icon=None, dimensions=None, template=None) -> None:
+        if isinstance(title, MenuItem):
+            return
+        recorder.allocs["MenuItem"] += 1
+        self._title = str(title)
+        self._menu = None
+        self._key = ""
+        self.callback = None
+        self.set_callback(callback, key)
+        super().__init__()
+
+    def __setitem__(self, key, value) -> None:
+        if self._menu is None:
+            self._menu = NSMenu()
+        super().__setitem__(key, value)
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __repr__(self) -> str:
+        return f"<MenuItem: {self._title!r}>"
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    @title.setter
+    def title(self, title) -> None:
+        recorder.ops["retitle"] += 1
+        self._title = str(title)
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    def set_callback(self, callback, key=None) -> None:
+        recorder.ops["set_callback"] += 1
+        if key is not None:
+            self._key = key
+        self.callback = callback
+
+
+class SeparatorMenuItem:
+    def __init__(self) -> None:
+        recorder.allocs["SeparatorMenuItem"] += 1
+
+
+class App:
+    def __init__(self, name, title=None, icon=None, template=None, menu=None, quit_button="Quit") -> None:
+        self._name = name
+        self._menu = Menu()
+        self.title = title
+        self.icon = icon
+
+    @property
+    def menu(self) -> Menu:
+        return self._menu
+
+    @menu.setter
+    def menu(self, iterable) -> None:
+        self._menu.update(iterable)
+
+    def run(self, **options) -> None:
+        pass
+
+
+class Timer:
+    def __init__(self, callback, interval) -> None:
+        self.callback = callback
+        self.interval = interval
+        self._alive = False
+
+    def start(self) -> None:
+        self._alive = True
+
+    def stop(self) -> None:
+        self._alive = False
+
+    def is_alive(self) -> bool:
+        return self._alive
+
+
+class _Event:
+    def __init__(self) -> None:
+        self.callbacks = []
+
+    def register(self, func):
+        self.callbacks.append(func)
+        return func
+
+    def emit(self, *args, **kwargs) -> None:
+        for func in self.callbacks:
+            func(*args, **kwargs)
+
+
+def notification(title, subtitle, message, **options) -> None:
+    recorder.notifications.append((title, subtitle, message))
+
+
+def alert(title=None, message="", **options) -> int:
+    return 1
+
+
+def quit_application(sender=None) -> None:
+    pass
+
+
+def install() -> Recorder:
+    """
+    Registers the fake modules in `sys.modules` and returns the recorder.
+    """
+    rumps = types.ModuleType("rumps")
+    events = types.ModuleType("rumps.events")
+    for name in ("before_start", "on_notification", "on_sleep", "on_wake", "before_quit"):
+        setattr(events, name, _Event())
+
+    for name, value in {
+        "App": App,
+        "Menu": Menu,
+        "MenuItem": MenuItem,
+        "Timer": Timer,
+        "separator": separator,
+        "notification": notification,
+        "alert": alert,
+        "quit_application": quit_application,
+        "events": events,
+    }.items():
+        setattr(rumps, name, value)
+
+    sys.modules["rumps"] = rumps
+    sys.modules["rumps.events"] = events
+    for name in (
+        "rumps.rumps",
+        "rumps.compat",
+        "rumps.text_field",
+        "rumps.utils",
+        "rumps._internal",
+        "rumps.notifications",
+        "Foundation",
+        "AppKit",
+        "PyObjCTools",
+        "objc",
+    ):
+        module = sys.modules[name] = _StubModule(name)
+        if name.startswith("rumps."):
+            setattr(rumps, name.split(".")[1], module)
+
+    sys.modules["rumps.rumps"].SeparatorMenuItem = SeparatorMenuItem
+    sys.modules["Foundation"].NSObject = NSObject
+    sys.modules["rumps.compat"].text_type = str
+    sys.modules["rumps.compat"].string_types = (str,)
+    return recorder
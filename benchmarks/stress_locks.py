@@ -0,0 +1,109 @@
+# benchmarks/stress_locks.py
+#
+# Runs many processes counting runs and editing the config at the same time, the
+# way overlapping instances and scheduled runs do, and checks that no execution
+# count or config edit was lost. The previous unlocked read-modify-write of
+# .data.txt is run the same way as a baseline.
+#
+#   python benchmarks/stress_locks.py [--processes 8] [--runs 500]
+
+import argparse
+import logging
+import multiprocessing
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "menuscript"))
+
+from controller.counters import Counters, parse  # noqa: E402
+from controller.store import ConfigStore  # noqa: E402
+
+logging.getLogger("log").disabled = True
+
+EDIT_EVERY = 25  # runs between config edits of a worker
+
+
+def legacy_increment(path: pathlib.Path) -> None:
+    """
+    The previous `increment_execution_count`, kept as a baseline.
+    """
+    with open(path, "r") as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        for line in lines:
+            if line.startswith("(executions)"):
+                line = f"(executions){int(line[line.index(')') + 1 :]) + 1}"
+            f.write(line)
+
+
+def worker(directory: str, index: int, runs: int, legacy: bool) -> None:
+    directory = pathlib.Path(directory)
+    if legacy:
+        for _ in range(runs):
+            try:
+                legacy_increment(directory / ".data.txt")
+            except (OSError, ValueError):
+                pass  # torn reads are part of what the baseline shows
+        return
+
+    counters = Counters(directory / ".data.txt", interval=0.005)
+    counters.load()
+    store = ConfigStore(directory / ".config.txt", delay=3600)
+    store.load()
+    for i in range(runs):
+        counters.increment(f"worker-{index}")
+        if i % EDIT_EVERY == 0:
+            store.add(f"worker-{index}-{i}", f"/tmp/{index}/{i}.py", "")
+            store.flush()
+        time.sleep(0.0005)  # runs are spread out, not one burst per process
+    counters.flush()
+
+
+def stress(processes: int, runs: int, legacy: bool) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory)
+        (path / ".data.txt").write_text("(executions)0\n")
+        (path / ".config.txt").write_text("# stress test\n")
+
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=worker, args=(directory, i, runs, legacy)) for i in range(processes)
+        ]
+        start = time.perf_counter()
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        expected = processes * runs
+        try:
+            total, scripts, _ = parse((path / ".data.txt").read_text())
+        except ValueError:
+            total, scripts = 0, {}
+        label = "unlocked baseline" if legacy else "locked counters"
+        print(f"    {label:<20} {elapsed:6.2f} s  {total}/{expected} runs counted, {expected - total} lost")
+
+        if not legacy:
+            lost_scripts = sum(runs - scripts.get(f"worker-{i}", 0) for i in range(processes))
+            store = ConfigStore(path / ".config.txt")
+            items = len(store.load())
+            edits = processes * len(range(0, runs, EDIT_EVERY))
+            print(f"    {'':<20} {'':>8}  {lost_scripts} per-script counts lost, {items}/{edits} config edits kept")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.runs} runs")
+    stress(args.processes, args.runs, legacy=True)
+    stress(args.processes, args.runs, legacy=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# menuscript/controller/capture.py
+
+import os
+import pathlib
+import subprocess
+import threading
+import time
+from controller.control import RunControl
+from controller.usage import Usage
+
+WINDOW = 4096  # bytes kept from both the start and the end of each stream
+CHUNK = 64 * 1024
+
+
+class StreamWindow:
+    """
+    Bounded view of an output stream: the first `head` and the last `tail` bytes,
+    plus the total byte count. Memory stays O(head + tail) however much is written.
+
+    :param head: bytes kept from the start of the stream.
+    :param tail: bytes kept from the end of the stream.
+    """
+
+    def __init__(self, head: int = WINDOW, tail: int = WINDOW) -> None:
+        self.head_size = head
+        self.tail_size = tail
+        self.total = 0
+
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    def write(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+
+        room = self.head_size - len(self._head)
+        if room > 0:
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+
+        if chunk and self.tail_size:
+            self._tail += chunk
+            if len(self._tail) > 2 * self.tail_size:  # trim in batches, not per write
+                del self._tail[: -self.tail_size]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.head_size + self.tail_size
+
+    def excerpt(self) -> str:
+        """
+        Returns the kept bytes decoded as text, with a marker where bytes were
+        dropped.
+        """
+        tail = bytes(self._tail[-self.tail_size :]) if self.tail_size else b""
+        head = bytes(self._head)
+        if not self.truncated:
+            return (head + tail).decode("utf-8", errors="replace")
+
+        dropped = self.total - len(head) - len(tail)
+        return (
+            head.decode("utf-8", errors="replace")
+            + f"\n... [{dropped} bytes truncated] ...\n"
+            + tail.decode("utf-8", errors="replace")
+        )
+
+
+class Capture:
+    """
+    Reads a child's stdout and stderr concurrently as they stream, keeping a
+    `StreamWindow` of each and optionally copying the full streams to files. The
+    exit code, byte counts, excerpts and resource usage are available once `wait`
+    returns.
+
+    :param head: bytes kept from the start of each stream.
+    :param tail: bytes kept from the end of each stream.
+    :param spill: optional path prefix; the full streams are written to
+                  `<spill>.stdout` and `<spill>.stderr`.
+    :param stderr_filter: optional object taking stderr first, with
+                          `write(chunk, forward)` and `flush(forward)` methods
+                          passing on what belongs to the script's own stderr,
+                          e.g. an `importtime.ImportTimeFilter`.
+    :param log: optional file both streams are written to as they arrive,
+                unbuffered, in the order the chunks were read.
+    """
+
+    def __init__(
+        self,
+        head: int = WINDOW,
+        tail: int = WINDOW,
+        spill: pathlib.Path | None = None,
+        stderr_filter=None,
+        log: pathlib.Path | None = None,
+    ) -> None:
+        self.stdout = StreamWindow(head, tail)
+        self.stderr = StreamWindow(head, tail)
+        self.spill = spill
+        self.stderr_filter = stderr_filter
+        self.log = log
+        self.returncode = None
+        self.usage = None
+        self.started = time.perf_counter()
+
+        self._threads = []
+        self._log_file = None
+        self._log_lock = threading.Lock()
+
+    def attach(self, stdout, stderr) -> None:
+        """
+        Starts reading the two pipes, given as file objects or descriptors.
+        """
+        if self.log is not None:
+            self.log.parent.mkdir(parents=True, exist_ok=True)
+            self._log_file = open(self.log, "wb", buffering=0)
+
+        streams = (
+            ("stdout", stdout, self.stdout, None),
+            ("stderr", stderr, self.stderr, self.stderr_filter),
+        )
+        for name, pipe, window, stream_filter in streams:
+            if pipe is None:
+                continue
+            target = None
+            if self.spill is not None:
+                target = pathlib.Path(f"{self.spill}.{name}")
+            thread = threading.Thread(
+                target=self._pump,
+                args=(pipe, window, target, stream_filter, self._write_log if self._log_file else None),
+                name=f"capture-{name}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self, process: subprocess.Popen) -> int:
+        """
+        Waits once for `process` to exit and for both pipes to be drained. Returns
+        the exit code. The child's own CPU time and peak RSS are taken from
+        `os.wait4`, so runs on other threads are not mixed in.
+        """
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:  # already reaped
+            return self.finish(process.wait())
+
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return self.finish(process.returncode, Usage.from_rusage(time.perf_counter() - self.started, rusage))
+
+    def finish(self, returncode: int | None, usage: Usage | None = None) -> int | None:
+        """
+        Records the exit code and resource usage of a child that was not started by
+        `subprocess`, e.g. by a fork server, and waits for both pipes to be drained.
+        """
+        self.returncode = returncode
+        self.usage = usage
+        for thread in self._threads:
+            thread.join()
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+        return self.returncode
+
+    def _write_log(self, chunk: bytes) -> None:
+        with self._log_lock:
+            self._log_file.write(chunk)
+
+    @staticmethod
+    def _pump(pipe, window: StreamWindow, target: pathlib.Path | None, stream_filter=None, log=None) -> None:
+        fd = pipe if isinstance(pipe, int) else pipe.fileno()
+        spill = open(target, "wb") if target is not None else None
+
+        def forward(chunk: bytes) -> None:
+            window.write(chunk)
+            if spill is not None:
+                spill.write(chunk)
+            if log is not None:
+                log(chunk)
+
+        try:
+            while True:
+                chunk = os.read(fd, CHUNK)
+                if not chunk:
+                    break
+                if stream_filter is not None:
+                    stream_filter.write(chunk, forward)
+                else:
+                    forward(chunk)
+            if stream_filter is not None:
+                stream_filter.flush(forward)
+        finally:
+            if spill is not None:
+                spill.close()
+            if isinstance(pipe, int):
+                os.close(pipe)
+            else:
+                pipe.close()
+
+
+def run(
+    cmd: list,
+    cwd,
+    head: int = WINDOW,
+    tail: int = WINDOW,
+    spill: pathlib.Path | None = None,
+    control: RunControl | None = None,
+    stderr_filter=None,
+    log: pathlib.Path | None = None,
+    **kwargs,
+) -> Capture:
+    """
+    Runs `cmd` with stdin closed in a new process group, streaming both outputs
+    through a `Capture`, and waits for it once. Extra keyword arguments are passed
+    to `subprocess.Popen`.
+
+    :param control: optional `RunControl` able to stop the process group.
+    :param stderr_filter: optional filter applied to stderr, see `Capture`.
+    :param log: optional file both streams are written to, see `Capture`.
+    """
+    capture = Capture(head, tail, spill, stderr_filter, log)
+    p = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+        **kwargs,
+    )
+    if control is not None:
+        control.started(p.pid)
+    try:
+        capture.attach(p.stdout, p.stderr)
+        capture.wait(p)
+    finally:
+        if control is not None:
+            control.finished()
+    return capture
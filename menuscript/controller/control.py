@@ -0,0 +1,108 @@
+# menuscript/controller/control.py
+
+import os
+import signal
+import threading
+from logger.logger import _log
+
+GRACE = 5.0  # seconds between SIGTERM and SIGKILL
+
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+
+
+class RunControl:
+    """
+    Stops one run, either when it exceeds `timeout` or when `cancel` is called from
+    another thread. The script runs in its own process group, so stopping it sends
+    SIGTERM to the whole group, including anything the script spawned, followed by
+    SIGKILL if the group is still around `grace` seconds later.
+
+    :param timeout: seconds the run may take, or None for no limit.
+    :param grace: seconds between SIGTERM and SIGKILL.
+    """
+
+    def __init__(self, timeout: float | None = None, grace: float = GRACE) -> None:
+        self.timeout = timeout
+        self.grace = grace
+        self.reason = None  # TIMEOUT or CANCELLED once the run was stopped
+        self.pgid = None
+
+        self._done = False
+        self._timer = None  # the timeout
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<RunControl: pgid={self.pgid} timeout={self.timeout} reason={self.reason}>"
+
+    @property
+    def stopped(self) -> bool:
+        return self.reason is not None
+
+    def started(self, pgid: int) -> None:
+        """
+        Called once the script's process group exists. Starts the timeout, or stops
+        the group right away if the run was cancelled before it started.
+        """
+        with self._lock:
+            self.pgid = pgid
+            if self.reason is not None:
+                self._stop_group()
+                return
+            if self.timeout is not None:
+                self._timer = self._start_timer(self.timeout, self._expire)
+
+    def finished(self) -> None:
+        """
+        Called once the script exited. The run can no longer time out or be
+        cancelled, but if it was already stopped the SIGKILL still follows, as
+        children that ignored SIGTERM may outlive the script.
+        """
+        with self._lock:
+            self._done = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def cancel(self) -> bool:
+        """
+        Stops the run, or prevents it from starting if it is still queued. Returns
+        False if it already finished or was stopped.
+        """
+        return self._stop(CANCELLED)
+
+    def _expire(self) -> None:
+        if self._stop(TIMEOUT):
+            _log.info(f"Run in process group {self.pgid} timed out after {self.timeout} s")
+
+    def _stop(self, reason: str) -> bool:
+        with self._lock:
+            if self._done or self.reason is not None:
+                return False
+            self.reason = reason
+            if self.pgid is not None:
+                self._stop_group()
+            return True
+
+    def _stop_group(self) -> None:
+        self._signal(signal.SIGTERM)
+        self._start_timer(self.grace, self._kill)
+
+    def _kill(self) -> None:
+        with self._lock:
+            self._signal(signal.SIGKILL)
+
+    def _signal(self, signum: int) -> None:
+        # the group outlives the script if it left children behind, so it is
+        # signalled even after the script itself exited
+        try:
+            os.killpg(self.pgid, signum)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    @staticmethod
+    def _start_timer(interval: float, fn) -> threading.Timer:
+        timer = threading.Timer(interval, fn)
+        timer.daemon = True
+        timer.start()
+        return timer
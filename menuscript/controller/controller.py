@@ -8,8 +8,32 @@ import os
 import shutil
 import webbrowser
 import pathlib
+from functools import partial
 from logger.logger import _log 
 import time
+from controller.store import ConfigStore
+from controller.items import ScriptItem
+from controller.parser import iter_items
+from controller import snapshot
+from controller.watcher import ConfigWatcher
+from controller import pathcache
+from controller import runner
+from controller.runner import RunResult
+from controller.engine import Dispatcher, ExecutionEngine, RunHandle, WORKERS
+from controller.forkserver import ForkServerPool, parse_modules
+from controller import memo
+from controller.memo import ResultCache
+from controller import runlogs
+from controller.runlogs import RunLogs
+from controller.counters import Counters
+from controller.history import History
+from controller.scheduler import POLICY, Scheduler
+from controller.groups import GroupRun, parse_group
+from controller import usage
+from controller import importtime
+from controller.control import CANCELLED, RunControl
+from controller.parser import parse_duration
+from controller.precompile import Precompiler
 
 class Error_: # type: ignore
     def __init__(self, message):
@@ -21,6 +45,35 @@ class Info_: # type: ignore
         self = rumps.notification("MenuScript", "Alert", message, icon=str(pathlib.Path(f"{paths.image_path}/icon.icns")))  
 
 
+_store = None
+_dispatcher = None
+_engine = None
+_forkservers = None
+_results = None
+_scheduler = None
+_precompiler = None
+_run_logs = None
+_counters = None
+_history = None
+
+
+def get_store() -> ConfigStore:
+    """
+    Returns the in-memory config store backing every edit of the user config file.
+    """
+    global _store
+    if _store is None:
+        _store = ConfigStore(pathlib.Path(f"{paths.user_data_path}/.config.txt"))
+    return _store
+
+
+def flush_config() -> bool:
+    """
+    Writes pending config edits to disk. Called on quit and before restarting.
+    """
+    return get_store().flush()
+
+
 def create_user_data() -> None:
     """
     Updates the config file in the user's home folder if it exists; otherwise, creates a
@@ -96,21 +149,26 @@ def _copy_over_ui() -> None:
 def load_items() -> list:
     """
     Loads the items from the config file in the user's home folder. Returns a list of
-    ScriptItem objects.
+    ScriptItem objects. Uses the startup snapshot in the cache folder when neither the
+    config nor its interpreters changed since it was taken.
     """
+    start = time.perf_counter()
 
     try:
-        with open(f"{paths.user_data_path}/.config.txt", "r") as f:
-            lines = f.readlines()
+        items, warm = _read_items()
     except Exception as e:
         _log.error(f"Failed to read config with error: '{str(e)}'")
         Error_(f"Failed to read config with error: '{str(e)}'")
         _log.error("Exiting with error code 1")
         exit(1)
 
-    # format config file line to get name, script path, and virtual environment path
-
-    items = config_to_items(lines)
+    _log.info(
+        f"Loaded {len(items)} items in {(time.perf_counter() - start) * 1000:.1f} ms "
+        f"({'warm' if warm else 'cold'} start)"
+    )
+    _log.info(f"Path cache: {pathcache.stats()}")
+    configure_forkservers()
+    configure_precompile()
 
     if len(items) == 0:
         return []
@@ -118,67 +176,119 @@ def load_items() -> list:
     _log.info(f"Returning {len(items)} items from config file.")
     return items
 
-def config_to_items(lines: list) -> list:
-    items = []
-    names = set()
-    
-    for i, line in enumerate(lines):
-        
-        if not line:
-            break
 
-        line = line.strip()
+def reload_items() -> list | None:
+    """
+    Re-reads the config file after it changed on disk. Unlike `load_items`, a config
+    that cannot be read (for example while an editor is replacing it) is not fatal;
+    None is returned and the current items are kept.
+    """
+    try:
+        items, _ = _read_items()
+    except Exception as e:
+        _log.error(f"Failed to reload config with error: '{str(e)}'")
+        return None
+
+    _log.info(f"Reloaded {len(items)} items from config file.")
+    configure_forkservers()
+    configure_precompile()
+    return items
+
+
+def _read_items() -> tuple:
+    config_path = pathlib.Path(f"{paths.user_data_path}/.config.txt")
+    cache_path = pathlib.Path(f"{paths.user_data_path}/cache/config.snapshot")
+    store = get_store()
+
+    # the snapshot holds the config file alone; journal records are replayed on top
+    cached = snapshot.read(cache_path, config_path)
 
-        if line.startswith("("):
-            start = line.index("[")
-            end = line.index("]", start + 1)
-            name = line[start + 1 : end]
+    if cached is not None:
+        store.restore(cached["state"], replay=False)
+        items = cached["items"]
+    else:
+        stamp = snapshot.stat(config_path)
+        store.load(replay=False)
+
+        # validate name, script path, and virtual environment path of each config line
 
-            line = line[end:]
+        entries = store.entries()
+        items = _validate_items(entries)
+        snapshot.write(cache_path, config_path, stamp, store.dump(), entries, items)
 
-            start = line.index("[")
-            end = line.index("]", start + 1)
-            source = line[start + 1 : end]
+    if store.replay():
+        items = _validate_items(store.entries())
+    return items, cached is not None
 
-            line = line[end:]
 
-            start = line.index("[")
-            end = line.index("]", start + 1)
-            interpreter = line[start + 1 : end]
+def watch_config(on_change) -> ConfigWatcher:
+    """
+    Returns a watcher for the user config file. `on_change` is called from the
+    watcher's `poll` whenever the file changed on disk.
+    """
+    return ConfigWatcher(pathlib.Path(f"{paths.user_data_path}/.config.txt"), on_change)
 
-            if name == "":
-                _log.error("Invalid config file - scripts must have a name.")
-                rumps.notification(
-                    title="MenuScript",
-                    subtitle="Invalid config file",
-                    message="Scripts must have a name.",
-                )
-                continue
+def config_to_items(lines) -> list:
+    """
+    Parses and validates config lines. `lines` can be any line iterator, such as an
+    open file; malformed lines are logged with their line and column and skipped.
+    """
+    return _validate_items(iter_items(lines))
 
-            if name in names:
-                _log.info(f"Repeated script name: '{name}' in line: '{i}'")
-                Info_(f"Scripts must have unique names. Repeated script name: '{name}' in line: '{i}'")
 
-            if not pathlib.Path(interpreter).exists():
-                interpreter = None
+def _validate_items(entries) -> list:
+    items = []
+    names = set()
 
-            names.add(name)
-            items.append((name, source, interpreter))
+    entries = list(entries)
+    interpreters = pathcache.bulk_validate(entry[3] for entry in entries)
+    
+    for i, name, source, interpreter in entries:
+
+        if name == "":
+            _log.error("Invalid config file - scripts must have a name.")
+            rumps.notification(
+                title="MenuScript",
+                subtitle="Invalid config file",
+                message="Scripts must have a name.",
+            )
+            continue
+
+        if name in names:
+            _log.info(f"Repeated script name: '{name}' in line: '{i}'")
+            Info_(f"Scripts must have unique names. Repeated script name: '{name}' in line: '{i}'")
+
+        if not interpreters[interpreter].executable:
+            interpreter = None
+
+        names.add(name)
+        items.append(ScriptItem(name, source, interpreter))
             
     return items
     
 
+def _current_item(name: str) -> ScriptItem | None:
+    """
+    Returns the item called `name` as the config holds it now, validated like the
+    items shown in the menu, or None if there is none.
+    """
+    item = get_store().get(name)
+    if item is None:
+        return None
+    items = _validate_items([(0, *item)])
+    return items[0] if items else None
+
+
 def write_item(item: tuple) -> None:
     """
     Writes a script item to the user_config.txt file.
 
     """
-    try:
-        with open(f"{paths.user_data_path}/.config.txt", "a") as f:
-            f.write(f"(name)[{item[0]}](source)[{item[1]}](interpreter)[]\n")
-    except Exception as e:
-        _log.error(f"Could not write item with error: '{str(e)}'")
+    if not get_store().add(item[0], item[1], item[2]):
+        _log.error(f"Could not write item '{item[0]}', the name is already in use.")
         return
+    if pathcache.lookup(item[1]).is_file:  # not the placeholder of a new item
+        configure_precompile()
 
 
 def remove_item(item: tuple) -> None:
@@ -186,29 +296,26 @@ def remove_item(item: tuple) -> None:
     Removes a script item from the user_config.txt file.
 
     """
-    try:
-        with open(f"{paths.user_data_path}/.config.txt", "r") as f:
-            lines = f.readlines()
-
-        with open(f"{paths.user_data_path}/.config.txt", "w") as f:
-            for line in lines:
-                if line.startswith(f"({item[0]})"):
-                    continue
-                f.write(line)
-                
-        _log.info(f"Removed item '{item[0]}' from config file.")
-        Info_(f"Script '{item[0]}' successfully deleted.")
+    if not get_store().remove(item[0]):
+        _log.error(f"Could not remove item '{item[0]}', it is not in the config file.")
+        Error_(f"Could not remove item '{item[0]}', it is not in the config file.")
+        return
 
-    except Exception as e:
-        _log.error(f"Could not write to config with error: '{str(e)}'")
-        Error_(f"Could not write to config with error: '{str(e)}'")
+    get_scheduler().remove(item[0])
+    get_counters().remove(item[0])
+    _log.info(f"Removed item '{item[0]}' from config file.")
+    Info_(f"Script '{item[0]}' successfully deleted.")
         
 
-def schedule_job(item: dict):
+def schedule_job(item: tuple, expression: str) -> bool:
     """
-        Executes a script item in a cron job.
+    Runs a script item on a cron schedule, the same way as clicking 'Run'. An empty
+    expression removes the item's schedule. Returns False if the expression is
+    invalid.
 
         :param item: the script item to execute.
+        :param expression: five fields separated by spaces, or a shorthand such as
+                           `@daily`.
 
     Minute. The minute of the hour the command will run on, ranging from 0-59.
     Hour. The hour the command will run at, ranging from 0-23 in the 24-hour notation.
@@ -217,8 +324,65 @@ def schedule_job(item: dict):
     Day of the week. The day of the week for a command to run on, ranging from 0-6, representing Sunday-Saturday. In some systems, the value 7 represents Sunday.
 
     """
+    expression = expression.strip()
+    if expression == "":
+        if get_scheduler().remove(item[0]):
+            _log.info(f"Removed schedule of '{item[0]}'")
+            Info_(f"Script '{item[0]}' is no longer scheduled.")
+        return True
+
+    try:
+        get_scheduler().add(item[0], expression)
+    except ValueError as e:
+        _log.info(f"Invalid schedule '{expression}' for '{item[0]}': '{str(e)}'")
+        Error_(f"Invalid schedule '{expression}': {str(e)}")
+        return False
+
+    _log.info(f"Scheduled '{item[0]}' at '{expression}'")
+    Info_(f"Script '{item[0]}' scheduled at '{expression}'.")
+    return True
+
+
+def get_schedule(item: tuple) -> str | None:
+    """
+    Returns the cron expression the item is scheduled at, or None.
+    """
+    schedule = get_scheduler().get(item[0])
+    return schedule.expression.text if schedule is not None else None
 
-    pass
+
+def get_scheduler() -> Scheduler:
+    """
+    Returns the scheduler of the jobs set up with `schedule_job`, persisted to
+    ~/.menuscript/.schedules.txt. Firings missed while the machine slept or the app
+    was not running are handled as set by `(setting)[catchup](value)[policy]`:
+    `skip`, `once` (the default) or `all`.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(
+            _fire_scheduled,
+            pathlib.Path(f"{paths.user_data_path}/.schedules.txt"),
+            policy=get_store().settings.get("catchup", POLICY),
+        )
+        _log.info(f"Loaded {_scheduler.load()} schedules.")
+    return _scheduler
+
+
+def _fire_scheduled(name: str) -> None:
+    # called on the scheduler thread; the run is started from the main run loop
+    get_dispatcher().post(_run_scheduled, name)
+
+
+def _run_scheduled(name: str) -> None:
+    item = _current_item(name)
+    if item is None:
+        _log.info(f"Removing schedule of '{name}', the script no longer exists.")
+        get_scheduler().remove(name)
+        return
+
+    _log.info(f"Running scheduled job '{name}'")
+    submit(item, get_scheduler().on_done)
 
 
 def open_interpreter_picker():
@@ -231,13 +395,15 @@ def open_interpreter_picker():
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
         )
-        if p.communicate()[0].decode('utf-8') == "":
+        stdout, stderr = p.communicate()
+        stdout = stdout.decode("utf-8")
+        if stdout == "":
             return
         
-        Info_(f"New interpreter: {p.communicate()[0].decode('utf-8')}")
-        _log.info(f"New interpreter: {p.communicate()[0].decode('utf-8')}")
-        _log.info(f"STDOUT: {p.communicate()[1].decode('utf-8')}")
-        return p.communicate()[0].decode("utf-8")
+        Info_(f"New interpreter: {stdout}")
+        _log.info(f"New interpreter: {stdout}")
+        _log.info(f"STDOUT: {stderr.decode('utf-8')}")
+        return stdout
         
     except Exception as e:
         _log.error(f"Failed to open interpreter picker at '{paths.user_data_path}' with error: {str(e)}")
@@ -254,14 +420,16 @@ def open_filepicker():
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
         )
-        if p.communicate()[0].decode('utf-8') == "":
+        stdout, stderr = p.communicate()
+        stdout = stdout.decode("utf-8")
+        if stdout == "":
             return
         
-        Info_(f"New source: {p.communicate()[0].decode('utf-8')}")
-        _log.info(f"New source: {p.communicate()[0].decode('utf-8')}")
-        _log.info(f"STDOUT: {p.communicate()[1].decode('utf-8')}")
+        Info_(f"New source: {stdout}")
+        _log.info(f"New source: {stdout}")
+        _log.info(f"STDOUT: {stderr.decode('utf-8')}")
         
-        return p.communicate()[0].decode("utf-8")
+        return stdout
     except Exception as e:
         _log.error(f"Failed to open interpreter picker at '{paths.user_data_path}' with error: {str(e)}")
         return
@@ -272,17 +440,24 @@ def get_source_label(source: str) -> str:
     return f"Source: '{s}'"
 
 
-def get_interpreter_label(interpreter: str) -> str:
-    exec_name = str(pathlib.Path(interpreter)).split("/")[-1]
-    if interpreter.split("/")[1].lower() == "library":
-        return f"Interpreter: '(Global) {exec_name}'"
-    return f"Interpreter: '(venv) {exec_name}'"
+def get_interpreter_label(interpreter: str | None) -> str:
+    if not interpreter:
+        return "Interpreter: '(Global) default'"
+    info = pathcache.lookup(interpreter)
+    if info.venv_root is None:
+        return f"Interpreter: '(Global) {info.name}'"
+    return f"Interpreter: '(venv) {info.name}'"
 
 
 def get_name_label(name: str) -> str:
     return f"Name: '{name}'"
 
 
+def get_schedule_label(item: tuple) -> str:
+    expression = get_schedule(item)
+    return f"Schedule job ({expression})" if expression else "Schedule job"
+
+
 def update_name(item: tuple, new_name: str) -> bool:
     """
     Updates the name of a script item in the config file.
@@ -296,242 +471,579 @@ def update_name(item: tuple, new_name: str) -> bool:
         _log.info("Name cannot be empty. Name update failed.")
         return False
 
-    try:
-        with open(f"{paths.user_data_path}/.config.txt", "r") as f:
-            lines = f.readlines()
-    except Exception as e:
-        _log.error(f"Could not open config with error: '{str(e)}'")
+    if new_name != item[0] and new_name in get_store():
+        Info_(f"A script named '{new_name}' already exists.")
+        _log.info(f"Name '{new_name}' already in use. Name update failed.")
         return False
 
-    try:
-        with open(f"{paths.user_data_path}/.config.txt", "w") as f:
-            name = item[0]
-            source = item[1]
-            interpreter = item[2]
-            for line in lines:
-                line = line.strip()  # clear whitespace
-                if line.startswith(f"(name)[{name}]"):
-                    line = (
-                        f"(name)[{new_name}](source)[{source}](interpreter)[{interpreter}]"
-                    )
-                f.write(f"{line}\n")
-        return True
-    except Exception as e:
-        _log.error(f"Could not write to config with error: '{str(e)}'")
+    if not get_store().rename(item[0], new_name):
+        _log.error(f"Could not rename '{item[0]}', it is not in the config file.")
         return False
 
+    get_scheduler().rename(item[0], new_name)
+    get_counters().rename(item[0], new_name)
+    return True
+
 
 def update_source(item: tuple, new_source: str):
+    """
+    Sets the source of a script item. Returns False if it is invalid or did not
+    change, in which case nothing is written or recompiled.
+    """
     if new_source == "":
         Error_("Script source cannot be empty.")
         _log.error("Script source cannot be empty.")
         return False
 
-    try:
-        with open(f"{paths.user_data_path}/.config.txt", "r") as f:
-            lines = f.readlines()
-
-        with open(f"{paths.user_data_path}/.config.txt", "w") as f:
-            name = item[0]
-            interpreter = item[2]
-            for line in lines:
-                line = line.strip()  # clear whitespace
-                if line.startswith(f"(name)[{name}]"):
-                    line = (
-                        f"(name)[{name}](source)[{new_source}](interpreter)[{interpreter}]"
-                    )
-                f.write(f"{line}\n")
-        return True
-    except Exception as e:
-        _log.error(f"Could not write to open/write config with error: '{str(e)}'")
+    current = get_store().get(item[0])
+    if current is None:
+        _log.error(f"Could not update source of '{item[0]}', it is not in the config file.")
+        return False
+    if current[1] == new_source:
         return False
 
+    get_store().set_source(item[0], new_source)
+    configure_precompile()
+    return True
+
 
 def update_interpreter(item: tuple, new_interpreter: str | None) -> bool:
+    """
+    Sets the interpreter of a script item. Returns False if it is empty or did not
+    change, in which case nothing is written or recompiled.
+    """
     if new_interpreter == "" or new_interpreter == None:
         return False
 
-    try:
-        with open(f"{paths.user_data_path}/.config.txt", "r") as f:
-            lines = f.readlines()
-
-        with open(f"{paths.user_data_path}/.config.txt", "w") as f:
-            name = item[0]
-            source = item[1]
-            for line in lines:
-                line = line.strip()  # clear whitespace
-                if line.startswith(f"(name)[{name}]"):
-                    line = (
-                        f"(name)[{name}](source)[{source}](interpreter)[{new_interpreter}]"
-                    )
-                f.write(f"{line}\n")
-
-        return True
-    except Exception as e:
-        _log.error(f"Could not write to open/write config with error: '{str(e)}'")
+    current = get_store().get(item[0])
+    if current is None:
+        _log.error(f"Could not update interpreter of '{item[0]}', it is not in the config file.")
+        return False
+    if current[2] == new_interpreter:
         return False
 
+    get_store().set_interpreter(item[0], new_interpreter)
+    configure_precompile()
+    return True
 
-def get_num_executions():
-    
-    try:
-        with open(f"{paths.user_data_path}/.data.txt", "r") as f:
-            lines = f.readlines()
 
-        for line in lines:
-            if line.startswith("(executions)"):
-                start = line.index(")")
-                return int(line[start + 1 :])
-            
-    except Exception as e:
-        _log.error(f"Could not read from data file with error: '{str(e)}'")
-        return 0
+def get_counters() -> Counters:
+    """
+    Returns the execution counts, loaded from ~/.menuscript/.data.txt on first use.
+    """
+    global _counters
+    if _counters is None:
+        _counters = Counters(f"{paths.user_data_path}/.data.txt")
+        _counters.load()
+    return _counters
 
 
-def increment_execution_count() -> None:
-    
-    try:
-        
-        with open(f"{paths.user_data_path}/.data.txt", "r") as f:
-            lines = f.readlines()
+def get_num_executions() -> int:
+    return get_counters().total
 
-        with open(f"{paths.user_data_path}/.data.txt", "w") as f:
-            for line in lines:
-                line.strip()
-                if line.startswith("(executions)"):
-                    num = line.index(")")
-                    string = line[num + 1 :]
-                    line = f"(executions){int(string)+1}"
-                    _log.info(f"Incremented execution count to '({int(string)+1})'")
-                f.write(line)
-        
-                
-    except Exception as e:
-        _log.error(f"Could not read from/write to data file with error: '{str(e)}'")
-        return
+
+def increment_execution_count(name: str | None = None) -> None:
+    """
+    Counts a successful run, of script `name` if given. The data file is written in
+    the background, at most every few seconds.
+    """
+    total = get_counters().increment(name)
+    _log.info(f"Incremented execution count to '({total})'")
 
 
 def execute(item: tuple):
     """
-    Execute the script displayed in the menu bar. If a virtual environement is
-    configured in the config.txt file, it will activate the virtual environemnt.
-    Then run the script.
+    Execute the script displayed in the menu bar and wait for it to finish. If a
+    virtual environement is configured in the config.txt file, it will activate the
+    virtual environemnt. Then run the script. The menu uses `submit` instead, which
+    does not block.
 
     :param item: ScriptItem object
     """
-    name = item[0]
-    source = item[1]
-    source = pathlib.Path(source)
-    interpreter = item[2]
+    return report_result(run_item(item))
 
-    try:
-        interpreter = pathlib.Path(interpreter)
-    except TypeError:
-        interpreter = None
-
-    # Check if paths in config.txt are valid
-    if not source.is_file() or not str(source).endswith(".py"):
-        Error_("Invalid script source.")
-        _log.error("Invalid script source.")
-        return
 
-    if interpreter is not None:
-        if (
-            str(interpreter).lower() == "none"
-            or str(interpreter).lower() == "."
-            or str(interpreter).lower() == " "
-        ):
-            interpreter = None
+def submit(item: tuple, on_done=None, force: bool = False, import_timing: bool = False) -> RunHandle:
+    """
+    Runs the script of `item` on the execution engine and returns its handle
+    immediately. Once it finished, the result is reported from the main run loop,
+    followed by `on_done(handle)`.
+
+    :param item: ScriptItem object
+    :param on_done: optional callback run on the main thread after the result.
+    :param force: run the script even if a cached result could be used.
+    :param import_timing: run the script with `-X importtime`, see `run_item`.
+    """
+    handle = get_engine().submit(
+        item, _finish_run, force=force, control=new_control(item), import_timing=import_timing
+    )
+    if on_done is not None:
+        handle.add_done_callback(on_done)
+    return handle
+
 
-    # Get script name from source
-    s_name = str(source).split("/")[-1]
-    path = pathlib.Path("/".join(str(source).split("/")[:-1]))
+def get_dispatcher() -> Dispatcher:
+    """
+    Returns the queue through which run results reach the main thread. The menu
+    drains it from a timer.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = Dispatcher()
+    return _dispatcher
 
-    if interpreter:  # will be None or a PoxisPath object
-        venv_activate = str(interpreter).split("bin")[0] + "bin/activate"
-        cmd = [
-            f"source {venv_activate}",
-            f"{interpreter} {s_name}",
-        ]  # Set bash command for Popen
 
+def get_engine() -> ExecutionEngine:
+    global _engine
+    if _engine is None:
         try:
-            _log.info(f"Executing script: '{item[0]}'")
-            _log.info(f"Executing command: '{cmd}'")
-            
-            p = subprocess.Popen(
-                cmd,
-                cwd=str(path),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-            )
-            
-            if p.communicate()[1].decode('utf-8') == "":
-                msg = "Script executed successfully."
-            else:
-                msg = f"Script '{name}' executed with message: '{p.communicate()[1].decode('utf-8')}'"
-                Error_(msg)
-                _log.error(msg)
-                return
-                
-            Info_(msg)
-            _log.info(msg)
-            increment_execution_count()
-            return
-        except Exception as e:
-            _log.error(f"Could not execute script with error: '{str(e)}'")
-            Error_(f"Could not execute script with error: '{str(e)}'")
-            return e
+            workers = int(get_store().settings.get("workers", WORKERS))
+        except ValueError:
+            workers = WORKERS
+        _engine = ExecutionEngine(run_item, get_dispatcher(), max_workers=max(1, workers))
+    return _engine
 
-    # If no virtual environment is configured, run script with global python interpreter
+
+def run_item(
+    item: tuple,
+    force: bool = False,
+    control: RunControl | None = None,
+    import_timing: bool = False,
+) -> RunResult:
+    """
+    Runs `item` to completion with the output settings from the config:
+    `(setting)[output_window](value)[bytes]` bounds the output kept in memory and
+    `(setting)[spill_output](value)[on]` also writes the full output to
+    ~/.menuscript/output.
+
+    Items with a `(memoize)[ttl]` option return the cached result of an earlier
+    successful run instead, as long as the script, its interpreter and the files
+    matched by its `(inputs)[glob; ...]` option did not change and, if a ttl is
+    given, the result is not older than that.
+
+    :param item: the item to run.
+    :param force: run the script even if a cached result could be used.
+    :param control: stops the run on timeout or when cancelled; by default one
+                    with the item's timeout is used.
+    :param import_timing: run the script with `-X importtime`, never from the
+                          cache or a fork server. The import tree is kept in
+                          ~/.menuscript/importtime/<name>.tree, a ranked summary
+                          in `<name>.txt` next to it, and the slowest imports are
+                          added to the result's message.
+    """
+    options = get_store().options(item[0])
+    if import_timing:
+        return _time_imports(item, options, control or new_control(item))
+
+    key = None
+    if "memoize" in options:
+        key, ttl = _memo_key(item, options)
+        if key is not None and not force:
+            entry = get_results().get(key, ttl)
+            if entry is not None:
+                _log.info(f"Using cached result of '{item[0]}'")
+                return RunResult.from_entry(item, entry)
+
+    result = _run_item(item, options, control or new_control(item))
+    if result.usage is not None:
+        _log.info(usage.format_line(item[0], result.ok, result.returncode, result.usage))
+    if key is not None and result.ok:
+        get_results().put(key, result.to_entry())
+    return result
+
+
+def _time_imports(item: tuple, options: dict, control: RunControl) -> RunResult:
+    directory = pathlib.Path(f"{paths.user_data_path}/importtime")
+    base = directory.joinpath(item[0].replace("/", "_"))
+    tree = base.with_name(f"{base.name}.tree")
+
+    result = _run_item(item, options, control, import_tree=tree)
+    if result.usage is not None:
+        _log.info(usage.format_line(item[0], result.ok, result.returncode, result.usage))
+    if not result.imports:
+        return result
+
+    summary = base.with_name(f"{base.name}.txt")
     try:
-        update_interpreter(item, get_global_interpreter())
-        
-        cmd = [str(pathlib.Path(sys.executable)), s_name]
-        
-        _log.info(f"Executing script: '{item[0]}'")
-        _log.info(f"Executing command: '{cmd}'")
-        
-        p = subprocess.Popen(
-            cmd,
-            cwd=str(path),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE,
+        summary.write_text(importtime.format_summary(result.imports))
+    except OSError as e:
+        _log.error(f"Could not write import timing of '{item[0]}' with error: '{str(e)}'")
+    _log.info(f"Import timing of '{item[0]}' written to '{summary}', full tree in '{tree}'")
+    result.message = f"{result.message} Slowest imports: {importtime.headline(result.imports)}."
+    return result
+
+
+def _run_item(
+    item: tuple, options: dict, control: RunControl, import_tree: pathlib.Path | None = None
+) -> RunResult:
+    settings = get_store().settings
+    try:
+        window = int(settings.get("output_window", runner.capture.WINDOW))
+    except ValueError:
+        window = runner.capture.WINDOW
+
+    spill_dir = None
+    if settings.get("spill_output", "").lower() in ("on", "true", "1"):
+        spill_dir = pathlib.Path(f"{paths.user_data_path}/output")
+
+    server = None
+    if "forkserver" in options:
+        server = get_forkservers().get(_interpreter_key(item[2]))
+
+    log = get_run_logs().new_path(item[0])
+    started = time.time()
+    try:
+        result = runner.run(
+            item,
+            window=window,
+            spill_dir=spill_dir,
+            server=server,
+            control=control,
+            importtime=import_tree,
+            log=log,
         )
-        
-        if p.communicate()[1].decode('utf-8') == "":
-            msg = "Script executed successfully."
-        else:
-            msg = f"Script '{name}' executed with message: '{p.communicate()[1].decode('utf-8')}'"
-            Error_(msg)
-            _log.error(msg)
-            return
-                
-        Info_(msg)
-        _log.info(msg)
-        
-        increment_execution_count()
-        return
-    except Exception as e:
-        _log.error(f"Could not execute script with error: '{str(e)}'")
-        Error_(f"Could not execute script with error: '{str(e)}'")
+    finally:
+        get_run_logs().finished(log)
+
+    run_usage = result.usage
+    get_history().record(
+        item[0],
+        started,
+        run_usage.wall if run_usage is not None else time.time() - started,
+        result.status,
+        result.returncode,
+        run_usage.cpu if run_usage is not None else None,
+        run_usage.max_rss if run_usage is not None else None,
+        result.stdout_bytes,
+        result.stderr_bytes,
+    )
+    return result
+
+
+def new_control(item: tuple) -> RunControl:
+    """
+    Returns the `RunControl` for a run of `item`, limited to the item's
+    `(timeout)[duration]` option or else to `(setting)[timeout](value)[duration]`,
+    e.g. `30s` or `5m`. Without either, runs are only stopped by 'Stop'.
+    """
+    value = get_store().options(item[0]).get("timeout") or get_store().settings.get("timeout", "")
+    try:
+        timeout = parse_duration(value)
+    except ValueError:
+        _log.error(f"Ignoring invalid timeout '{value}' of '{item[0]}'")
+        timeout = None
+    return RunControl(timeout)
+
+
+def stop(item: tuple) -> int:
+    """
+    Stops the running and queued runs of `item`: their process groups get SIGTERM,
+    then SIGKILL if they do not exit in time. Returns how many runs were stopped.
+    """
+    count = 0
+    for handle in get_engine().running():
+        control = handle.options.get("control")
+        if handle.item[0] == item[0] and control is not None and control.cancel():
+            count += 1
+
+    if count == 0:
+        Info_(f"Script '{item[0]}' is not running.")
+    _log.info(f"Stopped {count} run(s) of '{item[0]}'")
+    return count
+
+
+def _memo_key(item: tuple, options: dict) -> tuple:
+    try:
+        ttl = memo.parse_ttl(options["memoize"])
+        inputs = memo.parse_inputs(options.get("inputs", ""))
+        return memo.fingerprint(item[1], _interpreter_key(item[2]), inputs), ttl
+    except (OSError, ValueError) as e:
+        _log.error(f"Not caching result of '{item[0]}', invalid memoize options: '{str(e)}'")
+        return None, None
+
+
+def get_results() -> ResultCache:
+    """
+    Returns the cache of results of items with a `(memoize)[ttl]` option, bounded
+    by `(setting)[memoize_limit](value)[bytes]`.
+    """
+    global _results
+    if _results is None:
+        try:
+            limit = int(get_store().settings.get("memoize_limit", memo.LIMIT))
+        except ValueError:
+            limit = memo.LIMIT
+        _results = ResultCache(pathlib.Path(f"{paths.user_data_path}/cache/results"), limit)
+    return _results
+
+
+def is_memoized(item: tuple) -> bool:
+    return "memoize" in get_store().options(item[0])
+
+
+def get_forkservers() -> ForkServerPool:
+    global _forkservers
+    if _forkservers is None:
+        _forkservers = ForkServerPool(
+            pathlib.Path(f"{paths.data_path}/forkserver/main.py"),
+            pathlib.Path(f"{paths.user_data_path}/run"),
+        )
+    return _forkservers
+
+
+def configure_forkservers() -> None:
+    """
+    Keeps one warm fork server per interpreter used by items with a
+    `(forkserver)[module, ...]` option, preloading the modules of all of them.
+    Runs of these items are forked from the server instead of starting a new
+    interpreter; until the server is ready they start a new process as usual.
+    """
+    store = get_store()
+    wanted = {}
+    for name, _, interpreter in store.items():
+        modules = store.options(name).get("forkserver")
+        if modules is None:
+            continue
+        key = _interpreter_key(interpreter)
+        wanted[key] = tuple(sorted(set(wanted.get(key, ())) | set(parse_modules(modules))))
+    get_forkservers().configure(wanted)
+
+
+def get_precompiler() -> Precompiler:
+    global _precompiler
+    if _precompiler is None:
+        _precompiler = Precompiler()
+    return _precompiler
+
+
+def configure_precompile() -> None:
+    """
+    Keeps the scripts in the config, and the modules next to them, compiled into
+    __pycache__ for the interpreter they run with. Compiling happens in the
+    background; `(setting)[precompile](value)[off]` turns it off.
+    """
+    store = get_store()
+    if store.settings.get("precompile", "").lower() in ("off", "false", "0"):
+        get_precompiler().update(())
         return
 
-def get_global_interpreter() -> str | None:
-    sys_list = [item for item in sys.path if "python" in item.split("/")[-1] and "Applications" not in item]
-    
-    for path in sys_list:
-        try:       
-            p = int(path.split("/")[-1][-1])
-            return path
+    pairs = []
+    for _, source, interpreter in store.items():
+        pairs.append((source, _interpreter_key(interpreter)))
+    get_precompiler().update(pairs)
+
+
+def _interpreter_key(interpreter: str | None) -> str:
+    # the interpreter a run actually uses, see `runner.build_command`
+    return str(runner.resolve_interpreter(interpreter) or sys.executable)
+
+
+def report_result(result: RunResult) -> bool:
+    """
+    Notifies the user of the outcome of a run and counts successful runs. Must be
+    called on the main thread.
+    """
+    if result.status == CANCELLED:  # stopped by the user, not a failure
+        Info_(result.message)
+        _log.info(_log_message(result))
+        return False
+
+    if not result.ok:
+        Error_(result.message)
+        _log.error(_log_message(result))
+        return False
+
+    message = "Script result reused from cache." if result.cached else result.message
+    Info_(message)
+    _log.info(message if result.cached else _log_message(result))
+    increment_execution_count(result.item[0])
+    return True
+
+
+def _log_message(result: RunResult) -> str:
+    # app.log points to the run's log instead of quoting its output
+    if result.log is None:
+        return result.message
+    if result.status == "failed" and result.returncode is not None:
+        return f"Script '{result.item[0]}' exited with code {result.returncode}. Output in '{result.log}'"
+    return f"{result.message} Output in '{result.log}'"
+
+
+def get_history() -> History:
+    """
+    Returns the run history in ~/.menuscript/history.sqlite3.
+    """
+    global _history
+    if _history is None:
+        _history = History(pathlib.Path(f"{paths.user_data_path}/history.sqlite3"))
+    return _history
+
+
+def get_run_stats(window: float | None = 7 * 24 * 3600, item: tuple | None = None) -> list:
+    """
+    Returns per-item run counts, failure rates and p50/p95/p99 durations in seconds
+    from the run history, as dicts, the most frequently run items first.
+
+    :param window: only runs started in the last `window` seconds; None for all.
+    :param item: only this item; all of them if None.
+    """
+    since = time.time() - window if window is not None else None
+    return get_history().stats(since=since, item=item[0] if item is not None else None)
+
+
+def get_run_logs() -> RunLogs:
+    """
+    Returns the per-run output logs in ~/.menuscript/runs, limited per item by
+    `(setting)[runs_keep](value)[count]` and `(setting)[runs_limit](value)[bytes]`.
+    """
+    global _run_logs
+    if _run_logs is None:
+        settings = get_store().settings
+        try:
+            keep = int(settings.get("runs_keep", runlogs.KEEP))
+            limit = int(settings.get("runs_limit", runlogs.LIMIT))
         except ValueError:
+            keep, limit = runlogs.KEEP, runlogs.LIMIT
+        _run_logs = RunLogs(pathlib.Path(f"{paths.user_data_path}/runs"), max(1, keep), limit)
+    return _run_logs
+
+
+def show_last_output(item: tuple) -> None:
+    """
+    Opens the output of the item's most recent run in the default text editor.
+    """
+    path = get_run_logs().latest(item[0])
+    if path is None:
+        Info_(f"Script '{item[0]}' has not been run yet.")
+        return
+
+    if path.suffix == ".gz":
+        target = pathlib.Path(f"{paths.user_data_path}/cache/last-output.log")
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(runlogs.read(path))
+        except OSError as e:
+            _log.error(f"Could not read run log '{path}' with error: '{str(e)}'")
+            Error_(f"Could not read run log '{path}' with error: '{str(e)}'")
+            return
+        path = target
+    subprocess.Popen(["open", "-t", str(path)])
+
+
+def get_stats(limit: int = 15) -> str:
+    """
+    Returns a summary of the runs in the run history, with their p50, p95 and p99
+    durations, CPU time and peak RSS, the most frequently run scripts first.
+
+    :param limit: maximum number of scripts listed.
+    """
+    stats = get_run_stats(window=None)
+    if not stats:
+        return "No runs recorded yet."
+
+    lines = []
+    for s in stats[:limit]:
+        failed = f", {s['failed']} failed" if s["failed"] else ""
+        resources = ""
+        if s["mean_cpu"] is not None:
+            resources += f", {s['mean_cpu']:.2f} s CPU"
+        if s["max_rss"] is not None:
+            resources += f", {s['max_rss'] / 2**20:.1f} MiB peak"
+        lines.append(
+            f"{s['item']}: {s['runs']} runs{failed}, {s['p50']:.2f} s p50, "
+            f"{s['p95']:.2f} s p95, {s['p99']:.2f} s p99{resources}"
+        )
+    return "\n".join(lines)
+
+
+def get_groups() -> dict:
+    """
+    Returns the valid run groups of the config by name. Groups with unknown
+    members or dependency cycles are logged and left out.
+    """
+    store = get_store()
+    groups = {}
+    for name, (members, parallel) in store.groups.items():
+        try:
+            group = parse_group(name, members, parallel)
+        except ValueError as e:
+            _log.error(f"Invalid group '{name}': {str(e)}")
             continue
-    
-    return None
 
-    
-    
+        missing = [member for member in group.members if member not in store]
+        if missing:
+            _log.error(f"Invalid group '{name}': no script named {', '.join(missing)}")
+            continue
+        groups[name] = group
+    return groups
+
+
+def run_group(name: str, on_done=None) -> GroupRun | None:
+    """
+    Runs the members of group `name` on the execution engine, each once all of its
+    dependencies succeeded and at most `(parallel)[n]` at a time. Members depending
+    on a failed one are cancelled. The user gets a single notification summing up
+    the group once it finished, followed by `on_done(group_run)`.
+
+    :param name: name of the group.
+    :param on_done: optional callback run on the main thread after the summary.
+    """
+    group = get_groups().get(name)
+    if group is None:
+        Error_(f"Could not run group '{name}', see the log for details.")
+        return None
+
+    def submit_member(member: str, finished) -> None:
+        item = _current_item(member)
+        if item is None:  # removed since the group started
+            finished(member, False)
+            return
+        get_engine().submit(item, partial(_finish_member, finished), control=new_control(item))
+
+    def done(group_run: GroupRun) -> None:
+        _log.info(group_run.summary())
+        if group_run.ok:
+            Info_(group_run.summary())
+        else:
+            Error_(group_run.summary())
+        if on_done is not None:
+            on_done(group_run)
+
+    _log.info(f"Running group '{name}' in order {group.order()}")
+    group_run = GroupRun(group, submit_member, done)
+    group_run.start()
+    return group_run
+
+
+def _finish_member(finished, handle: RunHandle) -> None:
+    result = handle.result
+    ok = isinstance(result, RunResult) and result.ok
+    if ok:
+        _log.info(f"Group member '{handle.item[0]}': {_log_message(result)}")
+        increment_execution_count(handle.item[0])
+    elif isinstance(result, RunResult):
+        _log.error(f"Group member '{handle.item[0]}': {_log_message(result)}")
+    else:
+        _log.error(f"Group member '{handle.item[0]}' could not be executed: '{str(result)}'")
+    finished(handle.item[0], ok)
+
+
+def _finish_run(handle: RunHandle) -> None:
+    if isinstance(handle.result, Exception):
+        handle.result = RunResult(
+            handle.item, False, f"Could not execute script with error: '{str(handle.result)}'", handle.result
+        )
+    report_result(handle.result)
+
+
+def get_global_interpreter() -> str:
+    """
+    Returns the interpreter items without one of their own run with, see
+    `runner.build_command`.
+    """
+    return sys.executable
+
+
 def open_config() -> None:
     """
     Opens the config file in the user's config file with the default text editor.
@@ -550,6 +1062,7 @@ def reset() -> None:
     """
     Remove script and config files from user home folder.
     """
+    get_store().discard()
     shutil.rmtree(paths.user_data_path)
     _log.info(f"{paths.user_data_path} removed.")
     Info_("Menuscript reset. Quitting...")
@@ -561,6 +1074,7 @@ def restart(self) -> None:
     """
     Restart MenuScript.
     """
+    flush_config()
     os.execl(
         pathlib.Path(sys.executable), os.path.abspath(__file__), *sys.argv
     )  # restarts the MenuScript
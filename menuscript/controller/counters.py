@@ -0,0 +1,190 @@
+# menuscript/controller/counters.py
+#
+# Execution counts, kept in memory and written to ~/.menuscript/.data.txt in the
+# background, e.g.
+#
+#   (executions)42
+#   (script)[Report](executions)[17]
+
+import re
+import threading
+from logger.logger import _log
+from controller import locks
+
+INTERVAL = 5.0  # seconds between writes of the data file at most
+
+_TOTAL = re.compile(r"^\(executions\)(\d+)\s*$")
+_SCRIPT = re.compile(r"^\(script\)\[(.*)\]\(executions\)\[(\d+)\]\s*$")
+
+
+def _apply(op: tuple, total: int, scripts: dict) -> int:
+    # applies one recorded change to counts read from the file; returns the total
+    if op[0] == "add":
+        _, name, count = op
+        if name is not None:
+            scripts[name] = scripts.get(name, 0) + count
+        return total + count
+    if op[0] == "rename":
+        _, name, new_name = op
+        if name in scripts:
+            scripts[new_name] = scripts.pop(name) + scripts.get(new_name, 0)
+    elif op[0] == "remove":
+        scripts.pop(op[1], None)
+    return total
+
+
+def parse(text: str) -> tuple:
+    """
+    Returns the total, the per-script counts and the other lines of a data file.
+    """
+    total = 0
+    scripts = {}
+    other = []
+    for line in text.splitlines():
+        match = _TOTAL.match(line)
+        if match is not None:
+            total = int(match.group(1))
+            continue
+        match = _SCRIPT.match(line)
+        if match is not None:
+            scripts[match.group(1)] = int(match.group(2))
+            continue
+        if line.strip():
+            other.append(line)
+    return total, scripts, other
+
+
+def render(total: int, scripts: dict, other: list) -> str:
+    lines = [f"(executions){total}"]
+    lines += [f"(script)[{name}](executions)[{count}]" for name, count in scripts.items()]
+    lines += other
+    return "\n".join(lines) + "\n"
+
+
+class Counters:
+    """
+    The number of successful runs, in total and per script. Changes only touch
+    memory and are recorded as operations; the data file is rewritten at most
+    every `interval` seconds, once for however many runs finished in between, and
+    by `flush` at shutdown. A write holds the file's lock, re-reads it and applies
+    the operations on top, so counts from other processes are never overwritten.
+    Lines of the data file it does not know are kept.
+
+    :param path: the data file.
+    :param interval: seconds between writes at most.
+    """
+
+    def __init__(self, path, interval: float = INTERVAL) -> None:
+        self.path = path
+        self.interval = interval
+        self.total = 0
+        self.writes = 0
+
+        self._scripts = {}
+        self._ops = []  # changes not written yet
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # keeps concurrent flushes in order
+
+    def __repr__(self) -> str:
+        return f"<Counters: total={self.total} scripts={len(self._scripts)}>"
+
+    def load(self) -> int:
+        """
+        Reads the counts from the data file. Returns the total, including changes
+        not written yet.
+        """
+        try:
+            total, scripts, _ = self._read()
+        except OSError as e:
+            _log.error(f"Could not read from data file with error: '{str(e)}'")
+            total, scripts = 0, {}
+        with self._lock:
+            for op in self._ops:
+                total = _apply(op, total, scripts)
+            self.total, self._scripts = total, scripts
+            return self.total
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._scripts.get(name, 0)
+
+    def increment(self, name: str | None = None) -> int:
+        """
+        Counts one successful run, of script `name` if given. Returns the new total.
+        """
+        with self._lock:
+            last = self._ops[-1] if self._ops else None
+            if last is not None and last[0] == "add" and last[1] == name:
+                self._ops[-1] = ("add", name, last[2] + 1)  # a burst is one operation
+            else:
+                self._ops.append(("add", name, 1))
+            self.total = _apply(("add", name, 1), self.total, self._scripts)
+            self._changed()
+            return self.total
+
+    def rename(self, name: str, new_name: str) -> None:
+        self._record(("rename", name, new_name))
+
+    def remove(self, name: str) -> None:
+        self._record(("remove", name))
+
+    def flush(self) -> bool:
+        """
+        Writes the changes now, if there are any. Returns False if writing failed;
+        the changes are then kept for the next attempt.
+        """
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                ops, self._ops = self._ops, []
+            if not ops:
+                return True
+
+            try:
+                with locks.locked(self.path):
+                    total, scripts, other = self._read()
+                    for op in ops:
+                        total = _apply(op, total, scripts)
+                    locks.atomic_write(self.path, render(total, scripts, other))
+            except (OSError, locks.Timeout) as e:
+                _log.error(f"Could not write to data file with error: '{str(e)}'")
+                with self._lock:
+                    self._ops = ops + self._ops
+                    self._changed()
+                return False
+
+            with self._lock:
+                # the file's counts plus whatever changed while it was written
+                for op in self._ops:
+                    total = _apply(op, total, scripts)
+                self.total, self._scripts = total, scripts
+            self.writes += 1
+            return True
+
+    def _record(self, op: tuple) -> None:
+        with self._lock:
+            self._ops.append(op)
+            self.total = _apply(op, self.total, self._scripts)
+            self._changed()
+
+    def _read(self) -> tuple:
+        try:
+            with open(self.path, "r") as f:
+                return parse(f.read())
+        except FileNotFoundError:
+            return 0, {}, []
+
+    def _changed(self) -> None:
+        # called with the lock held; one write per interval however many changes
+        if self._timer is None:
+            self._timer = threading.Timer(self.interval, self._flush_later)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_later(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.flush()
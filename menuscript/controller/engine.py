@@ -0,0 +1,176 @@
+# menuscript/controller/engine.py
+#
+# Runs scripts off the UI thread. Nothing in here may import rumps: completion
+# callbacks reach the UI through a `Dispatcher` drained by the menu's run loop.
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logger.logger import _log
+
+WORKERS = 4
+
+
+class Dispatcher:
+    """
+    Thread-safe queue of callbacks to be run on the main thread. Worker threads
+    `post`; the menu drains it from a `rumps.Timer`. Anything with a `post` method
+    can stand in for it, e.g. to run callbacks inline in headless tests.
+    """
+
+    def __init__(self) -> None:
+        self._queue = queue.SimpleQueue()
+
+    def post(self, fn, *args) -> None:
+        self._queue.put((fn, args))
+
+    def drain(self, limit: int | None = None) -> int:
+        """
+        Runs the queued callbacks in order on the calling thread and returns how many
+        ran. Errors are logged so one failing callback cannot stop the others.
+
+        :param limit: maximum number of callbacks to run in this call.
+        """
+        count = 0
+        while limit is None or count < limit:
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            count += 1
+            try:
+                fn(*args)
+            except Exception as e:
+                _log.error(f"Callback '{getattr(fn, '__name__', fn)}' failed with error: '{str(e)}'")
+        return count
+
+
+class RunHandle:
+    """
+    Handle on a submitted run, returned immediately by `ExecutionEngine.submit`.
+
+    :param run_id: id of the run, unique for the engine's lifetime.
+    :param item: the item being run.
+    :param options: keyword arguments passed to the runner with the item.
+    :param dispatcher: where done callbacks are posted; they are called directly
+                       if None.
+    """
+
+    def __init__(self, run_id: int, item: tuple, options: dict | None = None, dispatcher=None) -> None:
+        self.run_id = run_id
+        self.item = item
+        self.options = options or {}
+        self.dispatcher = dispatcher
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+
+        self._callbacks = []
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        state = "done" if self.done() else "running" if self.started else "queued"
+        return f"<RunHandle: {self.run_id} {self.item[0]!r} {state}>"
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float | None = None):
+        """
+        Blocks until the run finished and returns its result, or None on timeout.
+        Never call this from the main thread of the menu.
+        """
+        self._done.wait(timeout)
+        return self.result
+
+    def add_done_callback(self, fn) -> None:
+        """
+        Adds `fn(handle)` to be dispatched when the run finishes, or dispatches it
+        now if the run already finished.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        self._dispatch(fn)
+
+    def _finish(self) -> None:
+        # called by the worker once `result` is set
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            self._dispatch(fn)
+
+    def _dispatch(self, fn) -> None:
+        if self.dispatcher is None:
+            fn(self)
+        else:
+            self.dispatcher.post(fn, self)
+
+
+class ExecutionEngine:
+    """
+    Bounded pool of worker threads running scripts. `submit` returns at once; the
+    handle's done callbacks are posted to `dispatcher` when the run finishes.
+
+    :param runner: callable running one item to completion, returning its result.
+    :param dispatcher: object whose `post(fn, *args)` delivers callbacks to the
+                       main thread.
+    :param max_workers: maximum number of scripts running at the same time.
+    """
+
+    def __init__(self, runner, dispatcher, max_workers: int = WORKERS) -> None:
+        self.runner = runner
+        self.dispatcher = dispatcher
+        self.max_workers = max_workers
+
+        self._ids = itertools.count(1)
+        self._running = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="menuscript-run")
+
+    def submit(self, item: tuple, on_done=None, **options) -> RunHandle:
+        """
+        Queues `item` for execution and returns its handle immediately.
+
+        :param item: the item to run.
+        :param on_done: optional `fn(handle)` dispatched when the run finishes.
+        :param options: keyword arguments passed to the runner with the item.
+        """
+        handle = RunHandle(next(self._ids), item, options, self.dispatcher)
+        if on_done is not None:
+            handle.add_done_callback(on_done)
+
+        with self._lock:
+            self._running[handle.run_id] = handle
+
+        self._pool.submit(self._run, handle)
+        return handle
+
+    def running(self) -> list:
+        """
+        Returns the handles of runs that are queued or in progress.
+        """
+        with self._lock:
+            return list(self._running.values())
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, handle: RunHandle) -> None:
+        handle.started = time.time()
+        try:
+            handle.result = self.runner(handle.item, **handle.options)
+        except Exception as e:
+            _log.error(f"Run {handle.run_id} of '{handle.item[0]}' failed with error: '{str(e)}'")
+            handle.result = e
+        handle.finished = time.time()
+
+        with self._lock:
+            self._running.pop(handle.run_id, None)
+        handle._finish()
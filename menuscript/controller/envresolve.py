@@ -0,0 +1,143 @@
+# menuscript/controller/envresolve.py
+#
+# Works out what `source <venv>/bin/activate` would do to the environment for an
+# interpreter, without running a shell: the interpreter is then exec'd directly
+# with the resulting environment.
+
+import os
+import pathlib
+import threading
+from controller import pathcache
+
+
+class Environment:
+    """
+    The environment changes activating an interpreter's virtualenv or conda
+    environment would make. `sys.prefix` needs no help: it follows from running
+    the environment's own interpreter, as long as `PYTHONHOME` is not set.
+
+    :param interpreter: path of the interpreter.
+    :param kind: `venv`, `conda` or `system`.
+    :param prefix: root of the environment, or None for a system interpreter.
+    :param set: variables to set.
+    :param unset: variables to remove.
+    :param bin_dir: directory prepended to `PATH`, or None.
+    """
+
+    __slots__ = ("interpreter", "kind", "prefix", "set", "unset", "bin_dir")
+
+    def __init__(
+        self,
+        interpreter: str,
+        kind: str,
+        prefix: str | None,
+        set: dict,
+        unset: tuple,
+        bin_dir: str | None,
+    ) -> None:
+        self.interpreter = interpreter
+        self.kind = kind
+        self.prefix = prefix
+        self.set = set
+        self.unset = unset
+        self.bin_dir = bin_dir
+
+    def __repr__(self) -> str:
+        return f"<Environment: {self.kind} {self.prefix!r}>"
+
+    def apply(self, base: dict | None = None) -> dict:
+        """
+        Returns a copy of `base`, by default `os.environ`, with the environment
+        activated.
+        """
+        env = dict(os.environ if base is None else base)
+        for name in self.unset:
+            env.pop(name, None)
+        env.update(self.set)
+        if self.bin_dir is not None:
+            path = [entry for entry in env.get("PATH", os.defpath).split(os.pathsep) if entry != self.bin_dir]
+            env["PATH"] = os.pathsep.join([self.bin_dir, *path])
+        return env
+
+
+def _resolve(interpreter: str) -> Environment:
+    info = pathcache.lookup(interpreter)
+    prefix = info.venv_root
+    if prefix is None:
+        return Environment(interpreter, "system", None, {}, (), None)
+
+    root = pathlib.Path(prefix)
+    bin_dir = str(pathlib.Path(interpreter).parent)
+    if root.joinpath("pyvenv.cfg").is_file():
+        # what bin/activate exports, and what it undoes
+        return Environment(
+            interpreter,
+            "venv",
+            prefix,
+            {"VIRTUAL_ENV": prefix},
+            ("PYTHONHOME", "CONDA_PREFIX", "CONDA_DEFAULT_ENV"),
+            bin_dir,
+        )
+
+    return Environment(
+        interpreter,
+        "conda",
+        prefix,
+        {"CONDA_PREFIX": prefix, "CONDA_DEFAULT_ENV": root.name},
+        ("PYTHONHOME", "VIRTUAL_ENV"),
+        bin_dir,
+    )
+
+
+class EnvironmentCache:
+    """
+    Resolves and caches the `Environment` of interpreters. An entry is recomputed
+    only when the interpreter's mtime changes, e.g. when the environment is
+    recreated.
+    """
+
+    def __init__(self) -> None:
+        self.resolved = 0
+        self._entries = {}  # interpreter -> (mtime, Environment)
+        self._lock = threading.Lock()
+
+    def resolve(self, interpreter) -> Environment:
+        interpreter = str(interpreter)
+        mtime = pathcache.lookup(interpreter).mtime
+
+        with self._lock:
+            entry = self._entries.get(interpreter)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+
+        environment = _resolve(interpreter)
+        with self._lock:
+            self._entries[interpreter] = (mtime, environment)
+            self.resolved += 1
+        return environment
+
+    def invalidate(self, interpreter=None) -> None:
+        with self._lock:
+            if interpreter is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(interpreter), None)
+
+
+_cache = EnvironmentCache()
+
+
+def resolve(interpreter) -> Environment:
+    return _cache.resolve(interpreter)
+
+
+def environment(interpreter) -> dict:
+    """
+    Returns the environment to run `interpreter` with: the current environment
+    with the interpreter's virtualenv or conda environment activated.
+    """
+    return _cache.resolve(interpreter).apply()
+
+
+def invalidate(interpreter=None) -> None:
+    _cache.invalidate(interpreter)
@@ -0,0 +1,243 @@
+# menuscript/controller/forkserver.py
+#
+# Client side of the fork servers in resources/data/forkserver/main.py. A server is
+# started per interpreter, imports the modules listed by the items opting in with
+# `(forkserver)[module, ...]`, and forks a child for each run of those items.
+
+import array
+import hashlib
+import json
+import os
+import pathlib
+import socket
+import subprocess
+import threading
+import time
+from logger.logger import _log
+from controller import envresolve
+from controller.capture import Capture
+from controller.usage import Usage, max_rss_bytes
+
+RESTART_DELAY = 30.0  # seconds before a server that died is started again
+
+
+class ForkServerError(RuntimeError):
+    """
+    A run could not be handed to a fork server, or the server went away during it.
+
+    :param message: what went wrong.
+    :param started: whether the script had been started; only runs that were not
+                    may be retried without the fork server.
+    """
+
+    def __init__(self, message: str, started: bool = False) -> None:
+        self.started = started
+        super().__init__(message)
+
+
+def parse_modules(value: str) -> tuple:
+    """
+    Returns the module names of a `(forkserver)[pandas, requests]` option.
+    """
+    return tuple(name for name in value.replace(",", " ").split() if name)
+
+
+class ForkServer:
+    """
+    One warm server process for `interpreter`. `start` returns immediately; the
+    server is `ready` once it imported its modules and listens on its socket.
+
+    :param interpreter: path of the python interpreter running the server.
+    :param modules: names of the modules imported before the first fork.
+    :param script: path of the server script.
+    :param run_dir: directory holding the server's socket and log.
+    """
+
+    def __init__(self, interpreter: str, modules: tuple, script: pathlib.Path, run_dir: pathlib.Path) -> None:
+        self.interpreter = interpreter
+        self.modules = modules
+
+        key = hashlib.blake2b(f"{interpreter}\0{' '.join(modules)}".encode(), digest_size=8).hexdigest()
+        self.script = script
+        self.socket_path = run_dir.joinpath(f"{key}.sock")
+        self.log_path = run_dir.joinpath(f"{key}.log")
+
+        self.started = None
+        self._process = None
+        self._ready = threading.Event()
+
+    def __repr__(self) -> str:
+        return f"<ForkServer: {self.interpreter!r} modules={list(self.modules)} ready={self.ready}>"
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set() and self.alive
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        self.started = time.monotonic()
+        self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        with open(self.log_path, "ab") as log:
+            self._process = subprocess.Popen(
+                [self.interpreter, str(self.script), str(self.socket_path), *self.modules],
+                stdin=subprocess.PIPE,  # closed by us, or by the OS when the app exits
+                stdout=subprocess.PIPE,
+                stderr=log,
+                cwd=self.socket_path.parent,
+                env=envresolve.environment(self.interpreter),
+            )
+        _log.info(f"Starting fork server for '{self.interpreter}' with modules {list(self.modules)}")
+        threading.Thread(target=self._wait_ready, name="forkserver-start", daemon=True).start()
+
+    def run(self, argv: list, cwd, capture: Capture, on_start=None) -> int:
+        """
+        Runs `argv` in a child forked from the server, streaming its output into
+        `capture`, and returns its exit code once it exited.
+
+        :param argv: the script followed by its arguments, as `sys.argv`.
+        :param cwd: working directory of the script.
+        :param capture: receives the script's stdout and stderr.
+        :param on_start: optional `fn(pid)` called once the child was forked.
+        """
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        stdin = os.open(os.devnull, os.O_RDONLY)
+        request = json.dumps({"argv": [str(arg) for arg in argv], "cwd": str(cwd)}) + "\n"
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(self.socket_path))
+            sock.sendmsg(
+                [request.encode("utf-8")],
+                [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", [stdin, out_w, err_w]))],
+            )
+        except OSError as e:
+            sock.close()
+            os.close(out_r)
+            os.close(err_r)
+            raise ForkServerError(f"Could not reach fork server: '{str(e)}'")
+        finally:
+            # the child holds its own copies; ours must go so the pipes reach EOF
+            for fd in (stdin, out_w, err_w):
+                os.close(fd)
+
+        capture.attach(out_r, err_r)
+        with sock, sock.makefile("rb") as replies:
+            pid = _reply(replies, b"pid")
+            if pid is None:
+                capture.finish(None)
+                raise ForkServerError("Fork server refused the run.")
+            if on_start is not None:
+                on_start(pid)
+
+            exit = _reply(replies, b"exit", 4)
+            if exit is None:
+                capture.finish(None)
+                raise ForkServerError("Fork server exited during the run.", started=True)
+
+            returncode, user, system, max_rss = exit
+            usage = Usage(time.perf_counter() - capture.started, user, system, max_rss_bytes(int(max_rss)))
+            return capture.finish(int(returncode), usage)
+
+    def close(self) -> None:
+        if self._process is not None and self._process.poll() is None:
+            self._process.stdin.close()  # the server exits on EOF
+            try:
+                self._process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        self.socket_path.unlink(missing_ok=True)
+        self._process = None
+        self._ready.clear()
+
+    def _wait_ready(self) -> None:
+        process = self._process
+        line = process.stdout.readline()
+        if line.strip() == b"ready":
+            self._ready.set()
+            _log.info(f"Fork server for '{self.interpreter}' ready after {time.monotonic() - self.started:.2f} s")
+        else:
+            _log.error(f"Fork server for '{self.interpreter}' failed to start, see '{self.log_path}'")
+        process.stdout.close()
+
+
+def _reply(replies, keyword: bytes, fields: int = 1):
+    # `<keyword> <value> ...`; returns the value, or a list of `fields` values
+    line = replies.readline().split()
+    if len(line) != fields + 1 or line[0] != keyword:
+        return None
+    if fields == 1:
+        return int(line[1])
+    return [float(value) for value in line[1:]]
+
+
+class ForkServerPool:
+    """
+    The fork servers of all interpreters used by items that opt in. Servers are
+    started in the background; until one is ready `get` returns None and the run
+    falls back to a plain subprocess.
+
+    :param script: path of the server script.
+    :param run_dir: directory holding the servers' sockets and logs.
+    """
+
+    def __init__(self, script: pathlib.Path, run_dir: pathlib.Path) -> None:
+        self.script = script
+        self.run_dir = run_dir
+
+        self._servers = {}  # interpreter -> ForkServer
+        self._lock = threading.Lock()
+
+    def configure(self, wanted: dict) -> None:
+        """
+        Starts, restarts or stops servers so that there is exactly one per
+        interpreter in `wanted`, preloading the modules given for it.
+
+        :param wanted: dict of interpreter path to a tuple of module names.
+        """
+        with self._lock:
+            for interpreter in list(self._servers):
+                server = self._servers[interpreter]
+                if wanted.get(interpreter) != server.modules:
+                    server.close()
+                    del self._servers[interpreter]
+
+            for interpreter, modules in wanted.items():
+                if interpreter not in self._servers:
+                    self._start(interpreter, modules)
+
+    def get(self, interpreter: str) -> ForkServer | None:
+        """
+        Returns the ready server of `interpreter`, or None. A server that died is
+        started again, at most once every `RESTART_DELAY` seconds.
+        """
+        with self._lock:
+            server = self._servers.get(interpreter)
+            if server is None:
+                return None
+            if server.ready:
+                return server
+
+            if not server.alive and time.monotonic() - server.started > RESTART_DELAY:
+                _log.info(f"Restarting fork server for '{interpreter}'")
+                server.close()
+                self._start(interpreter, server.modules)
+            return None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for server in self._servers.values():
+                server.close()
+            self._servers.clear()
+
+    def _start(self, interpreter: str, modules: tuple) -> None:
+        server = ForkServer(interpreter, modules, self.script, self.run_dir)
+        self._servers[interpreter] = server
+        try:
+            server.start()
+        except Exception as e:
+            _log.error(f"Could not start fork server for '{interpreter}' with error: '{str(e)}'")
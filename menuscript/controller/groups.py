@@ -0,0 +1,186 @@
+# menuscript/controller/groups.py
+#
+# Named groups of items run together, declared in the config as
+# `(group)[Morning](members)[fetch; build: fetch; report: fetch, build](parallel)[3]`,
+# where `item: a, b` means the item only starts once `a` and `b` succeeded.
+
+
+class Group:
+    """
+    A named set of items and the dependencies between them.
+
+    :param name: name of the group.
+    :param members: dict of item name to the names of the items it depends on, in
+                    the order they were declared.
+    :param parallel: maximum number of members running at the same time, or None
+                     for no limit beyond the execution engine's.
+    """
+
+    __slots__ = ("name", "members", "parallel")
+
+    def __init__(self, name: str, members: dict, parallel: int | None = None) -> None:
+        self.name = name
+        self.members = members
+        self.parallel = parallel
+
+    def __repr__(self) -> str:
+        return f"<Group: {self.name!r} {list(self.members)}>"
+
+    def order(self) -> list:
+        """
+        Returns the members in a topological order, dependencies first. Raises
+        ValueError if a dependency is not a member or the dependencies form a cycle.
+        """
+        for name, deps in self.members.items():
+            for dep in deps:
+                if dep not in self.members:
+                    raise ValueError(f"'{name}' depends on '{dep}', which is not in the group")
+
+        waiting = {name: len(deps) for name, deps in self.members.items()}
+        dependents = self.dependents()
+        ready = [name for name, count in waiting.items() if count == 0]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for dependent in dependents[name]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(order) != len(self.members):
+            cycle = sorted(name for name, count in waiting.items() if count)
+            raise ValueError(f"dependency cycle between {', '.join(cycle)}")
+        return order
+
+    def dependents(self) -> dict:
+        """
+        Returns a dict of member name to the members depending on it directly.
+        """
+        dependents = {name: [] for name in self.members}
+        for name, deps in self.members.items():
+            for dep in deps:
+                dependents[dep].append(name)
+        return dependents
+
+
+def parse_group(name: str, members: str, parallel: str = "") -> Group:
+    """
+    Builds a group from the values of a `(group)[name](members)[...](parallel)[n]`
+    line. Members are separated by `;`, each optionally followed by `:` and the
+    comma separated names of the members it depends on. Raises ValueError if the
+    line is malformed.
+    """
+    parsed = {}
+    for member in members.split(";"):
+        member_name, _, deps = member.partition(":")
+        member_name = member_name.strip()
+        if not member_name:
+            continue
+        if member_name in parsed:
+            raise ValueError(f"'{member_name}' is listed twice")
+        parsed[member_name] = tuple(dep.strip() for dep in deps.split(",") if dep.strip())
+
+    if not parsed:
+        raise ValueError("a group needs at least one member")
+
+    limit = int(parallel) if parallel.strip() else None
+    if limit is not None and limit < 1:
+        raise ValueError("parallel must be at least 1")
+
+    group = Group(name, parsed, limit)
+    group.order()
+    return group
+
+
+class GroupRun:
+    """
+    One run of a group. Members start as soon as all their dependencies succeeded,
+    up to the group's parallel limit; when a member fails, everything depending on
+    it, directly or not, is cancelled. Not thread-safe: `start` and the completion
+    callbacks must all run on the same thread, e.g. the menu's main thread.
+
+    :param group: the group to run.
+    :param submit: `fn(name, on_done)` starting member `name` without blocking and
+                   calling `on_done(name, ok)` once it finished.
+    :param on_done: called with this object once every member finished or was
+                    cancelled.
+    """
+
+    def __init__(self, group: Group, submit, on_done=None) -> None:
+        self.group = group
+        self.submit = submit
+        self.on_done = on_done
+
+        self.succeeded = []
+        self.failed = []
+        self.cancelled = []
+        self.running = set()
+
+        self._dependents = group.dependents()
+        self._waiting = {name: len(deps) for name, deps in group.members.items()}
+        self._ready = [name for name in group.order() if not group.members[name]]
+        self._finished = False
+
+    def __repr__(self) -> str:
+        return (
+            f"<GroupRun: {self.group.name!r} succeeded={len(self.succeeded)} "
+            f"failed={len(self.failed)} cancelled={len(self.cancelled)} running={len(self.running)}>"
+        )
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed and not self.cancelled
+
+    def start(self) -> None:
+        self._fill()
+
+    def summary(self) -> str:
+        parts = [f"{len(self.succeeded)} succeeded"]
+        if self.failed:
+            parts.append(f"{len(self.failed)} failed ({', '.join(self.failed)})")
+        if self.cancelled:
+            parts.append(f"{len(self.cancelled)} cancelled ({', '.join(self.cancelled)})")
+        return f"Group '{self.group.name}': {', '.join(parts)}."
+
+    def finished(self, name: str, ok: bool) -> None:
+        """
+        Records the outcome of member `name` and starts whatever it unblocked.
+        """
+        self.running.discard(name)
+
+        if ok:
+            self.succeeded.append(name)
+            for dependent in self._dependents[name]:
+                if self._waiting[dependent] is None:  # cancelled by another dependency
+                    continue
+                self._waiting[dependent] -= 1
+                if self._waiting[dependent] == 0:
+                    self._ready.append(dependent)
+        else:
+            self.failed.append(name)
+            self._cancel(name)
+
+        self._fill()
+
+    def _cancel(self, name: str) -> None:
+        stack = list(self._dependents[name])
+        while stack:
+            dependent = stack.pop()
+            if dependent in self.cancelled or self._waiting.get(dependent) is None:
+                continue
+            self._waiting[dependent] = None  # never becomes ready
+            self.cancelled.append(dependent)
+            stack.extend(self._dependents[dependent])
+
+    def _fill(self) -> None:
+        limit = self.group.parallel or len(self.group.members)
+        while self._ready and len(self.running) < limit:
+            name = self._ready.pop(0)
+            self.running.add(name)
+            self.submit(name, self.finished)
+
+        if not self.running and not self._ready and not self._finished:
+            self._finished = True
+            if self.on_done is not None:
+                self.on_done(self)
@@ -0,0 +1,207 @@
+# menuscript/controller/history.py
+#
+# Every run, recorded in ~/.menuscript/history.sqlite3: one row per run with its
+# item, start time, duration, status, exit code, CPU time, peak RSS and output sizes.
+
+import math
+import pathlib
+import queue
+import sqlite3
+import threading
+from logger.logger import _log
+
+BATCH = 256  # rows written per transaction at most
+LINGER = 1.0  # seconds a row may wait for others to be written with it
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    item TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    status TEXT NOT NULL,
+    returncode INTEGER,
+    cpu REAL,
+    max_rss INTEGER,
+    stdout_bytes INTEGER NOT NULL,
+    stderr_bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_item ON runs (item, started);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+"""
+
+_INSERT = (
+    "INSERT INTO runs (item, started, duration, status, returncode, cpu, max_rss, stdout_bytes, stderr_bytes) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_STOP = object()
+
+
+def percentile(values: list, p: float) -> float | None:
+    """
+    Returns the `p`th percentile of the sorted `values` by the nearest-rank method,
+    or None if there are none.
+    """
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class History:
+    """
+    Run history in a SQLite database in WAL mode. `record` only queues the row; a
+    writer thread inserts queued rows in batches of up to `BATCH`, waiting up to
+    `linger` seconds for more to arrive, so recording adds nothing to a run's
+    latency. Queries open their own connection and do not wait for the writer.
+
+    :param path: the database file.
+    :param linger: seconds the writer waits to batch rows.
+    """
+
+    def __init__(self, path: pathlib.Path, linger: float = LINGER) -> None:
+        self.path = pathlib.Path(path)
+        self.linger = linger
+        self.written = 0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<History: {str(self.path)!r} written={self.written}>"
+
+    def record(
+        self,
+        item: str,
+        started: float,
+        duration: float,
+        status: str,
+        returncode: int | None = None,
+        cpu: float | None = None,
+        max_rss: int | None = None,
+        stdout_bytes: int = 0,
+        stderr_bytes: int = 0,
+    ) -> None:
+        """
+        Queues one run to be written.
+
+        :param started: start time as a Unix timestamp.
+        :param duration: wall time in seconds.
+        :param status: `ok`, `failed`, `timeout` or `cancelled`.
+        """
+        self._start()
+        self._queue.put((item, started, duration, status, returncode, cpu, max_rss, stdout_bytes, stderr_bytes))
+
+    def close(self) -> None:
+        """
+        Writes the queued rows and stops the writer thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def stats(self, since: float | None = None, until: float | None = None, item: str | None = None) -> list:
+        """
+        Returns per-item dicts with the number of runs and failures, the failure
+        rate, the p50, p95 and p99 durations, the mean CPU time and the peak RSS of
+        the runs started in the given window, the items with the most runs first.
+        CPU time and RSS are None if no run recorded them. Rows still queued are
+        not included.
+
+        :param since: earliest start time as a Unix timestamp, or None.
+        :param until: latest start time as a Unix timestamp, or None.
+        :param item: only this item, or all of them if None.
+        """
+        clauses, params = [], []
+        for clause, value in (("started >= ?", since), ("started < ?", until), ("item = ?", item)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        if not self.path.exists():
+            return []
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f"SELECT item, duration, status, cpu, max_rss FROM runs {where} ORDER BY item, duration", params
+            ).fetchall()
+        finally:
+            connection.close()
+
+        durations = {}
+        failures = {}
+        cpus = {}
+        rss = {}
+        for name, duration, status, cpu, max_rss in rows:
+            durations.setdefault(name, []).append(duration)
+            failures[name] = failures.get(name, 0) + (status != "ok")
+            if cpu is not None:
+                cpus.setdefault(name, []).append(cpu)
+            if max_rss is not None:
+                rss[name] = max(rss.get(name, 0), max_rss)
+
+        stats = []
+        for name, values in durations.items():
+            stats.append(
+                {
+                    "item": name,
+                    "runs": len(values),
+                    "failed": failures[name],
+                    "failure_rate": failures[name] / len(values),
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "p99": percentile(values, 99),
+                    "mean_cpu": sum(cpus[name]) / len(cpus[name]) if name in cpus else None,
+                    "max_rss": rss.get(name),
+                }
+            )
+        return sorted(stats, key=lambda s: s["runs"], reverse=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name="history", daemon=True)
+                self._thread.start()
+
+    def _write_loop(self) -> None:
+        try:
+            connection = self._connect()
+        except sqlite3.Error as e:
+            _log.error(f"Could not open run history with error: '{str(e)}'")
+            connection = None
+
+        stop = False
+        while not stop:
+            rows = [self._queue.get()]
+            try:
+                while len(rows) < BATCH:
+                    rows.append(self._queue.get(timeout=self.linger))
+            except queue.Empty:
+                pass
+
+            if _STOP in rows:
+                stop = True
+                rows = [row for row in rows if row is not _STOP]
+            if not rows or connection is None:
+                continue
+            try:
+                with connection:
+                    connection.executemany(_INSERT, rows)
+                self.written += len(rows)
+            except sqlite3.Error as e:
+                _log.error(f"Could not record {len(rows)} runs with error: '{str(e)}'")
+
+        if connection is not None:
+            connection.close()
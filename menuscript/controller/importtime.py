@@ -0,0 +1,147 @@
+# menuscript/controller/importtime.py
+#
+# Support for "Run with import timing": the script runs with `-X importtime`, which
+# makes the interpreter write one line per import to stderr, e.g.
+#
+#   import time: self [us] | cumulative | imported package
+#   import time:       512 |        512 |     _io
+#   import time:      1290 |     184220 | pandas
+#
+# Those lines are split from the script's own stderr as it streams, written to a
+# file as the full tree and ranked by cumulative time.
+
+import pathlib
+
+PREFIX = b"import time:"
+TOP = 3  # imports named in the notification
+LIMIT = 25  # imports listed in the stored summary
+
+
+class Import:
+    """
+    One line of the `-X importtime` tree.
+
+    :param name: the imported module.
+    :param self_us: microseconds spent in the module itself.
+    :param cumulative_us: microseconds including the modules it imported.
+    :param depth: nesting level in the tree, 0 for imports done by the script.
+    """
+
+    __slots__ = ("name", "self_us", "cumulative_us", "depth")
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, depth: int) -> None:
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+    def __repr__(self) -> str:
+        return f"<Import: {self.name!r} cumulative={self.cumulative_us}us>"
+
+
+def parse_line(line: bytes) -> Import | None:
+    """
+    Parses one `import time:` line, or returns None for the header or anything
+    malformed.
+    """
+    fields = line[len(PREFIX) :].decode("utf-8", errors="replace").split("|")
+    if len(fields) != 3:
+        return None
+    try:
+        self_us = int(fields[0])
+        cumulative_us = int(fields[1])
+    except ValueError:  # the header
+        return None
+    name = fields[2].rstrip()
+    # one space after the separator, then two more per nesting level
+    depth = (len(name) - len(name.lstrip()) - 1) // 2
+    return Import(name.strip(), self_us, cumulative_us, max(depth, 0))
+
+
+class ImportTimeFilter:
+    """
+    Splits the `-X importtime` lines from a stderr stream. They are written to
+    `path` and parsed into `records`; everything else is passed on unchanged, so
+    the script's real stderr is captured as usual. Only the start of a line is held
+    back, and only while it could still become an `import time:` line.
+
+    :param path: file the full import tree is written to.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = pathlib.Path(path)
+        self.records = []
+
+        self._pending = b""
+        self._tree = None
+
+    def write(self, chunk: bytes, forward) -> None:
+        """
+        Takes the next chunk of the stream; `forward(data)` receives the bytes that
+        are not import timings.
+        """
+        data = self._pending + chunk
+        self._pending = b""
+        start = 0
+        while start < len(data):
+            end = data.find(b"\n", start)
+            if end == -1:
+                rest = data[start:]
+                if rest.startswith(PREFIX) or PREFIX.startswith(rest):
+                    self._pending = rest  # may be an import line, wait for its end
+                else:
+                    forward(rest)
+                return
+            line = data[start : end + 1]
+            if line.startswith(PREFIX):
+                self._record(line)
+            else:
+                forward(line)
+            start = end + 1
+
+    def flush(self, forward) -> None:
+        """
+        Handles the end of the stream, then closes the tree file.
+        """
+        if self._pending:
+            if self._pending.startswith(PREFIX):
+                self._record(self._pending)
+            else:
+                forward(self._pending)
+            self._pending = b""
+        if self._tree is not None:
+            self._tree.close()
+            self._tree = None
+
+    def _record(self, line: bytes) -> None:
+        if self._tree is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._tree = open(self.path, "wb")
+        self._tree.write(line)
+        record = parse_line(line.rstrip(b"\n"))
+        if record is not None:
+            self.records.append(record)
+
+
+def rank(records: list, limit: int = LIMIT) -> list:
+    """
+    Returns the `limit` imports with the highest cumulative time, slowest first.
+    """
+    return sorted(records, key=lambda record: record.cumulative_us, reverse=True)[:limit]
+
+
+def format_summary(records: list, limit: int = LIMIT) -> str:
+    """
+    Returns the ranked summary stored next to the tree, one import per line.
+    """
+    lines = [f"{'cumulative':>12} {'self':>10}  module"]
+    for record in rank(records, limit):
+        lines.append(f"{record.cumulative_us / 1000:>9.1f} ms {record.self_us / 1000:>7.1f} ms  {record.name}")
+    return "\n".join(lines) + "\n"
+
+
+def headline(records: list, top: int = TOP) -> str:
+    """
+    Returns the slowest imports for a notification, e.g. `pandas 812 ms, numpy 240 ms`.
+    """
+    return ", ".join(f"{record.name} {record.cumulative_us / 1000:.0f} ms" for record in rank(records, top))
@@ -0,0 +1,181 @@
+# menuscript/controller/items.py
+#
+# The script items shown in the menu, and an ordered index of them by name and id.
+
+import itertools
+
+_ids = itertools.count(1)
+
+
+class ScriptItem:
+    """
+    One script item of the config. It behaves like the `(name, source, interpreter)`
+    tuple items used to be, so it can be unpacked, indexed and compared with one,
+    and carries an `id` that stays the same across edits of the item, so the menu
+    can follow it when it is renamed. Items are not changed in place; `replace`
+    returns an edited copy with the same id.
+
+    :param name: name shown in the menu.
+    :param source: path of the script.
+    :param interpreter: path of the interpreter, or None for the global one.
+    :param id: id of the item this one replaces, or None for a new item.
+    """
+
+    __slots__ = ("id", "name", "source", "interpreter")
+
+    def __init__(self, name: str, source: str, interpreter: str | None = None, id: int | None = None) -> None:
+        self.id = next(_ids) if id is None else id
+        self.name = name
+        self.source = source
+        self.interpreter = interpreter
+
+    def __repr__(self) -> str:
+        return f"<ScriptItem: #{self.id} {self.name!r}>"
+
+    def __iter__(self):
+        yield self.name
+        yield self.source
+        yield self.interpreter
+
+    def __len__(self) -> int:
+        return 3
+
+    def __getitem__(self, i):
+        if i == 0:
+            return self.name
+        if i == 1:
+            return self.source
+        if i == 2 or i == -1:
+            return self.interpreter
+        return (self.name, self.source, self.interpreter)[i]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ScriptItem):
+            return self.name == other.name and self.source == other.source and self.interpreter == other.interpreter
+        if isinstance(other, tuple):
+            return (self.name, self.source, self.interpreter) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.source, self.interpreter))
+
+    def __reduce__(self):
+        # ids are only meaningful within one process; unpickled items get new ones
+        return ScriptItem, (self.name, self.source, self.interpreter)
+
+    def replace(self, **changes) -> "ScriptItem":
+        """
+        Returns a copy of the item with the given fields changed and the same id.
+        """
+        return ScriptItem(
+            changes.get("name", self.name),
+            changes.get("source", self.source),
+            changes.get("interpreter", self.interpreter),
+            self.id,
+        )
+
+
+class ItemIndex:
+    """
+    The items shown in the menu, in order, indexed by id and by name. Looking an
+    item up, adding, replacing and removing one are O(1); iterating yields them in
+    menu order. An item replaced by one with the same id keeps its position.
+
+    :param items: `ScriptItem`s or `(name, source, interpreter)` tuples.
+    """
+
+    def __init__(self, items=()) -> None:
+        self._items = {}  # id -> item, in menu order
+        self._names = {}  # name -> id of the first item with that name
+        self._repeated = set()  # names given to more than one item
+        for item in items:
+            self.add(item)
+
+    def __repr__(self) -> str:
+        return f"<ItemIndex: {len(self._items)} items>"
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item) -> bool:
+        found = self.get(item[0])
+        return found is not None and found == item
+
+    def get(self, name: str) -> ScriptItem | None:
+        """
+        Returns the item called `name`, or None if there is none.
+        """
+        id = self._names.get(name)
+        return None if id is None else self._items[id]
+
+    def by_id(self, id: int) -> ScriptItem | None:
+        return self._items.get(id)
+
+    def add(self, item) -> ScriptItem:
+        """
+        Appends `item`, converted to a `ScriptItem` if needed, and returns it.
+        """
+        if not isinstance(item, ScriptItem):
+            item = ScriptItem(*item)
+        self._items[item.id] = item
+        self._name(item)
+        return item
+
+    def replace(self, item: ScriptItem) -> None:
+        """
+        Puts `item` in the place of the item with the same id.
+        """
+        old = self._items[item.id]
+        self._items[item.id] = item
+        if old.name != item.name:
+            self._unname(old)
+            self._name(item)
+
+    def remove(self, item) -> None:
+        """
+        Removes the item with the id of `item`, or with its name if it is a tuple.
+        """
+        if not isinstance(item, ScriptItem):
+            item = self.get(item[0])
+            if item is None:
+                return
+        old = self._items.pop(item.id, None)
+        if old is not None:
+            self._unname(old)
+
+    def sync(self, items: list, renamed: list = ()) -> "ItemIndex":
+        """
+        Returns an index of `items`, as read from the config again, where each item
+        keeps the id of the current item with the same name, and unchanged items are
+        the same objects. Items in `renamed`, pairs of the current item and the one
+        it was renamed to as returned by `watcher.diff_items`, keep their id too.
+        """
+        renames = {new[0]: old[0] for old, new in renamed}
+        index = ItemIndex()
+        for item in items:
+            current = self.get(renames.get(item[0], item[0]))
+            if current is None or current.id in index._items:
+                index.add(item)
+            elif current == item:
+                index.add(current)
+            else:
+                index.add(ScriptItem(*item, id=current.id))
+        return index
+
+    def _name(self, item: ScriptItem) -> None:
+        if self._names.setdefault(item.name, item.id) != item.id:
+            self._repeated.add(item.name)
+
+    def _unname(self, item: ScriptItem) -> None:
+        if self._names.get(item.name) != item.id:
+            return
+        del self._names[item.name]
+        if item.name not in self._repeated:
+            return
+        # names are only repeated in a config the user was warned about
+        other = next((other for other in self._items.values() if other.name == item.name), None)
+        if other is not None:
+            self._names[item.name] = other.id
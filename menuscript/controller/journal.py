@@ -0,0 +1,98 @@
+# menuscript/controller/journal.py
+
+import json
+import os
+import pathlib
+from logger.logger import _log
+
+OPS = ("add", "remove", "rename", "set-source", "set-interpreter")
+
+
+class Journal:
+    """
+    Append-only log of config mutations, one JSON array per line, e.g.
+    `["rename", "Old name", "New name"]`. Each record is fsynced before `append`
+    returns, so an edit is durable without rewriting the config file. A record torn
+    by a crash is ignored on replay.
+
+    :param path: path of the journal file, next to the config file.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = pathlib.Path(path)
+        self._file = None
+
+    def append(self, op: str, *args) -> None:
+        """
+        Appends one mutation record and syncs it to disk.
+
+        :param op: one of `OPS`.
+        :param args: the mutation's arguments, e.g. the item name and new value.
+        """
+        if op not in OPS:
+            raise ValueError(f"Unknown journal operation '{op}'")
+
+        if self._file is not None and self._replaced():
+            self.close()  # another process folded it into the config meanwhile
+
+        if self._file is None:
+            self._file = open(self.path, "a+b")
+            self._file.seek(0, os.SEEK_END)
+            if self._file.tell():
+                self._file.seek(-1, os.SEEK_END)
+                if self._file.read(1) != b"\n":  # terminate a record torn by a crash
+                    self._file.write(b"\n")
+
+        self._file.write(json.dumps([op, *args]).encode("utf-8") + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _replaced(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return not os.path.samestat(st, os.fstat(self._file.fileno()))
+
+    def records(self):
+        """
+        Yields the `(op, args)` records in the order they were appended. Lines that
+        cannot be decoded are skipped and logged.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+
+        with f:
+            for lineno, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                    if record[0] not in OPS:
+                        raise ValueError(f"unknown operation '{record[0]}'")
+                except Exception as e:
+                    if line.strip():
+                        _log.error(f"Skipping journal record {lineno} with error: '{str(e)}'")
+                    continue
+                yield record[0], record[1:]
+
+    def size(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def clear(self) -> None:
+        """
+        Removes the journal once its records have been folded into the config file.
+        """
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,65 @@
+# menuscript/controller/locks.py
+#
+# Cross-process locking of the files in ~/.menuscript that are rewritten in place,
+# so two running instances, or a scheduled run and an edit in the app, never lose
+# each other's changes. Each file gets a `<file>.lock` next to it; writers take it
+# around their read-merge-replace cycle only.
+
+import contextlib
+import os
+import pathlib
+import tempfile
+import threading
+from filelock import FileLock, Timeout
+
+TIMEOUT = 10.0  # seconds to wait for another process to release a lock
+POLL = 0.005  # seconds between attempts while waiting
+
+_locks = {}
+_guard = threading.Lock()
+
+__all__ = ["Timeout", "atomic_write", "locked"]
+
+
+def _lock(path) -> FileLock:
+    key = os.path.abspath(path)
+    with _guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = FileLock(f"{key}.lock")
+        return lock
+
+
+@contextlib.contextmanager
+def locked(path, timeout: float = TIMEOUT):
+    """
+    Holds the lock of `path` for the duration of the `with` block. It excludes
+    other processes and other threads alike, and can be re-entered by the thread
+    holding it. Raises `Timeout` if it cannot be taken within `timeout` seconds.
+    """
+    with _lock(path).acquire(timeout=timeout, poll_interval=POLL):
+        yield
+
+
+def atomic_write(path, data: str | bytes) -> None:
+    """
+    Replaces the file at `path` with `data`, text or bytes, in one step, keeping its
+    permissions, so readers see either the old or the new content, never a partial
+    write. The temporary file is hidden and removed if anything fails.
+    """
+    path = pathlib.Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
@@ -0,0 +1,157 @@
+# menuscript/controller/memo.py
+#
+# Result cache for items opting in with `(memoize)[ttl]`, optionally declaring the
+# files their output depends on with `(inputs)[glob; glob]`.
+
+import glob
+import hashlib
+import os
+import pathlib
+import pickle
+import threading
+import time
+from logger.logger import _log
+from controller import locks
+from controller.parser import parse_duration
+
+LIMIT = 16 * 1024 * 1024  # bytes of cached results kept on disk
+
+
+def parse_ttl(value: str) -> float | None:
+    """
+    Returns the seconds of a `(memoize)[ttl]` option, or None if it is empty, i.e.
+    cached results only expire when the script or its inputs change. Accepts an
+    `s`, `m`, `h` or `d` suffix.
+    """
+    return parse_duration(value)
+
+
+def parse_inputs(value: str) -> list:
+    """
+    Returns the glob patterns of an `(inputs)[data/*.csv; ~/notes.txt]` option.
+    """
+    return [pattern.strip() for pattern in value.split(";") if pattern.strip()]
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stamp(path: str) -> tuple:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, st.st_size, st.st_mtime_ns)
+
+
+def fingerprint(source: str, interpreter: str, inputs: list) -> str:
+    """
+    Returns the cache key of a run: a hash of the script's content, the path and
+    mtime of its interpreter, and the size and mtime of every file matched by the
+    `inputs` globs, which are relative to the script's directory.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(_file_digest(source).encode())
+    h.update(repr(_stamp(interpreter)).encode())
+
+    base = pathlib.Path(source).parent
+    for pattern in inputs:
+        pattern = os.path.expanduser(pattern)
+        matches = sorted(glob.glob(str(base.joinpath(pattern)), recursive=True))
+        h.update(repr((pattern, [_stamp(path) for path in matches])).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Cached outcomes of successful runs, one file per key in `directory`. Reading an
+    entry touches its mtime, so evicting the files with the oldest mtimes once the
+    directory outgrows `limit` bytes drops the least recently used results.
+
+    :param directory: where the cached results are kept.
+    :param limit: maximum total size of the cached results in bytes.
+    """
+
+    def __init__(self, directory: pathlib.Path, limit: int = LIMIT) -> None:
+        self.directory = pathlib.Path(directory)
+        self.limit = limit
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl: float | None = None) -> dict | None:
+        """
+        Returns the entry stored under `key`, or None if there is none or it is older
+        than `ttl` seconds.
+        """
+        path = self.directory.joinpath(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            _log.info(f"Ignoring unreadable cached result '{path}': '{str(e)}'")
+            return None
+
+        if ttl is not None and time.time() - entry["created"] > ttl:
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        """
+        Stores `entry` under `key` and evicts least recently used entries if the
+        cache is over its size limit.
+        """
+        entry = dict(entry, created=time.time())
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                locks.atomic_write(self.directory.joinpath(key), pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                _log.error(f"Could not cache result with error: '{str(e)}'")
+                return
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries():
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+
+    def _entries(self) -> list:
+        try:
+            return [entry for entry in os.scandir(self.directory) if not entry.name.startswith(".")]
+        except FileNotFoundError:
+            return []
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry.path))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.limit:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
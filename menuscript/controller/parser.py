@@ -0,0 +1,167 @@
+# menuscript/controller/parser.py
+
+import re
+from logger.logger import _log
+
+# one `(label)[value]` pair; labels and values cannot contain brackets
+_PAIR = re.compile(r"\(([^()\[\]]*)\)\[([^\[\]]*)\]")
+
+# a whole item line: name, source and interpreter pairs plus any trailing pairs
+_FIELD = r"\([^()\[\]]*\)\[([^\[\]]*)\]"
+_EXTRA = r"\([^()\[\]]*\)\[[^\[\]]*\]"
+_ITEM = re.compile(rf"{_FIELD}{_FIELD}{_FIELD}((?:{_EXTRA})*)\s*$")
+
+# an app setting, `(setting)[key](value)[value]`
+_SETTING = re.compile(r"\s*\(setting\)\[([^\[\]]*)\]\(value\)\[([^\[\]]*)\]\s*$")
+
+# a run group, `(group)[name](members)[a; b: a](parallel)[n]`
+_GROUP = re.compile(r"\s*\(group\)\[([^\[\]]*)\]\(members\)\[([^\[\]]*)\](?:\(parallel\)\[([^\[\]]*)\])?\s*$")
+
+
+class ConfigSyntaxError(ValueError):
+    """
+    A malformed config line.
+
+    :param lineno: 1-based line number in the config file.
+    :param col: 1-based column where parsing failed.
+    :param message: what was expected at that position.
+    """
+
+    def __init__(self, lineno: int, col: int, message: str) -> None:
+        self.lineno = lineno
+        self.col = col
+        self.message = message
+        super().__init__(f"line {lineno}, column {col}: {message}")
+
+
+def tokenize_line(line: str, lineno: int = 0) -> tuple | None:
+    """
+    Splits a config line into `(name, source, interpreter, extra)` with one match of
+    a compiled pattern, where `extra` holds any further `(label, value)` pairs.
+    Returns None for lines that do not describe an entry (comments, blank lines).
+    Raises `ConfigSyntaxError` if the line starts like an entry but is malformed.
+
+    :param line: a single line of the config file.
+    :param lineno: line number used in error reports.
+    """
+    if not line.startswith("("):
+        line = line.lstrip()
+        if not line.startswith("("):
+            return None
+
+    if line.startswith(("(setting)", "(group)")):
+        return None
+
+    match = _ITEM.match(line)
+
+    if match is None:
+        raise ConfigSyntaxError(lineno, *_locate_error(line.rstrip()))
+
+    name, source, interpreter, extra = match.groups()
+    return name, source, interpreter, tuple(_PAIR.findall(extra)) if extra else ()
+
+
+def tokenize_setting(line: str) -> tuple | None:
+    """
+    Returns `(key, value)` for a `(setting)[key](value)[value]` line, otherwise None.
+    """
+    match = _SETTING.match(line)
+    if match is None:
+        return None
+    return match.groups()
+
+
+def tokenize_group(line: str) -> tuple | None:
+    """
+    Returns `(name, members, parallel)` for a `(group)[name](members)[...]` line,
+    with an optional `(parallel)[n]`, otherwise None. `parallel` is "" if omitted.
+    """
+    match = _GROUP.match(line)
+    if match is None:
+        return None
+    name, members, parallel = match.groups()
+    return name, members, parallel or ""
+
+
+def tokenize_pairs(line: str) -> dict:
+    """
+    Returns all `(label)[value]` pairs of a line as a dict, for files other than the
+    config that use the same format.
+    """
+    return dict(_PAIR.findall(line))
+
+
+def parse_duration(value: str) -> float | None:
+    """
+    Returns the seconds of a duration such as `90`, `30s`, `10m`, `1h` or `1d`, or
+    None if it is empty. Raises ValueError if it is malformed.
+    """
+    value = value.strip().lower()
+    if not value:
+        return None
+    scale = {"s": 1, "m": 60, "h": 3600, "d": 86400}.get(value[-1])
+    if scale is not None:
+        value = value[:-1]
+    return float(value) * (scale or 1)
+
+
+def _locate_error(line: str) -> tuple:
+    pos = 0
+    fields = 0
+    for match in _PAIR.finditer(line):
+        if match.start() != pos:
+            break
+        pos = match.end()
+        fields += 1
+
+    if pos == len(line):
+        return len(line) + 1, f"expected name, source and interpreter, found {fields} field(s)"
+    if line[pos] != "(":
+        return pos + 1, f"expected '(' but found '{line[pos]}'"
+
+    close = line.find(")", pos)
+    if close == -1:
+        return len(line) + 1, "unterminated '(' label"
+    if close + 1 >= len(line) or line[close + 1] != "[":
+        return close + 2, "expected '[' after label"
+    return close + 2, "unterminated '[' value"
+
+
+def iter_items(lines, errors: list | None = None):
+    """
+    Lazily yields `(lineno, name, source, interpreter)` for each script item in
+    `lines`, which can be any iterable of lines such as an open file. Malformed
+    lines are skipped and reported with their line and column numbers, either by
+    appending a `ConfigSyntaxError` to `errors` or, if it is None, to the log.
+
+    :param lines: iterable of config lines.
+    :param errors: optional list collecting syntax errors.
+    """
+    match = _ITEM.match
+
+    for lineno, line in enumerate(lines, 1):
+        found = match(line)  # fast path for well-formed, unindented item lines
+        if found is not None and not line.startswith("(group)"):
+            yield lineno, *found.group(1, 2, 3)
+            continue
+
+        try:
+            fields = tokenize_line(line, lineno)
+        except ConfigSyntaxError as e:
+            if errors is None:
+                _log.error(f"Malformed config {e}")
+            else:
+                errors.append(e)
+            continue
+
+        if fields is not None:
+            yield lineno, fields[0], fields[1], fields[2]
+
+
+def format_line(name: str, source: str, interpreter: str | None, extra: tuple = ()) -> str:
+    """
+    Formats a script item as a config line, followed by its `extra` `(label, value)`
+    pairs.
+    """
+    pairs = "".join(f"({label})[{value}]" for label, value in extra)
+    return f"(name)[{name}](source)[{source}](interpreter)[{interpreter or ''}]{pairs}\n"
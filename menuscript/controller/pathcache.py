@@ -0,0 +1,186 @@
+# menuscript/controller/pathcache.py
+
+import os
+import pathlib
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TTL = 5.0  # seconds a lookup is trusted without touching the file system
+
+
+class PathInfo:
+    """
+    File system metadata of one path, as cached by `PathCache`.
+
+    :param path: the path as given.
+    :param exists: whether the path exists.
+    :param is_file: whether it is a regular file.
+    :param is_dir: whether it is a directory.
+    :param executable: whether it is a regular file with an execute bit set, as
+                       an interpreter must be.
+    :param resolved: absolute path with symlinks resolved, or None if missing.
+    :param parent: directory containing the path.
+    :param name: final path component.
+    :param venv_root: prefix of the virtualenv or conda environment the path is an
+                      interpreter of, or None.
+    :param mtime: modification time in ns, or None if missing.
+    """
+
+    __slots__ = (
+        "path",
+        "exists",
+        "is_file",
+        "is_dir",
+        "executable",
+        "resolved",
+        "parent",
+        "name",
+        "venv_root",
+        "mtime",
+        "checked",
+    )
+
+    def __init__(self, path: str, st: os.stat_result | None, checked: float) -> None:
+        p = pathlib.Path(path)
+        self.path = path
+        self.exists = st is not None
+        self.is_file = st is not None and stat.S_ISREG(st.st_mode)
+        self.is_dir = st is not None and stat.S_ISDIR(st.st_mode)
+        self.executable = self.is_file and bool(st.st_mode & 0o111)
+        self.resolved = str(p.resolve()) if st is not None else None
+        self.parent = str(p.parent)
+        self.name = p.name
+        self.venv_root = _venv_root(p) if self.is_file else None
+        self.mtime = st.st_mtime_ns if st is not None else None
+        self.checked = checked
+
+    def __repr__(self) -> str:
+        return f"<PathInfo: {self.path!r} exists={self.exists} venv_root={self.venv_root!r}>"
+
+
+def _venv_root(path: pathlib.Path) -> str | None:
+    # <prefix>/bin/python with <prefix>/pyvenv.cfg (venv) or <prefix>/conda-meta (conda)
+    if path.parent.name not in ("bin", "Scripts"):
+        return None
+    prefix = path.parent.parent
+    if prefix.joinpath("pyvenv.cfg").is_file() or prefix.joinpath("conda-meta").is_dir():
+        return str(prefix)
+    return None
+
+
+def _stat(path: str) -> os.stat_result | None:
+    try:
+        return os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+
+class PathCache:
+    """
+    Caches `PathInfo` for source and interpreter paths so the loader, the executor
+    and the menu labels share one set of stat calls. A cached entry is trusted for
+    `ttl` seconds; after that it is re-stated and only recomputed if its mtime or
+    existence changed.
+
+    :param ttl: seconds an entry is trusted without a stat call.
+    :param clock: monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, ttl: float = TTL, clock=time.monotonic) -> None:
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, path) -> PathInfo:
+        """
+        Returns the metadata of `path`, from the cache when still valid.
+        """
+        path = str(path)
+        now = self.clock()
+
+        with self._lock:
+            info = self._entries.get(path)
+            if info is not None and now - info.checked < self.ttl:
+                self.hits += 1
+                return info
+
+        st = _stat(path)
+        mtime = st.st_mtime_ns if st is not None else None
+
+        with self._lock:
+            if info is not None and info.exists == (st is not None) and info.mtime == mtime:
+                info.checked = now
+                self.revalidations += 1
+                return info
+            self.misses += 1
+
+        info = PathInfo(path, st, now)
+        with self._lock:
+            self._entries[path] = info
+        return info
+
+    def bulk_validate(self, paths, max_workers: int = 16) -> dict:
+        """
+        Looks up many paths concurrently in a thread pool, which hides the latency of
+        network-mounted home directories. Returns a dict of path to `PathInfo`.
+
+        :param paths: iterable of paths; duplicates are looked up once.
+        :param max_workers: upper bound on concurrent stat calls.
+        """
+        unique = list(dict.fromkeys(str(path) for path in paths))
+
+        if len(unique) < 4:
+            return {path: self.lookup(path) for path in unique}
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+            return dict(zip(unique, pool.map(self.lookup, unique)))
+
+    def invalidate(self, path=None) -> None:
+        """
+        Drops `path`, or every entry if it is None, from the cache.
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(path), None)
+
+    def stats(self) -> dict:
+        """
+        Returns the hit, miss and revalidation counters and the hit rate.
+        """
+        with self._lock:
+            total = self.hits + self.misses + self.revalidations
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "hit_rate": (self.hits + self.revalidations) / total if total else 0.0,
+            }
+
+
+_cache = PathCache()
+
+
+def lookup(path) -> PathInfo:
+    return _cache.lookup(path)
+
+
+def bulk_validate(paths, max_workers: int = 16) -> dict:
+    return _cache.bulk_validate(paths, max_workers)
+
+
+def invalidate(path=None) -> None:
+    _cache.invalidate(path)
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -0,0 +1,264 @@
+# menuscript/controller/precompile.py
+#
+# Byte-compiles the configured scripts and the modules next to them into
+# __pycache__ ahead of time, with the interpreter each script runs with, so runs
+# do not pay the compile cost after every edit.
+
+import importlib.util
+import os
+import py_compile
+import subprocess
+import sys
+import threading
+from logger.logger import _log
+from controller import envresolve, pathcache
+
+INTERVAL = 30.0  # seconds between checks for edited sources
+MAX_FILES = 500  # modules compiled per script directory at most
+PROBE_TIMEOUT = 10.0  # seconds an interpreter may take to report its magic number
+
+# run by the target interpreter to report what its .pyc files look like
+_PROBE = "import importlib.util, sys; print(importlib.util.MAGIC_NUMBER.hex(), sys.implementation.cache_tag)"
+
+
+class Target:
+    """
+    What an interpreter's bytecode cache looks like.
+
+    :param interpreter: path of the interpreter.
+    :param magic: hex of the magic number its .pyc files start with.
+    :param cache_tag: tag in its .pyc file names, e.g. `cpython-312`.
+    """
+
+    __slots__ = ("interpreter", "magic", "cache_tag")
+
+    def __init__(self, interpreter: str, magic: str, cache_tag: str) -> None:
+        self.interpreter = interpreter
+        self.magic = magic
+        self.cache_tag = cache_tag
+
+    def __repr__(self) -> str:
+        return f"<Target: {self.interpreter!r} {self.cache_tag} magic={self.magic}>"
+
+    @property
+    def in_process(self) -> bool:
+        # the bytecode this process writes is the interpreter's own
+        return self.magic == importlib.util.MAGIC_NUMBER.hex() and self.cache_tag == sys.implementation.cache_tag
+
+    def cached(self, path: str) -> str:
+        head, tail = os.path.split(path)
+        return os.path.join(head, "__pycache__", f"{os.path.splitext(tail)[0]}.{self.cache_tag}.pyc")
+
+
+def probe(interpreter: str) -> Target | None:
+    """
+    Asks `interpreter` for its magic number and cache tag. Returns None if it
+    cannot be run or does not write .pyc files.
+    """
+    try:
+        output = subprocess.run(
+            [interpreter, "-c", _PROBE],
+            capture_output=True,
+            text=True,
+            timeout=PROBE_TIMEOUT,
+            env=envresolve.environment(interpreter),
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        _log.info(f"Could not probe interpreter '{interpreter}': '{str(e)}'")
+        return None
+
+    fields = output.stdout.split()
+    if output.returncode != 0 or len(fields) != 2 or fields[1] == "None":
+        _log.info(f"Could not probe interpreter '{interpreter}': '{output.stderr.strip()}'")
+        return None
+    return Target(interpreter, fields[0], fields[1])
+
+
+def collect(source: str, limit: int = MAX_FILES) -> list:
+    """
+    Returns the modules importable from next to `source`: the script itself, the
+    .py files beside it and the packages below it, at most `limit` of them.
+    """
+    files = [source]
+    stack = [os.path.dirname(source)]
+    while stack and len(files) < limit:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name == "__pycache__":
+                continue
+            if entry.name.endswith(".py") and entry.path != source:
+                if entry.is_file():
+                    files.append(entry.path)
+            elif entry.is_dir() and os.path.isfile(os.path.join(entry.path, "__init__.py")):
+                stack.append(entry.path)
+    return files[:limit]
+
+
+def _mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def compile_files(target: Target, files: list) -> int:
+    """
+    Compiles `files` for `target`, in this process when it writes the same
+    bytecode and with the target interpreter's compileall otherwise. Returns the
+    number of files that failed to compile.
+    """
+    if target.in_process:
+        failed = 0
+        for path in files:
+            try:
+                py_compile.compile(path, doraise=True)
+            except (py_compile.PyCompileError, OSError) as e:
+                _log.info(f"Could not precompile '{path}': '{str(e)}'")
+                failed += 1
+        return failed
+
+    try:
+        output = subprocess.run(
+            [target.interpreter, "-m", "compileall", "-q", "-i", "-"],
+            input="\n".join(files),
+            capture_output=True,
+            text=True,
+            env=envresolve.environment(target.interpreter),
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        _log.info(f"Could not precompile with '{target.interpreter}': '{str(e)}'")
+        return len(files)
+    if output.returncode != 0:
+        _log.info(f"Precompiling with '{target.interpreter}' failed: '{output.stdout.strip()[-500:]}'")
+        return 1
+    return 0
+
+
+class Precompiler:
+    """
+    Keeps the bytecode of the configured scripts and their sibling modules up to
+    date in the background. A pass compiles every file whose .pyc for its
+    interpreter is missing or older than the file; after that, only files whose
+    mtime changed are looked at again. Interpreters are probed once per mtime, and
+    the scripts of interpreters that cannot be probed are skipped.
+
+    :param interval: seconds between passes; `update` and `wake` start one early.
+    """
+
+    def __init__(self, interval: float = INTERVAL) -> None:
+        self.interval = interval
+        self.compiled = 0
+        self.failed = 0
+
+        self._sources = {}  # source -> interpreter
+        self._targets = {}  # interpreter -> (mtime, Target or None)
+        self._seen = {}  # (interpreter, path) -> mtime when last checked
+        self._running = False
+        self._pending = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def __repr__(self) -> str:
+        return f"<Precompiler: {len(self._sources)} scripts compiled={self.compiled} failed={self.failed}>"
+
+    def update(self, pairs) -> None:
+        """
+        Sets the `(source, interpreter)` pairs to keep compiled and starts a pass.
+        """
+        with self._cond:
+            self._sources = {str(source): str(interpreter) for source, interpreter in pairs}
+            self._pending = True
+            self._cond.notify()
+
+    def run_pending(self) -> int:
+        """
+        Compiles what changed since the last pass. Returns the number of files
+        compiled. The background thread calls this; tests can call it directly.
+        """
+        with self._cond:
+            sources = dict(self._sources)
+            self._pending = False
+
+        stale = {}  # interpreter -> {path: mtime}
+        checked = set()
+        for source, interpreter in sources.items():
+            if not pathcache.lookup(source).is_file:
+                continue
+            for path in collect(source):
+                key = (interpreter, path)
+                if key in checked:
+                    continue
+                checked.add(key)
+                mtime = _mtime(path)
+                if mtime is not None and self._seen.get(key) != mtime:
+                    stale.setdefault(interpreter, {})[path] = mtime
+
+        # forget files no longer in use so a re-added script is checked again
+        self._seen = {key: mtime for key, mtime in self._seen.items() if key in checked}
+
+        count = 0
+        for interpreter, files in stale.items():
+            target = self.target(interpreter)
+            if target is None:
+                continue
+            todo = [path for path, mtime in files.items() if (_mtime(target.cached(path)) or 0) < mtime]
+            if todo:
+                failed = compile_files(target, todo)
+                self.compiled += len(todo) - failed
+                self.failed += failed
+                count += len(todo) - failed
+            for path, mtime in files.items():
+                self._seen[(interpreter, path)] = mtime
+
+        if count:
+            _log.info(f"Precompiled {count} modules.")
+        return count
+
+    def target(self, interpreter: str) -> Target | None:
+        """
+        Returns the probed `Target` of `interpreter`, or None if it cannot be probed.
+        """
+        mtime = pathcache.lookup(interpreter).mtime
+        cached = self._targets.get(interpreter)
+        if cached is None or cached[0] != mtime:
+            cached = self._targets[interpreter] = (mtime, probe(interpreter) if mtime is not None else None)
+        return cached[1]
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name="precompile", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wake(self) -> None:
+        with self._cond:
+            self._pending = True
+            self._cond.notify()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if not self._pending:
+                    self._cond.wait(self.interval)
+                if not self._running:
+                    return
+            try:
+                self.run_pending()
+            except Exception as e:
+                _log.error(f"Precompiling failed with error: '{str(e)}'")
@@ -0,0 +1,148 @@
+# menuscript/controller/runlogs.py
+#
+# The output of every run, kept as ~/.menuscript/runs/<item>/<run-id>.log. Run ids
+# are timestamps, so file names sort oldest first. Apart from the newest, finished
+# logs are gzip-compressed in the background, and each item keeps at most `keep`
+# logs and `limit` bytes of them.
+
+import datetime
+import gzip
+import os
+import pathlib
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logger.logger import _log
+
+KEEP = 20  # logs kept per item
+LIMIT = 8 * 1024 * 1024  # bytes of logs kept per item
+
+
+class RunLogs:
+    """
+    Hands out the log file of each run and rotates an item's logs once a run of it
+    finished. Rotation runs on one background thread and leaves logs that are
+    still being written alone.
+
+    :param directory: the `runs` directory holding one directory per item.
+    :param keep: maximum number of logs kept per item.
+    :param limit: maximum total size in bytes of an item's logs. The newest log is
+                  always kept.
+    """
+
+    def __init__(self, directory: pathlib.Path, keep: int = KEEP, limit: int = LIMIT) -> None:
+        self.directory = pathlib.Path(directory)
+        self.keep = keep
+        self.limit = limit
+
+        self._active = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="runlogs")
+
+    def item_directory(self, name: str) -> pathlib.Path:
+        return self.directory.joinpath(name.replace("/", "_"))
+
+    def new_path(self, name: str) -> pathlib.Path:
+        """
+        Returns the log file for a new run of item `name`. Pass it to `finished`
+        once the run is over. Its directory is only created when the log is opened,
+        so runs that never start leave nothing behind.
+        """
+        directory = self.item_directory(name)
+        with self._lock:
+            run_id = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            path = directory.joinpath(f"{run_id}.log")
+            while path in self._active or path.exists():
+                run_id += "_"
+                path = directory.joinpath(f"{run_id}.log")
+            self._active.add(path)
+        return path
+
+    def finished(self, path: pathlib.Path) -> None:
+        """
+        Marks the log at `path` as complete and rotates its item's logs in the
+        background.
+        """
+        with self._lock:
+            self._active.discard(path)
+        try:
+            self._executor.submit(self.rotate, path.parent)
+        except RuntimeError:  # shut down
+            pass
+
+    def latest(self, name: str) -> pathlib.Path | None:
+        """
+        Returns the log of the most recent run of item `name`, or None.
+        """
+        logs = self._logs(self.item_directory(name))
+        return logs[-1] if logs else None
+
+    def rotate(self, directory: pathlib.Path) -> None:
+        """
+        Compresses the finished logs in `directory` apart from the newest one, then
+        deletes the oldest ones beyond the count and size limits.
+        """
+        with self._lock:
+            active = set(self._active)
+
+        logs = self._logs(directory)
+        for i, path in enumerate(logs[:-1]):
+            if path.suffix == ".log" and path not in active:
+                logs[i] = _compress(path)
+
+        sizes = []
+        for path in logs:
+            try:
+                sizes.append(path.stat().st_size)
+            except OSError:
+                sizes.append(0)
+
+        total = sum(sizes)
+        count = len(logs)
+        for path, size in zip(logs[:-1], sizes):
+            if count <= self.keep and total <= self.limit:
+                break
+            if path in active:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            count -= 1
+            total -= size
+
+    def shutdown(self) -> None:
+        """
+        Waits for pending rotations to finish.
+        """
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _logs(directory: pathlib.Path) -> list:
+        try:
+            names = [entry.name for entry in os.scandir(directory) if entry.name.endswith((".log", ".log.gz"))]
+        except FileNotFoundError:
+            return []
+        return [directory.joinpath(name) for name in sorted(names)]
+
+
+def _compress(path: pathlib.Path) -> pathlib.Path:
+    target = path.with_name(f"{path.name}.gz")
+    try:
+        with open(path, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        path.unlink()
+    except OSError as e:
+        _log.info(f"Could not compress run log '{path}': '{str(e)}'")
+        return path
+    return target
+
+
+def read(path: pathlib.Path) -> bytes:
+    """
+    Returns the content of a log, compressed or not.
+    """
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as f:
+            return f.read()
+    return path.read_bytes()
@@ -0,0 +1,225 @@
+# menuscript/controller/runner.py
+
+import pathlib
+import sys
+from logger.logger import _log
+from controller import capture, envresolve, pathcache
+from controller.importtime import ImportTimeFilter
+from controller.capture import Capture
+from controller.control import CANCELLED, TIMEOUT, RunControl
+from controller.forkserver import ForkServer, ForkServerError
+
+
+class RunResult:
+    """
+    Outcome of one script run, handed to the notification code.
+
+    :param item: the `(name, source, interpreter)` item that was run.
+    :param ok: whether the script ran successfully, i.e. exited with code 0.
+    :param message: text for the notification and the log.
+    :param error: the exception that prevented the run, if any.
+    :param capture: the script's captured output, if it was started.
+    :param status: `ok`, `failed`, `timeout` or `cancelled`; derived from `ok`
+                   if not given.
+    """
+
+    __slots__ = (
+        "item",
+        "ok",
+        "message",
+        "error",
+        "returncode",
+        "stdout",
+        "stderr",
+        "stdout_bytes",
+        "stderr_bytes",
+        "cached",
+        "usage",
+        "status",
+        "imports",
+        "log",
+    )
+
+    def __init__(
+        self,
+        item: tuple,
+        ok: bool,
+        message: str,
+        error: Exception | None = None,
+        capture: Capture | None = None,
+        status: str | None = None,
+    ) -> None:
+        self.item = item
+        self.ok = ok
+        self.message = message
+        self.error = error
+        self.status = status or ("ok" if ok else "failed")
+
+        self.returncode = capture.returncode if capture else None
+        self.stdout = capture.stdout.excerpt() if capture else ""
+        self.stderr = capture.stderr.excerpt() if capture else ""
+        self.stdout_bytes = capture.stdout.total if capture else 0
+        self.stderr_bytes = capture.stderr.total if capture else 0
+        self.usage = capture.usage if capture else None
+        self.log = capture.log if capture else None
+        self.cached = False
+
+        # the `importtime.Import` records of a run with import timing
+        stderr_filter = capture.stderr_filter if capture else None
+        self.imports = stderr_filter.records if isinstance(stderr_filter, ImportTimeFilter) else None
+
+    def __repr__(self) -> str:
+        return f"<RunResult: {self.item[0]!r} ok={self.ok} returncode={self.returncode}>"
+
+    def to_entry(self) -> dict:
+        """
+        Returns the outcome as a plain dict, as stored by `memo.ResultCache`.
+        """
+        fields = ("ok", "message", "returncode", "stdout", "stderr", "stdout_bytes", "stderr_bytes")
+        return {name: getattr(self, name) for name in fields}
+
+    @classmethod
+    def from_entry(cls, item: tuple, entry: dict) -> "RunResult":
+        """
+        Rebuilds a result returned by `to_entry`, marked as `cached`.
+        """
+        result = cls(item, entry["ok"], entry["message"])
+        for name in ("returncode", "stdout", "stderr", "stdout_bytes", "stderr_bytes"):
+            setattr(result, name, entry[name])
+        result.cached = True
+        return result
+
+
+def resolve_interpreter(interpreter: str | None) -> pathlib.Path | None:
+    """
+    Returns the configured interpreter as a path, or None if the item should run with
+    the global python interpreter: when none is configured, or when it is not an
+    executable file, the same fallback as for the items shown in the menu.
+    """
+    try:
+        interpreter = pathlib.Path(interpreter) # type: ignore
+    except TypeError:
+        return None
+
+    if str(interpreter).lower() in ("none", ".", " "):
+        return None
+    if not pathcache.lookup(interpreter).executable:
+        return None
+    return interpreter
+
+
+def build_command(interpreter: pathlib.Path | None, s_name: str, flags: tuple = ()) -> list:
+    """
+    Returns the command running script `s_name` from its own directory. The
+    interpreter is exec'd directly; its virtualenv is activated through the
+    environment from `envresolve`, not by sourcing `bin/activate` in a shell.
+
+    :param flags: interpreter options placed before the script, e.g. `-X importtime`.
+    """
+    if interpreter:  # will be None or a PoxisPath object
+        return [str(interpreter), *flags, s_name]
+
+    # If no virtual environment is configured, run script with global python interpreter
+    return [str(pathlib.Path(sys.executable)), *flags, s_name]
+
+
+def run(
+    item: tuple,
+    window: int = capture.WINDOW,
+    spill_dir: pathlib.Path | None = None,
+    server: ForkServer | None = None,
+    control: RunControl | None = None,
+    importtime: pathlib.Path | None = None,
+    log: pathlib.Path | None = None,
+) -> RunResult:
+    """
+    Runs the script of `item` to completion and returns its outcome. Blocks for as
+    long as the script runs and touches no UI, so it can be called from a worker
+    thread. Output is streamed, so memory use does not grow with the output size.
+
+    :param item: the `(name, source, interpreter)` item to run.
+    :param window: bytes of output kept from the start and the end of each stream.
+    :param spill_dir: if given, the full output is also written to
+                      `<spill_dir>/<name>.stdout` and `.stderr`.
+    :param server: if given, the script is forked from this warm fork server,
+                   falling back to a new process if the server cannot take it.
+    :param control: optional `RunControl` enforcing a timeout and allowing the run
+                    to be stopped from another thread.
+    :param importtime: if given, the script runs with `-X importtime` in a new
+                       process; the import tree is written to this file instead
+                       of being captured as stderr, and parsed into the result's
+                       `imports`.
+    :param log: if given, both outputs are also written to this file as they
+                stream.
+    """
+    name = item[0]
+    if control is not None and control.stopped:  # stopped while queued
+        return RunResult(item, False, f"Script '{name}' was stopped.", status=CANCELLED)
+
+    source = pathcache.lookup(item[1])
+
+    # Check if paths in config.txt are valid
+    if not source.is_file or not source.name.endswith(".py"):
+        return RunResult(item, False, "Invalid script source.")
+
+    # Get script name and working directory from source
+    interpreter = resolve_interpreter(item[2])
+    if interpreter is None and item[2]:
+        _log.info(f"Interpreter '{item[2]}' of '{name}' is not an executable file, using the global one")
+    cmd = build_command(interpreter, source.name, ("-X", "importtime") if importtime else ())
+    env = envresolve.environment(interpreter) if interpreter else None
+
+    spill = None
+    if spill_dir is not None:
+        spill_dir.mkdir(parents=True, exist_ok=True)
+        spill = spill_dir.joinpath(name.replace("/", "_"))
+
+    stderr_filter = None
+    if importtime is not None:
+        server = None  # a forked script has its imports done already
+        stderr_filter = ImportTimeFilter(importtime)
+
+    if server is not None:
+        output = Capture(window, window, spill, log=log)
+        try:
+            _log.info(f"Executing script: '{name}' on {server}")
+            server.run([source.name], source.parent, output, control.started if control else None)
+        except ForkServerError as e:
+            if not e.started:
+                _log.info(f"Falling back to a new process for '{name}': '{str(e)}'")
+            else:
+                if control is not None:
+                    control.finished()
+                return RunResult(item, False, f"Script '{name}' was interrupted: '{str(e)}'", e, output)
+        else:
+            if control is not None:
+                control.finished()
+            return _result(item, output, control)
+
+    try:
+        _log.info(f"Executing script: '{name}'")
+        _log.info(f"Executing command: '{cmd}'")
+
+        output = capture.run(cmd, source.parent, window, window, spill, control, stderr_filter, log, env=env)
+    except Exception as e:
+        return RunResult(item, False, f"Could not execute script with error: '{str(e)}'", e)
+
+    return _result(item, output, control)
+
+
+def _result(item: tuple, output: Capture, control: RunControl | None = None) -> RunResult:
+    name = item[0]
+    if control is not None and control.reason == TIMEOUT:
+        message = f"Script '{name}' timed out after {control.timeout:g} s."
+        return RunResult(item, False, message, capture=output, status=TIMEOUT)
+    if control is not None and control.reason == CANCELLED:
+        message = f"Script '{name}' was stopped."
+        return RunResult(item, False, message, capture=output, status=CANCELLED)
+    if output.returncode == 0:
+        return RunResult(item, True, "Script executed successfully.", capture=output)
+    return RunResult(
+        item,
+        False,
+        f"Script '{name}' exited with code {output.returncode}: '{output.stderr.excerpt().strip()}'",
+        capture=output,
+    )
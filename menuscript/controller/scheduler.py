@@ -0,0 +1,372 @@
+# menuscript/controller/scheduler.py
+#
+# In-process cron scheduler. Schedules are kept in a min-heap ordered by their next
+# firing time, and a single thread sleeps until the earliest one is due.
+
+import bisect
+import datetime
+import heapq
+import itertools
+import pathlib
+import threading
+import time
+from logger.logger import _log
+from controller import locks
+from controller.parser import tokenize_pairs
+
+POLICIES = ("skip", "once", "all")
+POLICY = "once"  # what to do with firings missed while asleep or not running
+GRACE = 60.0  # seconds a firing may be late and still count as on time
+MAX_WAIT = 60.0  # the monotonic clock may stop during system sleep; recheck this often
+MAX_CATCHUP = 100  # firings made up for at most with the `all` policy
+
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+# name, lowest and highest value of the five cron fields
+_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of the month", 1, 31),
+    ("month", 1, 12),
+    ("day of the week", 0, 7),
+)
+
+
+def _parse_field(text: str, name: str, lo: int, hi: int) -> tuple:
+    values = set()
+    for part in text.split(","):
+        spec, _, step = part.partition("/")
+        try:
+            step = int(step) if step else 1
+            if spec == "*":
+                start, end = lo, hi
+            elif "-" in spec:
+                start, end = (int(value) for value in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+                if step != 1:
+                    end = hi
+        except ValueError:
+            raise ValueError(f"invalid {name} '{part}'")
+
+        if step < 1 or not lo <= start <= end <= hi:
+            raise ValueError(f"{name} '{part}' is out of range {lo}-{hi}")
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+class CronExpression:
+    """
+    A parsed five-field cron expression, `minute hour day month weekday`. Fields
+    accept `*`, numbers, ranges `a-b`, steps `*/n` or `a-b/n` and lists `a,b`;
+    Sunday is 0 or 7. As in cron, if both the day of the month and the day of the
+    week are restricted, a day matching either one fires. The `@hourly`, `@daily`,
+    `@weekly`, `@monthly` and `@yearly` shorthands are understood as well.
+
+    :param text: the expression. Raises ValueError if it is malformed.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = " ".join(text.split())
+        fields = _MACROS.get(self.text, self.text).split()
+        if len(fields) != 5:
+            raise ValueError(f"expected 5 fields, found {len(fields)}")
+
+        parsed = [_parse_field(field, *spec) for field, spec in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def __repr__(self) -> str:
+        return f"<CronExpression: {self.text!r}>"
+
+    def matches_day(self, day: datetime.datetime) -> bool:
+        in_month = day.day in self.days
+        in_week = day.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, timestamp: float) -> float:
+        """
+        Returns the timestamp of the first firing strictly after `timestamp`, in
+        local time.
+        """
+        dt = datetime.datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0)
+        dt += datetime.timedelta(minutes=1)
+        last_year = dt.year + 5  # e.g. `0 0 31 2 *` never fires
+
+        while dt.year <= last_year:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1) + datetime.timedelta(days=32)).replace(day=1, hour=0, minute=0)
+                continue
+
+            if not self.matches_day(dt):
+                dt = dt.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                continue
+
+            i = bisect.bisect_left(self.hours, dt.hour)
+            if i == len(self.hours):
+                dt = dt.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                continue
+            if self.hours[i] != dt.hour:
+                dt = dt.replace(hour=self.hours[i], minute=0)
+
+            i = bisect.bisect_left(self.minutes, dt.minute)
+            if i == len(self.minutes):
+                dt = dt.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            return dt.replace(minute=self.minutes[i]).timestamp()
+
+        raise ValueError(f"'{self.text}' never fires")
+
+
+class Schedule:
+    """
+    When to run one item.
+
+    :param name: name of the item.
+    :param expression: when to run it.
+    :param catchup: policy for missed firings, one of `POLICIES`, or None to use
+                    the scheduler's default.
+    :param last: timestamp of the last firing, or None.
+    """
+
+    __slots__ = ("name", "expression", "catchup", "last")
+
+    def __init__(
+        self,
+        name: str,
+        expression: CronExpression,
+        catchup: str | None = None,
+        last: float | None = None,
+    ) -> None:
+        self.name = name
+        self.expression = expression
+        self.catchup = catchup
+        self.last = last
+
+    def __repr__(self) -> str:
+        return f"<Schedule: {self.name!r} {self.expression.text!r}>"
+
+
+class Scheduler:
+    """
+    Fires `fire(name)` whenever a schedule is due. All schedules share one thread,
+    which sleeps until the earliest deadline in a min-heap, so idle schedules cost
+    nothing. Firings missed while the machine slept or the app was not running are
+    handled by the catch-up policy: `skip` drops them, `once` fires once, `all`
+    fires once per missed firing.
+
+    Schedules are persisted to `path` with the time they last fired, one
+    `(schedule)[name](cron)[expression](catchup)[policy](last)[timestamp]` per line.
+
+    :param fire: called with the item name from the scheduler thread; it should
+                 return quickly, e.g. by handing the run to the execution engine.
+    :param path: file the schedules are persisted to, or None.
+    :param policy: default catch-up policy.
+    :param clock: wall clock returning a timestamp, injectable for tests.
+    :param on_done: completion callback for the runs `fire` starts, e.g. the menu's,
+                    so scheduled runs update the app like runs started by hand. The
+                    app may install it later by setting the attribute.
+    """
+
+    def __init__(
+        self, fire, path: pathlib.Path | None = None, policy: str = POLICY, clock=time.time, on_done=None
+    ) -> None:
+        self.fire = fire
+        self.on_done = on_done
+        self.path = pathlib.Path(path) if path is not None else None
+        self.policy = policy if policy in POLICIES else POLICY
+        self.clock = clock
+
+        self._schedules = {}  # name -> Schedule
+        self._heap = []  # (deadline, seq, Schedule); replaced schedules are skipped
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
+    def get(self, name: str) -> Schedule | None:
+        return self._schedules.get(name)
+
+    def add(self, name: str, expression: str, catchup: str | None = None) -> Schedule:
+        """
+        Schedules item `name`, replacing its previous schedule. Raises ValueError if
+        the expression or policy is invalid.
+        """
+        if catchup is not None and catchup not in POLICIES:
+            raise ValueError(f"unknown catch-up policy '{catchup}'")
+        schedule = Schedule(name, CronExpression(expression), catchup)
+
+        with self._cond:
+            self._push(schedule, schedule.expression.next_after(self.clock()))
+            self._save()
+            self._cond.notify()
+        return schedule
+
+    def remove(self, name: str) -> bool:
+        with self._cond:
+            if self._schedules.pop(name, None) is None:
+                return False
+            self._save()
+            return True
+
+    def rename(self, name: str, new_name: str) -> bool:
+        with self._cond:
+            schedule = self._schedules.pop(name, None)
+            if schedule is None:
+                return False
+            schedule.name = new_name
+            self._schedules[new_name] = schedule
+            self._save()
+            return True
+
+    def load(self) -> int:
+        """
+        Reads the schedules from `path` and returns how many there are. Schedules
+        that were due while the app was not running are caught up on the next
+        `run_pending`.
+        """
+        if self.path is None or not self.path.exists():
+            return 0
+
+        now = self.clock()
+        with self._cond:
+            self._schedules.clear()
+            self._heap.clear()
+            with open(self.path, "r") as f:
+                for lineno, line in enumerate(f, 1):
+                    fields = tokenize_pairs(line)
+                    if "schedule" not in fields:
+                        continue
+                    try:
+                        last = float(fields["last"]) if fields.get("last") else None
+                        catchup = fields.get("catchup") or None
+                        expression = CronExpression(fields.get("cron", ""))
+                        schedule = Schedule(fields["schedule"], expression, catchup, last)
+                        self._push(schedule, expression.next_after(last if last is not None else now))
+                    except ValueError as e:
+                        _log.error(f"Ignoring schedule in line {lineno} of '{self.path}': '{str(e)}'")
+            self._cond.notify()
+            return len(self._schedules)
+
+    def run_pending(self, now: float | None = None) -> float | None:
+        """
+        Fires every schedule that is due at `now` and returns the next deadline, or
+        None if nothing is scheduled. The scheduler thread calls this; tests can
+        call it directly with a fake clock.
+        """
+        if now is None:
+            now = self.clock()
+
+        fired = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, schedule = heapq.heappop(self._heap)
+                if self._schedules.get(schedule.name) is not schedule:
+                    continue  # removed or replaced since it was pushed
+
+                count = 1
+                if now - deadline > GRACE:
+                    count = self._catch_up(schedule, deadline, now)
+
+                fired.extend([schedule.name] * count)
+                schedule.last = now
+                self._push(schedule, schedule.expression.next_after(max(deadline, now)))
+
+            if fired:
+                self._save()
+            deadline = self._heap[0][0] if self._heap else None
+
+        for name in fired:
+            try:
+                self.fire(name)
+            except Exception as e:
+                _log.error(f"Scheduled run of '{name}' failed with error: '{str(e)}'")
+        return deadline
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wake(self) -> None:
+        """
+        Re-checks the deadlines now, e.g. after the machine woke from sleep.
+        """
+        with self._cond:
+            self._cond.notify()
+
+    def _loop(self) -> None:
+        while True:
+            deadline = self.run_pending()
+            with self._cond:
+                if not self._running:
+                    return
+                timeout = MAX_WAIT if deadline is None else min(MAX_WAIT, deadline - self.clock())
+                if timeout > 0:
+                    self._cond.wait(timeout)
+
+    def _push(self, schedule: Schedule, deadline: float) -> None:
+        self._schedules[schedule.name] = schedule
+        heapq.heappush(self._heap, (deadline, next(self._seq), schedule))
+
+    def _catch_up(self, schedule: Schedule, deadline: float, now: float) -> int:
+        # `deadline` is already late; a later firing may still be on time
+        missed, on_time = 0, 0
+        while deadline <= now and missed < MAX_CATCHUP:
+            if now - deadline > GRACE:
+                missed += 1
+            else:
+                on_time = 1
+            deadline = schedule.expression.next_after(deadline)
+
+        policy = schedule.catchup or self.policy
+        _log.info(f"Schedule of '{schedule.name}' missed {missed} firing(s), catching up with policy '{policy}'")
+        if policy == "skip":
+            return on_time
+        if policy == "all":
+            return missed + on_time
+        return 1
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+
+        lines = ["# MenuScript schedules, edited through 'Schedule job' in the menu\n"]
+        for schedule in self._schedules.values():
+            line = f"(schedule)[{schedule.name}](cron)[{schedule.expression.text}]"
+            if schedule.catchup:
+                line += f"(catchup)[{schedule.catchup}]"
+            if schedule.last is not None:
+                line += f"(last)[{schedule.last:.0f}]"
+            lines.append(f"{line}\n")
+
+        try:
+            locks.atomic_write(self.path, "".join(lines))
+        except Exception as e:
+            _log.error(f"Could not write schedules with error: '{str(e)}'")
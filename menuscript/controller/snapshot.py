@@ -0,0 +1,116 @@
+# menuscript/controller/snapshot.py
+
+import hashlib
+import os
+import pathlib
+import pickle
+from logger.logger import _log
+from controller import locks
+
+VERSION = 6
+
+
+def _digest(path: pathlib.Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _mtime(path: str) -> int | None:
+    try:
+        return os.stat(pathlib.Path(path)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def interpreter_mtimes(items: list) -> dict:
+    """
+    Returns the mtime of every distinct interpreter path in `items`, or None for
+    paths that do not exist. One stat per interpreter, not per item.
+    """
+    return {interpreter: _mtime(interpreter) for interpreter in {item[-1] for item in items}}
+
+
+def read(cache_path: pathlib.Path, config_path: pathlib.Path) -> dict | None:
+    """
+    Returns the snapshot stored at `cache_path` if it still describes `config_path`:
+    the config's size and mtime match (or, failing that, its content hash does), and
+    none of the referenced interpreters changed since it was taken. Returns None
+    otherwise, in which case the config has to be parsed again.
+
+    :param cache_path: path of the snapshot file.
+    :param config_path: path of the config file the snapshot was taken from.
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        _log.info(f"Ignoring unreadable config snapshot '{cache_path}': '{str(e)}'")
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != VERSION:
+        return None
+
+    stamp = stat(config_path)
+    if stamp is None:
+        return None
+
+    if stamp != (snapshot["size"], snapshot["mtime"]):
+        if stamp[0] != snapshot["size"] or _digest(config_path) != snapshot["digest"]:
+            return None
+
+    for interpreter, mtime in snapshot["interpreters"].items():
+        if _mtime(interpreter) != mtime:
+            return None
+
+    return snapshot
+
+
+def stat(config_path: pathlib.Path) -> tuple | None:
+    """
+    Returns the `(size, mtime)` of the config file, taken before parsing it so that
+    `write` can tell whether the file changed while it was being read.
+    """
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def write(
+    cache_path: pathlib.Path,
+    config_path: pathlib.Path,
+    stamp: tuple | None,
+    state: tuple,
+    entries: list,
+    items: list,
+) -> None:
+    """
+    Stores a snapshot of the parsed config (`state` from `ConfigStore.dump`) and the
+    validated items, keyed by the config's size, mtime and content hash plus the
+    mtimes of the interpreters referenced by `entries`. Nothing is written if the
+    config changed since `stamp` was taken.
+    """
+    if stamp is None or stat(config_path) != stamp:
+        return
+
+    try:
+        snapshot = {
+            "version": VERSION,
+            "size": stamp[0],
+            "mtime": stamp[1],
+            "digest": _digest(config_path),
+            "interpreters": interpreter_mtimes(entries),
+            "state": state,
+            "items": items,
+        }
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        locks.atomic_write(cache_path, pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception as e:
+        _log.error(f"Could not write config snapshot with error: '{str(e)}'")
@@ -0,0 +1,462 @@
+# menuscript/controller/store.py
+
+import os
+import pathlib
+import threading
+from logger.logger import _log
+from controller import locks
+from controller.journal import Journal
+from controller.parser import ConfigSyntaxError, format_line, tokenize_group, tokenize_line, tokenize_setting
+
+JOURNAL_LIMIT = 64 * 1024  # bytes of journal before it is folded into the config
+
+
+class ConfigStore:
+    """
+    In-memory copy of the user config file. Script items are indexed by name so that
+    edits are applied in O(1); non-item lines (comments, header) are kept in place.
+    Dirty state is written back in a single atomic replace, either on demand with
+    `flush` or `delay` seconds after the last edit.
+
+    Writes hold the config's file lock (see `locks`). Edits made since the last
+    write are kept as operations; if another process changed the file in the
+    meantime, it is re-read and the operations are applied on top of it before
+    writing, so neither side's edits are lost.
+
+    With `(setting)[journal](value)[on]` in the config, edits are instead appended to
+    a journal next to the config file as they happen and replayed over it on load.
+    Once the journal grows past `(setting)[journal_limit](value)[bytes]` it is folded
+    back into the config by a background compaction.
+
+    :param path: path of the config file backing the store.
+    :param delay: seconds to wait after an edit before flushing to disk.
+    """
+
+    def __init__(self, path: pathlib.Path, delay: float = 2.0) -> None:
+        self.path = pathlib.Path(path)
+        self.delay = delay
+        self.settings = {}
+        self.groups = {}  # name -> (members, parallel) as written in the config
+
+        self._lines = []  # raw strings or slot ids, in file order
+        self._slots = {}  # slot id -> (name, source, interpreter, raw line or None)
+        self._names = {}  # name -> slot id
+        self._extras = {}  # slot id -> trailing `(label, value)` pairs of the line
+        self._next_slot = 0
+
+        self._journal = Journal(self.path.with_name(".config.journal"))
+        self._journaled = False
+        self._replaying = False
+        self._compacting = False
+
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+
+        self._stamp = None  # (size, mtime) of the config as last read or written
+        self._pending = []  # (op, args) of the edits not written to the config yet
+
+    @property
+    def journaled(self) -> bool:
+        return self._journaled
+
+    def load(self, errors: list | None = None, replay: bool = True) -> list:
+        """
+        Streams the config file from disk, replacing the in-memory state. Returns the
+        raw `(name, source, interpreter)` tuples in file order. Malformed lines are
+        kept verbatim and reported as in `parser.iter_items`.
+
+        :param errors: optional list collecting syntax errors.
+        :param replay: whether to replay the journal over the config file.
+        """
+        with self._lock:
+            self._cancel_timer()
+            self._lines = []
+            self._slots = {}
+            self._names = {}
+            self._extras = {}
+            self.settings = {}
+            self.groups = {}
+            self._dirty = False
+
+            lines = self._lines
+            new_slot = self._new_slot
+
+            with open(self.path, "r") as f:
+                self._stamp = _stamp(os.fstat(f.fileno()))
+                for lineno, line in enumerate(f, 1):
+                    try:
+                        fields = tokenize_line(line, lineno)
+                    except ConfigSyntaxError as e:
+                        if errors is None:
+                            _log.error(f"Malformed config {e}")
+                        else:
+                            errors.append(e)
+                        fields = None
+
+                    if fields is None:
+                        setting = tokenize_setting(line)
+                        if setting is not None:
+                            self.settings[setting[0]] = setting[1]
+                        elif line.lstrip().startswith("(group)"):
+                            group = tokenize_group(line)
+                            if group is not None:
+                                self.groups[group[0]] = group[1:]
+                            else:
+                                _log.error(f"Malformed config line {lineno}: expected (group)[name](members)[...]")
+                        lines.append(line)
+                        continue
+
+                    slot = new_slot(fields[0], fields[1], fields[2], line)
+                    if fields[3]:
+                        self._extras[slot] = fields[3]
+                    lines.append(slot)
+
+            if replay:
+                self.replay()
+            self._reapply()
+            return self.items()
+
+    def replay(self) -> int:
+        """
+        Applies the journal's records to the in-memory state and returns how many
+        there were. If journaling has been switched off since, the records are
+        folded into the config file and the journal removed.
+        """
+        with self._lock:
+            self._journaled = self.settings.get("journal", "").lower() in ("on", "true", "1")
+
+            count = 0
+            self._replaying = True
+            try:
+                for op, args in self._journal.records():
+                    self._apply(op, args)
+                    count += 1
+            finally:
+                self._replaying = False
+
+            if count:
+                _log.info(f"Replayed {count} journal records over '{self.path}'")
+                if not self._journaled or self._journal.size() > self._journal_limit():
+                    self._compact_soon()
+            return count
+
+    def dump(self) -> tuple:
+        """
+        Returns the parsed state of the store, as stored by `snapshot.write`.
+        """
+        with self._lock:
+            return self._lines, self._slots, self._names, self._extras, self.settings, self.groups
+
+    def restore(self, state: tuple, replay: bool = True) -> list:
+        """
+        Replaces the in-memory state with one returned by `dump`, skipping the parse.
+        Returns the raw `(name, source, interpreter)` tuples in file order.
+
+        :param replay: whether to replay the journal over the restored state.
+        """
+        with self._lock:
+            self._cancel_timer()
+            self._lines, self._slots, self._names, self._extras, self.settings, self.groups = state
+            self._next_slot = max(self._slots, default=-1) + 1
+            self._dirty = False
+            self._stamp = self._disk_stamp()
+            if replay:
+                self.replay()
+            self._reapply()
+            return self.items()
+
+    def items(self) -> list:
+        """
+        Returns the `(name, source, interpreter)` tuples currently held, in file order.
+        """
+        with self._lock:
+            slots = self._slots
+            return [
+                slots[slot][:3]
+                for slot in self._lines
+                if type(slot) is int and slot in slots
+            ]
+
+    def entries(self) -> list:
+        """
+        Like `items`, but each tuple is prefixed with the item's 1-based line number.
+        """
+        with self._lock:
+            return [
+                (i, *self._slots[slot][:3])
+                for i, slot in enumerate(self._lines, 1)
+                if type(slot) is int and slot in self._slots
+            ]
+
+    def get(self, name: str) -> tuple | None:
+        with self._lock:
+            slot = self._names.get(name)
+            if slot is None:
+                return None
+            return self._slots[slot][:3]
+
+    def options(self, name: str) -> dict:
+        """
+        Returns the item's trailing `(label)[value]` pairs as a dict, e.g.
+        `{"forkserver": "pandas"}`. Empty if the item has none or does not exist.
+        """
+        with self._lock:
+            slot = self._names.get(name)
+            if slot is None:
+                return {}
+            return dict(self._extras.get(slot, ()))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, name: str, source: str, interpreter: str | None) -> bool:
+        """
+        Appends a new script item. Returns False if the name is already taken.
+        """
+        with self._lock:
+            if name in self._names:
+                return False
+            self._lines.append(self._new_slot(name, source, interpreter or ""))
+            self._changed("add", name, source, interpreter or "")
+            return True
+
+    def remove(self, name: str) -> bool:
+        """
+        Removes the script item called `name`. Returns False if it does not exist.
+        """
+        with self._lock:
+            slot = self._names.pop(name, None)
+            if slot is None:
+                return False
+            del self._slots[slot]  # the dead slot id in _lines is skipped on write
+            self._extras.pop(slot, None)
+            self._changed("remove", name)
+            return True
+
+    def rename(self, name: str, new_name: str) -> bool:
+        """
+        Renames a script item. Returns False if it does not exist or `new_name` is
+        already used by another item.
+        """
+        with self._lock:
+            if new_name == name:
+                return name in self._names
+            if new_name in self._names:
+                return False
+            slot = self._names.pop(name, None)
+            if slot is None:
+                return False
+            self._names[new_name] = slot
+            self._set(slot, 0, new_name)
+            self._changed("rename", name, new_name)
+            return True
+
+    def set_source(self, name: str, source: str) -> bool:
+        return self._update(name, 1, source, "set-source")
+
+    def set_interpreter(self, name: str, interpreter: str | None) -> bool:
+        return self._update(name, 2, interpreter or "", "set-interpreter")
+
+    def flush(self) -> bool:
+        """
+        Writes the in-memory state to disk if it changed since the last load or flush.
+        The file is replaced atomically so a crash never leaves a truncated config.
+        In journaled mode edits are already on disk and this is a no-op. Returns
+        False if writing failed.
+        """
+        with self._lock:
+            self._cancel_timer()
+            if not self._dirty:
+                return True
+
+            if not self._write():
+                return False
+
+            self._dirty = False
+            return True
+
+    def compact(self) -> bool:
+        """
+        Folds the journal into the config file: the current state is written with an
+        atomic replace and the journal is removed. Replaying the journal again after
+        a crash between the two steps is harmless, as every record is a no-op once
+        applied (e.g. renaming an item that no longer exists).
+        """
+        with self._lock:
+            self._compacting = True  # the load below must not start another one
+            self._cancel_timer()
+            try:
+                with locks.locked(self.path):
+                    # the journal holds the records of every process, so the
+                    # state on disk is the complete one
+                    if self.path.exists():
+                        self.load()
+                        self._cancel_timer()
+                    if not self._replace():
+                        return False
+                    self._journal.clear()
+            except locks.Timeout as e:
+                _log.error(f"Could not lock config for compaction with error: '{str(e)}'")
+                return False
+            finally:
+                self._compacting = False
+
+            self._dirty = False
+            return True
+
+    def discard(self) -> None:
+        """
+        Drops any pending edits without writing them.
+        """
+        with self._lock:
+            self._cancel_timer()
+            self._dirty = False
+            self._pending = []
+            self._journal.close()
+
+    def _new_slot(self, name, source, interpreter, raw=None) -> int:
+        slot = self._next_slot
+        self._next_slot += 1
+        self._slots[slot] = (name, source, interpreter, raw)
+        if name and name not in self._names:
+            self._names[name] = slot
+        return slot
+
+    def _update(self, name: str, field: int, value, op: str) -> bool:
+        with self._lock:
+            slot = self._names.get(name)
+            if slot is None:
+                return False
+            if self._slots[slot][field] != value:
+                self._set(slot, field, value)
+                self._changed(op, name, value)
+            return True
+
+    def _set(self, slot: int, field: int, value) -> None:
+        fields = list(self._slots[slot][:3])
+        fields[field] = value
+        self._slots[slot] = (*fields, None)  # line is re-rendered on the next write
+
+    def _apply(self, op: str, args: list) -> None:
+        if op == "add":
+            self.add(*args)
+        elif op == "remove":
+            self.remove(*args)
+        elif op == "rename":
+            self.rename(*args)
+        elif op == "set-source":
+            self.set_source(*args)
+        elif op == "set-interpreter":
+            self.set_interpreter(*args)
+
+    def _changed(self, op: str, *args) -> None:
+        if self._replaying:
+            return
+
+        if not self._journaled:
+            self._pending.append((op, args))
+            self._mark_dirty()
+            return
+
+        try:
+            with locks.locked(self.path):
+                self._journal.append(op, *args)
+        except Exception as e:
+            _log.error(f"Could not append to journal with error: '{str(e)}'")
+            self._pending.append((op, args))
+            self._mark_dirty()  # fall back to rewriting the config
+            return
+
+        if self._journal.size() > self._journal_limit():
+            self._compact_soon()
+
+    def _journal_limit(self) -> int:
+        try:
+            return int(self.settings.get("journal_limit", JOURNAL_LIMIT))
+        except ValueError:
+            return JOURNAL_LIMIT
+
+    def _compact_soon(self) -> None:
+        if self._compacting:
+            return
+        self._compacting = True
+        threading.Thread(target=self.compact, name="config-compaction", daemon=True).start()
+
+    def _write(self) -> bool:
+        try:
+            with locks.locked(self.path):
+                if self._pending and self.path.exists() and self._disk_stamp() != self._stamp:
+                    # another process wrote the config since it was read
+                    _log.info(f"Merging {len(self._pending)} edits into '{self.path}', which changed on disk")
+                    self.load()
+                    self._cancel_timer()
+                return self._replace()
+        except locks.Timeout as e:
+            _log.error(f"Could not lock config with error: '{str(e)}'")
+            return False
+
+    def _replace(self) -> bool:
+        # called with the file lock held
+        try:
+            locks.atomic_write(self.path, "".join(self._render()))
+        except Exception as e:
+            _log.error(f"Could not write config with error: '{str(e)}'")
+            return False
+
+        self._stamp = self._disk_stamp()
+        self._pending = []
+        _log.info(f"Wrote {len(self._slots)} items to '{self.path}'")
+        return True
+
+    def _reapply(self) -> None:
+        # applies the unwritten edits on top of freshly read state
+        if not self._pending:
+            return
+        self._replaying = True
+        try:
+            for op, args in self._pending:
+                self._apply(op, args)
+        finally:
+            self._replaying = False
+        self._mark_dirty()
+
+    def _disk_stamp(self) -> tuple | None:
+        try:
+            return _stamp(os.stat(self.path))
+        except OSError:
+            return None
+
+    def _render(self):
+        for slot in self._lines:
+            if type(slot) is not int:
+                yield slot if slot.endswith("\n") else f"{slot}\n"
+                continue
+
+            fields = self._slots.get(slot)
+            if fields is None:
+                continue
+            raw = fields[3]
+            if raw is not None:
+                yield raw if raw.endswith("\n") else f"{raw}\n"
+            else:
+                yield format_line(*fields[:3], self._extras.get(slot, ()))
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        self._cancel_timer()
+        self._timer = threading.Timer(self.delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def _stamp(st: os.stat_result) -> tuple:
+    return st.st_size, st.st_mtime_ns
@@ -0,0 +1,58 @@
+# menuscript/controller/usage.py
+
+import json
+import sys
+
+
+def max_rss_bytes(ru_maxrss: int) -> int:
+    # getrusage reports bytes on macOS and KiB on Linux
+    return ru_maxrss if sys.platform == "darwin" else ru_maxrss * 1024
+
+
+class Usage:
+    """
+    Resources used by one run of a script.
+
+    :param wall: wall-clock duration in seconds.
+    :param user: user CPU time of the child in seconds.
+    :param system: system CPU time of the child in seconds.
+    :param max_rss: peak resident set size of the child in bytes.
+    """
+
+    __slots__ = ("wall", "user", "system", "max_rss")
+
+    def __init__(self, wall: float, user: float, system: float, max_rss: int) -> None:
+        self.wall = wall
+        self.user = user
+        self.system = system
+        self.max_rss = max_rss
+
+    @classmethod
+    def from_rusage(cls, wall: float, rusage) -> "Usage":
+        """
+        Builds the usage of a child from the `resource.struct_rusage` returned by
+        `os.wait4` for it.
+        """
+        return cls(wall, rusage.ru_utime, rusage.ru_stime, max_rss_bytes(rusage.ru_maxrss))
+
+    def __repr__(self) -> str:
+        return (
+            f"<Usage: wall={self.wall:.3f}s user={self.user:.3f}s "
+            f"sys={self.system:.3f}s maxrss={self.max_rss / 2**20:.1f}MiB>"
+        )
+
+    @property
+    def cpu(self) -> float:
+        return self.user + self.system
+
+
+def format_line(name: str, ok: bool, returncode: int | None, usage: Usage) -> str:
+    """
+    Returns the app.log line recording a run's usage, e.g.
+    `Run usage: name="Report" ok=1 returncode=0 wall=1.204 user=0.830 sys=0.112 maxrss=48562176`.
+    The run history keeps the same figures for the Stats view, see `history.History`.
+    """
+    return (
+        f"Run usage: name={json.dumps(name)} ok={int(ok)} returncode={returncode} "
+        f"wall={usage.wall:.3f} user={usage.user:.3f} sys={usage.system:.3f} maxrss={usage.max_rss}"
+    )
@@ -0,0 +1,260 @@
+# menuscript/controller/watcher.py
+
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import struct
+from logger.logger import _log
+
+
+class ItemDiff:
+    """
+    Difference between two item lists, as computed by `diff_items`.
+
+    :param added: items only present in the new list.
+    :param removed: items only present in the old list.
+    :param renamed: `(old, new)` pairs with a new name but the same source and
+                    interpreter.
+    :param changed: `(old, new)` pairs with the same name but a different source
+                    or interpreter.
+    """
+
+    __slots__ = ("added", "removed", "renamed", "changed")
+
+    def __init__(self, added: list, removed: list, renamed: list, changed: list) -> None:
+        self.added = added
+        self.removed = removed
+        self.renamed = renamed
+        self.changed = changed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.renamed or self.changed)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ItemDiff: added={self.added} removed={self.removed} "
+            f"renamed={self.renamed} changed={self.changed}>"
+        )
+
+
+def diff_items(old: list, new: list) -> ItemDiff:
+    """
+    Compares two lists of `(name, source, interpreter)` items by name. An item that
+    disappears under one name while another with the same source and interpreter
+    appears under a new name is reported as a rename rather than a remove and add.
+    Pure function: no file system or menu access.
+
+    :param old: items currently shown.
+    :param new: items read from the config.
+    """
+    old_by_name = {item[0]: item for item in old}
+    new_by_name = {item[0]: item for item in new}
+
+    changed = []
+    added = []
+    for name, item in new_by_name.items():
+        previous = old_by_name.get(name)
+        if previous is None:
+            added.append(item)
+        elif previous[1:] != item[1:]:
+            changed.append((previous, item))
+
+    removed_by_target = {}
+    for name, item in old_by_name.items():
+        if name not in new_by_name:
+            removed_by_target.setdefault(item[1:], []).append(item)
+
+    renamed = []
+    still_added = []
+    for item in added:
+        candidates = removed_by_target.get(item[1:])
+        if candidates:
+            renamed.append((candidates.pop(0), item))
+        else:
+            still_added.append(item)
+
+    removed = [item for candidates in removed_by_target.values() for item in candidates]
+    return ItemDiff(still_added, removed, renamed, changed)
+
+
+class _PollBackend:
+    """
+    Detects changes by comparing the file's mtime, size and inode.
+    """
+
+    name = "poll"
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._stamp = self._stat()
+
+    def _stat(self) -> tuple | None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def changed(self) -> bool:
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class _KqueueBackend(_PollBackend):
+    """
+    Waits for vnode events on the file with kqueue (macOS, BSD). The file is
+    re-opened after it is deleted or renamed over, which is how most editors and
+    `ConfigStore.flush` save.
+    """
+
+    name = "kqueue"
+    _FLAGS = (
+        getattr(select, "KQ_NOTE_WRITE", 0)
+        | getattr(select, "KQ_NOTE_EXTEND", 0)
+        | getattr(select, "KQ_NOTE_ATTRIB", 0)
+        | getattr(select, "KQ_NOTE_DELETE", 0)
+        | getattr(select, "KQ_NOTE_RENAME", 0)
+    )
+
+    def __init__(self, path: pathlib.Path) -> None:
+        super().__init__(path)
+        self._kq = select.kqueue()
+        self._fd = None
+        self._open()
+
+    def _open(self) -> None:
+        try:
+            self._fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            self._fd = None
+            return
+        event = select.kevent(
+            self._fd,
+            filter=select.KQ_FILTER_VNODE,
+            flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+            fflags=self._FLAGS,
+        )
+        self._kq.control([event], 0, 0)
+
+    def _close_fd(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)  # closing the descriptor removes its kevents
+            self._fd = None
+
+    def changed(self) -> bool:
+        if self._fd is None:
+            self._open()
+            return super().changed() if self._fd is not None else False
+
+        events = self._kq.control(None, 16, 0)
+        if not events:
+            return False
+
+        if any(e.fflags & (select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME) for e in events):
+            self._close_fd()
+            self._open()
+        return super().changed()
+
+    def close(self) -> None:
+        self._close_fd()
+        self._kq.close()
+
+
+class _InotifyBackend(_PollBackend):
+    """
+    Watches the file's directory with inotify (Linux) through libc, so atomic
+    replaces of the file are seen as well as in-place writes.
+    """
+
+    name = "inotify"
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+    _MASK = 0x00000008 | 0x00000080 | 0x00000100 | 0x00000200  # CLOSE_WRITE, MOVED_TO, CREATE, DELETE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, path: pathlib.Path) -> None:
+        super().__init__(path)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(self._fd, os.fsencode(path.parent), self._MASK)
+        if wd < 0:
+            os.close(self._fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        self._name = os.fsencode(path.name)
+
+    def changed(self) -> bool:
+        seen = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                seen = seen or name == self._name
+        return super().changed() if seen else False
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class ConfigWatcher:
+    """
+    Reports changes to a file. `poll` is a cheap, non-blocking check meant to be
+    called from a timer on the main run loop; it uses kqueue or inotify when
+    available and falls back to comparing mtimes otherwise.
+
+    :param path: file to watch.
+    :param on_change: called with no arguments from `poll` when the file changed.
+    """
+
+    def __init__(self, path: pathlib.Path, on_change) -> None:
+        self.path = pathlib.Path(path)
+        self.on_change = on_change
+        self._backend = self._create_backend()
+        _log.info(f"Watching '{self.path}' with {self._backend.name} backend")
+
+    def _create_backend(self):
+        backends = []
+        if hasattr(select, "kqueue"):
+            backends.append(_KqueueBackend)
+        if os.uname().sysname == "Linux":
+            backends.append(_InotifyBackend)
+
+        for backend in backends:
+            try:
+                return backend(self.path)
+            except Exception as e:
+                _log.info(f"{backend.name} watcher unavailable: '{str(e)}'")
+        return _PollBackend(self.path)
+
+    @property
+    def backend(self) -> str:
+        return self._backend.name
+
+    def poll(self) -> bool:
+        """
+        Calls `on_change` if the file changed since the last poll. Returns whether it
+        did.
+        """
+        if not self._backend.changed():
+            return False
+        self.on_change()
+        return True
+
+    def close(self) -> None:
+        self._backend.close()
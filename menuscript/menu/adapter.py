@@ -0,0 +1,150 @@
+# menuscript/menu/adapter.py
+#
+# Applies the operations computed by `model.diff` to the rumps menu.
+
+import rumps
+from Foundation import NSObject
+from .model import INSERT, REBIND, REMOVE, RETITLE, Node
+
+
+class SubmenuDelegate(NSObject):
+    """
+    NSMenu delegate reporting submenus that are about to open to the backend.
+    """
+
+    def menuNeedsUpdate_(self, menu) -> None:
+        self.backend.opening(menu)
+
+
+class RumpsBackend:
+    """
+    Keeps the rumps menu in step with a `model.MenuView`. Every rumps item shares
+    one callback, which looks up the action of the clicked item and passes it to
+    `dispatch`, so rebinding an item is a dict update and no callback is allocated
+    per item.
+
+    rumps keys items by their title at the time they are added, so items are added
+    with a key derived from the node key, which is unique among siblings, and
+    retitled right after. Retitling later then never clashes with other items.
+
+    Submenus of lazy nodes get a delegate; the first time one is about to open,
+    `expand` is called with the node's path, and the app replaces the placeholder
+    children before the submenu is shown.
+
+    :param menu: the app's root `rumps.Menu`.
+    :param dispatch: called with `(action, sender)` when an item is clicked.
+    :param expand: called with the path of a lazy node when its submenu opens.
+    """
+
+    def __init__(self, menu, dispatch, expand=None) -> None:
+        self.menu = menu
+        self.dispatch = dispatch
+        self.expand = expand
+        self.created = 0  # rumps items created so far
+
+        self._items = {}  # path -> rumps item
+        self._keys = {}  # path -> key of the item in its rumps menu
+        self._paths = {}  # id(rumps item) -> path
+        self._actions = {}  # id(rumps item) -> action
+        self._lazy = {}  # NSMenu -> path of a lazy node not opened yet
+        self._delegate = None  # NSMenu only holds its delegate weakly
+
+    def apply(self, ops: list) -> None:
+        for op in ops:
+            if op.kind == INSERT:
+                self._insert(op.path, op.node, op.after)
+            elif op.kind == REMOVE:
+                self._remove(op.path)
+            elif op.kind == RETITLE:
+                self._items[op.path].title = op.node.title
+            elif op.kind == REBIND:
+                self._bind(self._items[op.path], op.node)
+
+    def clicked(self, sender) -> None:
+        action = self._actions.get(id(sender))
+        if action is not None:
+            self.dispatch(action, sender)
+
+    def opening(self, nsmenu) -> None:
+        path = self._lazy.pop(nsmenu, None)
+        if path is not None and self.expand is not None:
+            self.expand(path)
+
+    def _menu(self, path: tuple):
+        return self.menu if not path else self._items[path]
+
+    def _insert(self, path: tuple, node: Node, after) -> None:
+        parent = self._menu(path[:-1])
+        item = self._build(path, node)
+        if after is not None:
+            anchor = self._keys[path[:-1] + (after,)]
+            parent.insert_after(anchor, item)
+        else:
+            anchor = next(iter(parent), None)
+            if anchor is None:
+                parent.add(item)
+            else:
+                parent.insert_before(anchor, item)
+        self._added(parent, path, node, item, anchor if after is not None else None)
+
+    def _build(self, path: tuple, node: Node):
+        self.created += 1
+        if node.separator:
+            return rumps.separator
+
+        item = rumps.MenuItem(repr(node.key))
+        self._bind(item, node)
+        for child in node.children or ():
+            child_path = path + (child.key,)
+            child_item = self._build(child_path, child)
+            last = list(item)[-1] if child.separator and len(item) else None
+            item.add(child_item)
+            self._added(item, child_path, child, child_item, last)
+        if node.lazy and node.children:
+            self._watch(item, path)
+        return item
+
+    def _watch(self, item, path: tuple) -> None:
+        if self._delegate is None:
+            self._delegate = SubmenuDelegate.alloc().init()
+            self._delegate.backend = self
+        nsmenu = item._menu  # created by rumps with the first child
+        nsmenu.setDelegate_(self._delegate)
+        self._lazy[nsmenu] = path
+
+    def _added(self, parent, path: tuple, node: Node, item, after_key) -> None:
+        if node.separator:
+            # rumps creates and names separators itself; the new one follows its
+            # anchor, or comes first. Separators are rarely added, so a scan is fine
+            keys = list(parent)
+            key = keys[keys.index(after_key) + 1] if after_key is not None else keys[0]
+            item = parent[key]
+        else:
+            key = repr(node.key)
+            item.title = node.title
+        self._items[path] = item
+        self._keys[path] = key
+        self._paths[id(item)] = path
+
+    def _bind(self, item, node: Node) -> None:
+        if node.action is None:
+            self._actions.pop(id(item), None)
+        else:
+            self._actions[id(item)] = node.action
+        item.set_callback(self.clicked if node.action is not None else None, node.shortcut or "")
+
+    def _remove(self, path: tuple) -> None:
+        item = self._items[path]
+        del self._menu(path[:-1])[self._keys[path]]
+        self._forget(item)
+
+    def _forget(self, item) -> None:
+        if getattr(item, "_menu", None) is not None:
+            self._lazy.pop(item._menu, None)
+        path = self._paths.pop(id(item), None)
+        self._items.pop(path, None)
+        self._keys.pop(path, None)
+        self._actions.pop(id(item), None)
+        if isinstance(item, rumps.MenuItem):
+            for child in item.values():
+                self._forget(child)
@@ -298,6 +298,20 @@ class EditName(Window):
         )
 
 
+class EditSchedule(Window):
+    def __init__(self, expression: str):
+        super().__init__(
+            message="Minute, hour, day of the month, month and day of the week, e.g. "
+            "'0 9 * * 1-5' for 9:00 on weekdays. Leave empty to unschedule.",
+            title="Schedule job",
+            default_text=expression,
+            ok="Save Changes",
+            cancel="Cancel",
+            dimensions=(220, 20),
+            secure=False,
+        )
+
+
 class EditSource:
     def __init__(self, name: str):
         super().__init__(
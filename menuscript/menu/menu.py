@@ -2,10 +2,16 @@
 
 import rumps
 import controller.controller as controller
-from functools import partial
 from . import classes
+from .adapter import RumpsBackend
+from .model import MenuView, Node
 from logger.logger import _log
 from controller.controller import Error_, Info_
+from controller.items import ItemIndex, ScriptItem
+from controller.watcher import diff_items
+
+PLACEHOLDER = [Node("placeholder", "Loading…")]  # children of submenus not opened yet
+
 
 class MenuBarApp(rumps.App):
     """
@@ -19,121 +25,338 @@ class MenuBarApp(rumps.App):
     def __init__(self, name: str, icon: str, items: list) -> None:
         super().__init__(name=name, icon=icon, quit_button=None) # type: ignore
 
-        self.items = items
-            
-        # loads the number of times a script has been executed
-        self.num_executions = controller.get_num_executions()
-        self.init_menu()
+        self.items = ItemIndex(items)
+        self.groups = list(controller.get_groups())
+
+        self.item_nodes = {}  # item id -> (signature, node) of the items shown
+        self.opened = set()  # ids of the items whose submenu was opened
+        self.more_node = Node(
+            "more",
+            "More...",
+            children=[
+                Node("open_editor", "Open editor", ("open_config_file",)),
+                Node("stats", "Stats", ("show_stats",)),
+                Node("separator"),
+                Node("report_issue", "Raise an issue", ("report_issue",)),
+                Node("docs", "Documentation", ("read_docs",)),
+                Node("reset", "Reset application", ("reset_app",)),
+            ],
+        )
+        self.view = MenuView(RumpsBackend(self.menu, self.on_action, self.expand))
+        self.render()
+
+        # delivers results of runs finished on worker threads
+        self.dispatch_timer = rumps.Timer(self.dispatch, 0.1)
+        self.dispatch_timer.start()
 
-    def init_menu(self) -> None:
+        # picks up edits made to the config file outside the app
+        self.watcher = controller.watch_config(self.reload)
+        self.watch_timer = rumps.Timer(self.check_config, 1)
+        self.watch_timer.start()
+
+        # runs scheduled jobs; re-checks its deadlines after the machine slept
+        controller.get_scheduler().on_done = self.run_finished
+        controller.get_scheduler().start()
+        controller.get_precompiler().start()
+        rumps.events.on_wake.register(controller.get_scheduler().wake)
+
+        rumps.events.before_quit.register(self.before_quit)
+
+    def before_quit(self) -> None:
         """
-        Refreshes the menu bar with items from user config file.
+        Writes pending config edits to disk before the app exits.
 
         :params self: the MenuBarApp object.
         """
-        
-        self.menu.clear()
-
-        if not len(self.items):
-            self.menu = [
-                rumps.MenuItem(
-                    "Add new item",
-                    callback=self.add,
-                ),
-                [
-                    rumps.MenuItem("More..."),
-                    [
-                        rumps.MenuItem("Open editor", callback=self.open_config_file),
-                        None,
-                        rumps.MenuItem("Raise an issue", callback=self.report_issue),
-                        rumps.MenuItem("Documentation", callback=self.read_docs),
-                        rumps.MenuItem("Reset application", callback=self.reset_app),
-                    ],
-                ],
-                rumps.MenuItem("Quit", callback=rumps.quit_application),
-                rumps.MenuItem(f"Count ({self.num_executions})"),
-            ]
+        self.watch_timer.stop()
+        self.watcher.close()
+        self.dispatch_timer.stop()
+        controller.get_scheduler().stop()
+        controller.get_precompiler().stop()
+        controller.get_engine().shutdown()
+        controller.get_forkservers().shutdown()
+        controller.get_run_logs().shutdown()
+        controller.get_counters().flush()
+        controller.get_history().close()
+        controller.flush_config()
+
+    def dispatch(self, _) -> None:
+        """
+        Timer callback running callbacks posted by worker threads.
+
+        :params self: the MenuBarApp object.
+        """
+        controller.get_dispatcher().drain()
+
+    def check_config(self, _) -> None:
+        """
+        Timer callback polling the config file watcher.
+
+        :params self: the MenuBarApp object.
+        """
+        self.watcher.poll()
+
+    def reload(self) -> None:
+        """
+        Applies changes made to the config file on disk, e.g. through 'Open editor'.
+        Only the items that were added, removed, renamed or changed are touched; the
+        rest of the menu is left as is.
+
+        :params self: the MenuBarApp object.
+        """
+        items = controller.reload_items()
+        if items is None:
             return
 
-        for i, (name, source, interpreter) in enumerate(self.items):
-            self.menu.add(rumps.MenuItem(name))
-            item = self.menu.get(name)
-            callback_item = (name, source, interpreter)
-
-            item.update( # type: ignore
-                        self.create_item_menu(f"{i}", callback_item)
-            )
-
-        # Add the rest of the menu items
-        
-        self.menu = [
-            None,
-            rumps.MenuItem(
-                "Add new item",
-                callback=self.add,
-            ),
-            [
-                rumps.MenuItem("More..."),
-                [
-                    rumps.MenuItem("Open editor", callback=self.open_config_file),
-                    None,
-                    rumps.MenuItem("Raise an issue", callback=self.report_issue),
-                    rumps.MenuItem("Documentation", callback=self.read_docs),
-                    rumps.MenuItem("Reset application", callback=self.reset_app),
+        groups = list(controller.get_groups())
+        diff = diff_items(self.items, items)
+        if not diff and groups == self.groups:
+            return
+
+        if groups != self.groups:
+            _log.info(f"Applying group changes: {groups}")
+        if diff:
+            _log.info(f"Applying config changes: {diff}")
+
+        self.items = self.items.sync(items, diff.renamed if diff else ())
+        self.groups = groups
+        self.render()
+
+    def render(self) -> None:
+        """
+        Shows the menu for the current `items` and `groups`. The menu is described as
+        a tree of `model.Node`s and only its difference to the menu shown is applied
+        to rumps, so an edit touches the entries it changed and nothing else.
+
+        :params self: the MenuBarApp object.
+        """
+        self.view.update(self.build_tree())
+
+    def build_tree(self) -> list:
+        """
+        Returns the top level nodes of the menu. The nodes of items that did not
+        change since the last call are reused, so `render` skips them.
+
+        :params self: the MenuBarApp object.
+        """
+        nodes = []
+        item_nodes = {}
+        for i, item in enumerate(self.items):
+            node = self.item_node(f"{i}", item)
+            item_nodes[item.id] = self.item_nodes[item.id]
+            nodes.append(node)
+        self.item_nodes = item_nodes
+        self.opened.intersection_update(item_nodes)
+
+        if nodes:
+            nodes.append(Node("separator"))
+            if self.groups:
+                groups = [Node(("group", name), name, ("run_group", name)) for name in self.groups]
+                nodes.append(Node("groups", "Groups", children=groups))
+
+        return nodes + [
+            Node("add", "Add new item", ("add",)),
+            self.more_node,
+            Node("quit", "Quit", ("quit",)),
+            Node("count", f"Count ({controller.get_num_executions()})"),
+        ]
+
+    def item_node(self, key: str, item: ScriptItem) -> Node:
+        """
+        Returns the node of one item with its submenu, reusing the previous one if
+        nothing shown in it changed. Until the submenu is first opened it only holds
+        a placeholder, so items the user never opens cost one node and no labels.
+
+        :params self: the MenuBarApp object.
+        :param key: the key shortcut of the item's 'Run' entry.
+        """
+        name, source, interpreter = item
+        id = item.id
+        if id not in self.opened:
+            # the submenu is built when it is first opened, see `expand`
+            signature = (item, key)
+            cached = self.item_nodes.get(id)
+            if cached is None or cached[0] != signature:
+                cached = self.item_nodes[id] = (signature, Node(("item", id), name, children=PLACEHOLDER, lazy=True))
+            return cached[1]
+
+        schedule = controller.get_schedule_label(item)
+        memoized = controller.is_memoized(item)
+
+        signature = (item, key, schedule, memoized)
+        cached = self.item_nodes.get(id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        children = [Node("run", "Run", ("execute", id), shortcut=key)]
+        if memoized:
+            children.append(Node("force_run", "Force run", ("force_run", id)))
+        children += [
+            Node("import_timing", "Run with import timing", ("run_import_timing", id)),
+            Node("stop", "Stop", ("stop", id)),
+            Node("last_output", "Show last output", ("show_last_output", id)),
+            Node("separator"),
+            Node("schedule", schedule, ("schedule", id)),
+            Node(
+                "edit",
+                "Edit",
+                ("edit_name", id),
+                children=[
+                    Node("name", f"{controller.get_name_label(name)}", ("edit_name", id)),
+                    Node("source", f"{controller.get_source_label(source)}", ("edit_source", id)),
+                    Node("interpreter", f"{controller.get_interpreter_label(interpreter)}", ("edit_interpreter", id)),
                 ],
-            ],
-            rumps.MenuItem("Quit", callback=rumps.quit_application),
-            rumps.MenuItem(f"Count ({self.num_executions})"),
+            ),
+            Node("delete", "Delete", ("delete", id)),
         ]
 
+        node = Node(("item", id), name, children=children)
+        self.item_nodes[id] = (signature, node)
+        return node
+
+    def expand(self, path: tuple) -> None:
+        """
+        Builds the submenu of an item when it is about to open for the first time.
+        Called by the menu backend from the NSMenu delegate.
+
+        :params self: the MenuBarApp object.
+        :param path: path of the item's node, `(("item", id),)`.
+        """
+        id = path[0][1]
+        item = self.items.by_id(id)
+        if item is None or id in self.opened:
+            return
+        self.opened.add(id)
+        key = self.item_nodes[id][0][1]
+        self.view.replace(path, self.item_node(key, item))
+
+    def on_action(self, action: tuple, sender) -> None:
+        """
+        Callback of every menu entry. Item actions hold the item's id rather than
+        the item, so they always act on its current version.
+
+        :params self: the MenuBarApp object.
+        :param action: the method to call, followed by the item id or group name.
+        """
+        kind, *args = action
+        if kind == "quit":
+            rumps.quit_application(sender)
+        elif kind == "run_group":
+            self.run_group(args[0], sender)
+        elif args:
+            item = self.items.by_id(args[0])
+            if item is not None:
+                getattr(self, kind)(item, sender)
+        else:
+            getattr(self, kind)(sender)
+
+    def replace_item(self, new_item: ScriptItem) -> None:
+        """
+        Replaces the item with the id of `new_item`, keeping its position in the
+        menu, and shows the change. Only the item's own node is rebuilt and compared.
+
+        :params self: the MenuBarApp object.
+        """
+        self.items.replace(new_item)
+        key = self.item_nodes[new_item.id][0][1]  # its position did not change
+        self.view.replace((("item", new_item.id),), self.item_node(key, new_item))
+
     def add(self, _):
         """
         Adds a template item to the menu bar. The user can then edit the item without
         using the config file through use of tkinter popup windows.
         """
 
-        new_item = ("Template", "Assign a source", controller.get_global_interpreter())
-        
-        for item in self.items:
-            if item[0] == "Template":
-                Info_("To add a new template item, please edit the name of the existing one.")
-                return
-            
-            
-        self.items.append(new_item)
+        if self.items.get("Template") is not None:
+            Info_("To add a new template item, please edit the name of the existing one.")
+            return
+
+        new_item = self.items.add(ScriptItem("Template", "Assign a source", controller.get_global_interpreter()))
         controller.write_item(new_item)
-        self.init_menu()
+        self.render()
 
-    def execute(self, item: tuple, _):
+    def execute(self, item: ScriptItem, _):
         """
-        Executes the script associated with the item. Tries to execute the script,
-        if value error is raised, the script fails to execute and the user is
-        notified by the controller.
+        Executes the script associated with the item on a worker thread and returns
+        immediately. The user is notified by the controller once it finished.
 
         :params self: the MenuBarApp object.
         """
-        if (
-            type(controller.execute(item)) == Exception
-        ):  # evaluates to True if script is executed successfully
+        controller.submit(item, self.run_finished)
+
+    def force_run(self, item: ScriptItem, _):
+        """
+        Like `execute`, but runs the script even if a cached result could be used.
+
+        :params self: the MenuBarApp object.
+        """
+        controller.submit(item, self.run_finished, force=True)
+
+    def run_import_timing(self, item: ScriptItem, _):
+        """
+        Runs the script with `-X importtime` and notifies the user of its slowest
+        imports; the full import tree is kept in ~/.menuscript/importtime.
+
+        :params self: the MenuBarApp object.
+        """
+        controller.submit(item, self.run_finished, import_timing=True)
+
+    def stop(self, item: ScriptItem, _):
+        """
+        Stops the script associated with the item, including any processes it
+        started.
+
+        :params self: the MenuBarApp object.
+        """
+        controller.stop(item)
+
+    def show_last_output(self, item: ScriptItem, _):
+        """
+        Opens the output of the script's most recent run.
+
+        :params self: the MenuBarApp object.
+        """
+        controller.show_last_output(item)
+
+    def run_finished(self, handle) -> None:
+        """
+        Refreshes the execution count after a run finished. Called on the main
+        thread through the controller's dispatcher.
+
+        :params self: the MenuBarApp object.
+        """
+        if not handle.result.ok:  # only successful runs are counted
             return
-        self.menu.pop(f"Count ({self.num_executions})")
-        self.num_executions = controller.get_num_executions()
-        self.menu.add(rumps.MenuItem(f"Count ({self.num_executions})"))
+        self.refresh_count()
+
+    def run_group(self, name: str, _):
+        """
+        Runs the group's scripts on worker threads in dependency order and returns
+        immediately. The user is notified once the whole group finished.
+
+        :params self: the MenuBarApp object.
+        """
+        controller.run_group(name, lambda group_run: self.refresh_count())
+
+    def refresh_count(self) -> None:
+        """
+        Shows the current execution count.
+
+        :params self: the MenuBarApp object.
+        """
+        self.view.set_title(("count",), f"Count ({controller.get_num_executions()})")
 
-    def edit_name(self, item: tuple, _):
+    def edit_name(self, item: ScriptItem, _):
         """
         Opens a popup to edit the name of the item. If the name is valid, the item is
-        updated in the .menuscript/config file. Updates the instance variable `items`
-        by removing the old item and adding the new item. Then updates the menu to reflect,
-        the change without restarting.
+        updated in the .menuscript/config file. Replaces the item in the instance variable
+        `items` and updates the menu to reflect the change without restarting.
 
         :param self: the MenuBarApp object.
         :param item: the item to be edited.
 
         """
-        old_name = item[0]
-        source = item[1]
-        interpreter = item[2]
+        old_name = item.name
 
         e = classes.EditName(old_name)
         e.__setattr__("icon", f"{controller.paths.app_path}/imgs/icon.icns")
@@ -144,39 +367,14 @@ class MenuBarApp(rumps.App):
 
         new_name = response.text  # get new name from popup
 
-        r = controller.update_name(
-            (old_name, source, interpreter), new_name
-        )  # Validate new name
+        r = controller.update_name(item, new_name)  # Validate new name
 
         if not r:  # if name is invalid cancel edit
             return
 
-        for i, (name, source, interpreter) in enumerate(
-            self.items
-        ):  # remove old item from self.items
-            if name == old_name:
-                self.items.remove((old_name, source, interpreter))
-                break
-
-        new_item = (new_name, source, interpreter)  # create new item
-        self.items.append(new_item)  # add new item to self.items
-
-        old_menu_item = self.menu.get(
-            old_name
-        )  # remove old menu item or live refresh will not work
-        run = old_menu_item.get("Run") # type: ignore
-
-        self.menu.insert_before(
-            old_menu_item.__getattribute__("title"),
-            rumps.MenuItem(new_name),
-        )
-        new_top_level_item = self.menu.get(new_name)  # Create new top level menu item
-        new_top_level_item.update( # type: ignore
-            self.create_item_menu(run.__getattribute__("key"), new_item)
-        )
-        self.menu.pop(old_name)  # remove old menu item
+        self.replace_item(item.replace(name=new_name))  # the entry keeps its place in the menu
 
-    def edit_source(self, item: tuple, _):
+    def edit_source(self, item: ScriptItem, _):
         """
         Opens a tkinter window stored locally in the .menuscript data file which allows,
         the user to select files locally on their machine. Done outside of the rumps
@@ -186,9 +384,6 @@ class MenuBarApp(rumps.App):
         :params self: the MenuBarApp object.
         """
 
-        name = item[0]
-        old_source = item[1]
-
         new_source = controller.open_filepicker()
         new_source = new_source.removesuffix("\n")  # Format path without newline # type: ignore
 
@@ -196,31 +391,15 @@ class MenuBarApp(rumps.App):
 
         if not r or len(self.items) <= 0:  # Valid path was selected
             return
-        
-        
-        for i, (name, source, interpreter) in enumerate(self.items):
-            if source == old_source:
-                self.items.remove((name, old_source, interpreter))
-                break
-            
-        new_item = (name, new_source, interpreter) # type: ignore
-        self.items.append(new_item)
-
-        top_level_item = self.menu.get(name)
-        top_level_item.clear() # type: ignore
-        top_level_item.update( # type: ignore
-            self.create_item_menu(top_level_item.__getattribute__("key"), new_item)
-        )
 
-    def edit_interpreter(self, item: tuple, _):
+        self.replace_item(item.replace(source=new_source))
+
+    def edit_interpreter(self, item: ScriptItem, _):
         """
         Opens the user_config.txt file in the default text editor.
 
         :params self: the MenuBarApp object.
         """
-        name = item[0]
-        old_interpreter = item[2]
-
         new_interpreter = controller.open_interpreter_picker()
         new_interpreter = new_interpreter.removesuffix( # type: ignore
             "\n"
@@ -231,81 +410,39 @@ class MenuBarApp(rumps.App):
         if not r or len(self.items) <= 0 :  # if interpreter is invalid cancel edit
             return
 
-        top_level_item = self.menu.get(name)
+        self.replace_item(item.replace(interpreter=new_interpreter))
 
-        for i, (name, source, interpreter) in enumerate(
-            self.items
-        ):  # remove old item from self.items
-            if interpreter == old_interpreter:
-                self.items.remove((name, source, old_interpreter))
-                break
+    def schedule(self, item: ScriptItem, _):
+        """
+        Opens a popup to edit the cron schedule of the item, and refreshes the item's
+        menu to show the new schedule.
 
-        new_item = (name, source, new_interpreter) # type: ignore
-        self.items.append(new_item)
+        :params self: the MenuBarApp object.
+        """
+        current = controller.get_schedule(item) or ""
 
-        top_level_item = self.menu.get(name)
-        top_level_item.clear() # type: ignore
-        top_level_item.update( # type: ignore
-            self.create_item_menu(top_level_item.__getattribute__("key"), new_item)
-        )
+        e = classes.EditSchedule(current)
+        e.__setattr__("icon", f"{controller.paths.app_path}/imgs/icon.icns")
+        response = e.run()
 
-    def create_item_menu(self, key: str, item: tuple):
-        """
-        Creates a new item menu.
-        """
-        name = item[0]
-        source = item[1]
-        interpreter = item[2]
+        if not response.clicked == 1 or response.text.strip() == current:
+            return
 
-        return [
-            rumps.MenuItem(
-                "Run",
-                key=key,
-                callback=partial(self.execute, item),
-            ),
-            None,
-            rumps.MenuItem(
-                "Schedule job (soon)",
-                # callback=partial(controller.schedule_job, self.items[key]),
-            ),
-            [
-                rumps.MenuItem(
-                    "Edit",
-                    callback=partial(self.edit_name, item),
-                ),
-                [
-                    rumps.MenuItem(
-                        f"{controller.get_name_label(name)}",
-                        callback=partial(self.edit_name, item),
-                    ),
-                    rumps.MenuItem(
-                        f"{controller.get_source_label(source)}",
-                        callback=partial(self.edit_source, item),
-                    ),
-                    rumps.MenuItem(
-                        f"{controller.get_interpreter_label(interpreter)}",
-                        callback=partial(self.edit_interpreter, item),
-                    ),
-                ],
-            ],
-            rumps.MenuItem("Delete", callback=partial(self.delete, item)),
-        ]
+        if not controller.schedule_job(item, response.text):
+            return
+
+        self.render()  # the schedule label is part of the item's node
 
-    def delete(self, item: tuple, sender):
+    def delete(self, item: ScriptItem, sender):
         """
         Deletes the item from the user_config.txt file.
         """
         if len(self.items) <= 0:
             return
-        
-        for name, source, interpreter in self.items:
-            if (name, source, interpreter) == item:
-                self.items.remove(item)
-                break
 
-        self.menu.clear()
+        self.items.remove(item)
         controller.remove_item(item)
-        self.init_menu()
+        self.render()
 
     def open_config_file(self, _):
         """
@@ -316,6 +453,15 @@ class MenuBarApp(rumps.App):
 
         controller.open_config()
 
+    def show_stats(self, _):
+        """
+        Shows how long the scripts take and how much CPU and memory they use.
+
+        :params self: the MenuBarApp object.
+        """
+
+        rumps.alert(title="Stats", message=controller.get_stats())
+
     def report_issue(self, _):
         """
         Opens the GitHub issues page in the default browser.
@@ -0,0 +1,238 @@
+# menuscript/menu/model.py
+#
+# Pure-Python description of the menu. The app builds the tree it wants to show,
+# `diff` compares it with the tree currently shown and returns the operations
+# turning one into the other, and a backend such as `adapter.RumpsBackend` applies
+# them to the real menu. Nothing here imports rumps.
+
+INSERT = "insert"
+REMOVE = "remove"
+RETITLE = "retitle"
+REBIND = "rebind"
+
+
+class Node:
+    """
+    One entry of the menu tree. Nodes are treated as immutable once built, so an
+    unchanged subtree can be reused between renders and is skipped by `diff`
+    without being walked.
+
+    :param key: identity of the node, unique among its siblings.
+    :param title: text shown, or None for a separator.
+    :param action: hashable description of what clicking does, e.g.
+                   `("execute", "Report")`, or None.
+    :param children: list of child nodes for a submenu, or None.
+    :param shortcut: key equivalent, or None.
+    :param lazy: whether `children` is only a placeholder for the real submenu. The
+                 backend reports the first time the submenu is about to open, so
+                 the app can build it then; see `adapter.RumpsBackend`.
+    """
+
+    __slots__ = ("key", "title", "action", "children", "shortcut", "lazy")
+
+    def __init__(
+        self,
+        key,
+        title: str | None = None,
+        action=None,
+        children: list | None = None,
+        shortcut=None,
+        lazy: bool = False,
+    ) -> None:
+        self.key = key
+        self.title = title
+        self.action = action
+        self.children = children
+        self.shortcut = shortcut
+        self.lazy = lazy
+
+    def __repr__(self) -> str:
+        return f"<Node: {self.key!r} {self.title!r}>"
+
+    @property
+    def separator(self) -> bool:
+        return self.title is None
+
+    def count(self) -> int:
+        """
+        Returns the number of nodes in this subtree, this one included.
+        """
+        return 1 + sum(child.count() for child in self.children or ())
+
+
+class Op:
+    """
+    One change to the shown menu.
+
+    :param kind: `INSERT`, `REMOVE`, `RETITLE` or `REBIND`.
+    :param path: keys leading from the root to the node changed.
+    :param node: the node to insert, with its subtree.
+    :param after: key of the sibling the inserted node goes after, or None to
+                  insert it first.
+    """
+
+    __slots__ = ("kind", "path", "node", "after")
+
+    def __init__(self, kind: str, path: tuple, node: Node | None = None, after=None) -> None:
+        self.kind = kind
+        self.path = path
+        self.node = node
+        self.after = after
+
+    def __repr__(self) -> str:
+        return f"<Op: {self.kind} {self.path!r}>"
+
+
+def _compatible(old: Node, new: Node) -> bool:
+    # a node cannot turn into a separator, or gain or lose its submenu, in place
+    return old.separator == new.separator and (old.children is None) == (new.children is None)
+
+
+def _in_order(positions: list) -> set:
+    """
+    Returns the positions forming the longest increasing subsequence of
+    `positions`: the nodes that can stay where they are when the others move.
+    """
+    if all(a < b for a, b in zip(positions, positions[1:])):
+        return set(positions)  # nothing moved, the usual case
+
+    tails = []  # tails[k] = index into positions ending the best run of length k + 1
+    previous = [None] * len(positions)
+    for i, position in enumerate(positions):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if positions[tails[mid]] < position:
+                lo = mid + 1
+            else:
+                hi = mid
+        previous[i] = tails[lo - 1] if lo else None
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+
+    kept = set()
+    i = tails[-1] if tails else None
+    while i is not None:
+        kept.add(positions[i])
+        i = previous[i]
+    return kept
+
+
+def diff(old: list, new: list, parent: tuple = ()) -> list:
+    """
+    Returns the operations turning the menu `old` into `new`, both lists of nodes.
+    Removals come first, then insertions in order, each anchored to a sibling that
+    already exists by then. Nodes are matched by key; reused nodes are skipped.
+
+    :param parent: path of the menu the lists belong to.
+    """
+    ops = []
+    old_index = {node.key: i for i, node in enumerate(old)}
+    matched = {}
+    for node in new:
+        i = old_index.get(node.key)
+        if i is not None and _compatible(old[i], node):
+            matched[node.key] = i
+
+    kept = _in_order([matched[node.key] for node in new if node.key in matched])
+    for i, node in enumerate(old):
+        if i not in kept:
+            ops.append(Op(REMOVE, parent + (node.key,)))
+
+    after = None
+    for node in new:
+        path = parent + (node.key,)
+        i = matched.get(node.key)
+        if i is None or i not in kept:
+            ops.append(Op(INSERT, path, node, after))
+        elif old[i] is not node:
+            _diff_node(old[i], node, path, ops)
+        after = node.key
+    return ops
+
+
+def _diff_node(old: Node, new: Node, path: tuple, ops: list) -> None:
+    if old.title != new.title:
+        ops.append(Op(RETITLE, path, new))
+    if old.action != new.action or old.shortcut != new.shortcut:
+        ops.append(Op(REBIND, path, new))
+    if new.children is not None and old.children is not new.children:
+        ops.extend(diff(old.children, new.children, path))
+
+
+class MenuView:
+    """
+    The menu currently shown, kept as a tree of nodes, and the backend showing it.
+    `update` applies only the difference to a new tree.
+
+    :param backend: object with an `apply(ops)` method changing the real menu.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self.root = []
+        self.applied = 0  # operations applied so far
+
+    def update(self, tree: list) -> list:
+        """
+        Shows `tree`, a list of top level nodes. Returns the operations applied.
+        """
+        ops = diff(self.root, tree)
+        self.root = list(tree)
+        self._apply(ops)
+        return ops
+
+    def set_title(self, path: tuple, title: str) -> None:
+        """
+        Changes the title of one node without rebuilding the tree, e.g. a counter.
+        """
+        node = self.find(path)
+        if node is None or node.title == title:
+            return
+        self.replace(path, Node(node.key, title, node.action, node.children, node.shortcut, node.lazy))
+
+    def replace(self, path: tuple, new: Node) -> list:
+        """
+        Shows `new` in place of the node at `path`, e.g. a submenu built once it is
+        opened, comparing only the two subtrees. Returns the operations applied.
+        """
+        old = self.find(path)
+        if old is None:
+            return []
+        self._replace(path, new)
+        if _compatible(old, new):
+            ops = []
+            _diff_node(old, new, path, ops)
+        else:
+            parent = self.find(path[:-1]) if len(path) > 1 else None
+            siblings = parent.children if parent is not None else self.root
+            i = next(i for i, node in enumerate(siblings) if node.key == path[-1])
+            ops = [Op(REMOVE, path), Op(INSERT, path, new, siblings[i - 1].key if i else None)]
+        self._apply(ops)
+        return ops
+
+    def find(self, path: tuple) -> Node | None:
+        nodes = self.root
+        node = None
+        for key in path:
+            node = next((child for child in nodes or () if child.key == key), None)
+            if node is None:
+                return None
+            nodes = node.children
+        return node
+
+    def _replace(self, path: tuple, new: Node) -> None:
+        # copies the nodes along `path`, as subtrees may be shared with the app
+        if len(path) == 1:
+            self.root = [new if node.key == path[0] else node for node in self.root]
+            return
+        parent = self.find(path[:-1])
+        children = [new if node.key == path[-1] else node for node in parent.children]
+        self._replace(path[:-1], Node(parent.key, parent.title, parent.action, children, parent.shortcut))
+
+    def _apply(self, ops: list) -> None:
+        if ops:
+            self.backend.apply(ops)
+            self.applied += len(ops)
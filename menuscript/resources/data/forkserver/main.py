@@ -0,0 +1,184 @@
+# Fork server started by MenuScript for one interpreter. It imports the modules
+# given on the command line once, then forks a child per request which runs the
+# requested script as `__main__`, so the script skips the cost of those imports.
+#
+# usage: main.py <socket path> [module ...]
+#
+# A request is one JSON line `{"argv": [...], "cwd": "..."}` sent together with the
+# script's stdin, stdout and stderr descriptors. The server answers `pid <pid>` once
+# the child is forked and `exit <code> <user> <sys> <maxrss>` once it exited, with
+# negative codes for signals as in `subprocess` and the child's CPU times and peak
+# RSS from `getrusage`. The server exits when its stdin is closed, i.e. when
+# MenuScript quits.
+#
+# This runs under the configured interpreter, not MenuScript's own, so it has to
+# stay compatible with older Python 3 versions.
+
+import array
+import atexit
+import importlib
+import json
+import os
+import runpy
+import select
+import signal
+import socket
+import sys
+import traceback
+
+FDS = 3  # stdin, stdout and stderr of the script
+
+
+def recv_request(conn):
+    fds = array.array("i")
+    data = b""
+    while not data.endswith(b"\n"):
+        msg, ancdata, _, _ = conn.recvmsg(65536, socket.CMSG_SPACE(FDS * fds.itemsize))
+        if not msg:
+            raise EOFError("connection closed before the request was complete")
+        data += msg
+        for level, kind, cmsg in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(cmsg[: len(cmsg) - (len(cmsg) % fds.itemsize)])
+    return json.loads(data.decode("utf-8")), list(fds)
+
+
+def exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_script(request, fds):
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    os.setsid()  # own process group, so MenuScript can stop the script and its children
+
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+    for fd in fds:
+        if fd > 2:
+            os.close(fd)
+
+    os.chdir(request["cwd"])
+    sys.argv = list(request["argv"])
+    sys.path[0] = request["cwd"]
+
+    code = 0
+    try:
+        runpy.run_path(sys.argv[0], run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+
+    try:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code)
+
+
+def reap(children):
+    while children:
+        try:
+            pid, status, rusage = os.wait3(os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            reply = "exit %d %f %f %d\n" % (exit_code(status), rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss)
+            conn.sendall(reply.encode("utf-8"))
+        except OSError:
+            pass
+        conn.close()
+
+
+def main():
+    path, modules = sys.argv[1], sys.argv[2:]
+
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print("Could not preload module '%s': %s" % (name, e), file=sys.stderr)
+
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    listener.listen(16)
+
+    # SIGCHLD wakes up the select loop through this pipe
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *args: None)
+
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+
+    children = {}
+    try:
+        while True:
+            readable = select.select([listener, wake_r, sys.stdin], [], [])[0]
+
+            if sys.stdin in readable and not os.read(sys.stdin.fileno(), 512):
+                break
+
+            if listener in readable:
+                conn, _ = listener.accept()
+                fds = []
+                try:
+                    request, fds = recv_request(conn)
+                    if len(fds) != FDS:
+                        raise ValueError("expected %d descriptors, got %d" % (FDS, len(fds)))
+                except Exception as e:
+                    print("Rejected request: %s" % e, file=sys.stderr)
+                    for fd in fds:
+                        os.close(fd)
+                    conn.close()
+                    continue
+
+                pid = os.fork()
+                if pid == 0:
+                    signal.set_wakeup_fd(-1)
+                    listener.close()
+                    conn.close()
+                    os.close(wake_r)
+                    os.close(wake_w)
+                    run_script(request, fds)
+
+                for fd in fds:
+                    os.close(fd)
+                children[pid] = conn
+                conn.sendall(("pid %d\n" % pid).encode("utf-8"))
+
+            if wake_r in readable:
+                os.read(wake_r, 512)
+            reap(children)
+    finally:
+        listener.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# tests/conftest.py
+#
+# The app runs with menuscript/ on sys.path, so the tests do too.
+
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "menuscript"))
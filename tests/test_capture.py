@@ -0,0 +1,60 @@
+# tests/test_capture.py
+
+import sys
+
+from controller import capture
+from controller.capture import StreamWindow
+
+# writes `n` numbered lines to both streams, interleaved
+SCRIPT = """
+import sys
+for i in range(int(sys.argv[1])):
+    sys.stdout.write(f"out {i:08d}\\n")
+    sys.stderr.write(f"err {i:08d}\\n")
+"""
+
+
+def test_short_output_is_kept_whole():
+    window = StreamWindow(8, 8)
+    window.write(b"hello ")
+    window.write(b"world")
+    assert not window.truncated
+    assert window.excerpt() == "hello world"
+
+
+def test_long_output_keeps_head_and_tail_only():
+    window = StreamWindow(4, 4)
+    for i in range(1000):
+        window.write(f"{i:04d}".encode())
+        assert len(window._tail) <= 2 * 4
+    assert window.total == 4000
+    assert window.truncated
+    assert window.excerpt() == "0000\n... [3992 bytes truncated] ...\n0999"
+
+
+def test_tail_can_be_turned_off():
+    window = StreamWindow(2, 0)
+    window.write(b"abcdef")
+    assert window.excerpt() == "ab\n... [4 bytes truncated] ...\n"
+
+
+def test_both_streams_are_drained_without_blocking(tmp_path):
+    lines = 200_000  # megabytes on each stream, more than a pipe buffer holds
+    spill = tmp_path / "spill"
+    result = capture.run([sys.executable, "-c", SCRIPT, str(lines)], tmp_path, 64, 64, spill)
+
+    assert result.returncode == 0
+    assert result.stdout.total == result.stderr.total == lines * 13
+    excerpt = result.stdout.excerpt()
+    assert excerpt.startswith("out 00000000\n") and excerpt.endswith(f"out {lines - 1:08d}\n")
+    assert len(excerpt) < 200
+
+    assert spill.with_name("spill.stdout").stat().st_size == lines * 13
+    assert spill.with_name("spill.stderr").read_bytes().endswith(f"err {lines - 1:08d}\n".encode())
+
+
+def test_log_gets_both_streams(tmp_path):
+    log = tmp_path / "runs" / "a" / "run.log"
+    result = capture.run([sys.executable, "-c", SCRIPT, "3"], tmp_path, log=log)
+    assert result.returncode == 0
+    assert sorted(log.read_text().splitlines()) == [f"{s} {i:08d}" for s in ("err", "out") for i in range(3)]
@@ -0,0 +1,57 @@
+# tests/test_control.py
+
+import os
+import sys
+import time
+
+from controller import capture
+from controller.control import TIMEOUT, RunControl
+
+# starts a grandchild ignoring SIGTERM, with its own output, so it does not keep
+# the script's pipes open, then waits to be stopped
+SCRIPT = """
+import subprocess, sys, time
+child = subprocess.Popen(
+    [sys.executable, "-c", "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(60)"],
+    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+)
+open(sys.argv[1], "w").write(str(child.pid))
+time.sleep(60)
+"""
+
+
+def alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # an orphan killed by the test may stay a zombie if nothing reaps it
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:  # no /proc, e.g. on macOS
+        return True
+
+
+def test_grandchild_ignoring_sigterm_is_killed_after_the_script_exits(tmp_path):
+    pidfile = tmp_path / "pid"
+    control = RunControl(timeout=0.5, grace=0.5)
+    result = capture.run([sys.executable, "-c", SCRIPT, str(pidfile)], tmp_path, control=control)
+
+    assert control.reason == TIMEOUT
+    assert result.returncode is not None and result.returncode < 0
+    pid = int(pidfile.read_text())
+
+    deadline = time.monotonic() + 5
+    while alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not alive(pid)
+
+
+def test_finished_run_cannot_be_cancelled(tmp_path):
+    control = RunControl(timeout=0.2)
+    result = capture.run([sys.executable, "-c", "pass"], tmp_path, control=control)
+    assert result.returncode == 0
+    time.sleep(0.3)
+    assert not control.stopped
+    assert not control.cancel()
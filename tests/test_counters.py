@@ -0,0 +1,50 @@
+# tests/test_counters.py
+
+import time
+
+from controller.counters import Counters
+
+
+def test_increments_are_written_once_per_interval(tmp_path):
+    path = tmp_path / ".data.txt"
+    counters = Counters(path, interval=0.2)
+    for _ in range(100):
+        counters.increment("a")
+    counters.increment()
+    assert counters.total == 101 and counters.get("a") == 100
+    assert not path.exists()
+
+    deadline = time.monotonic() + 5
+    while counters.writes == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert counters.writes == 1
+    assert path.read_text() == "(executions)101\n(script)[a](executions)[100]\n"
+
+
+def test_flush_applies_changes_on_top_of_the_file(tmp_path):
+    path = tmp_path / ".data.txt"
+    path.write_text("(executions)10\n(script)[a](executions)[4]\n(script)[b](executions)[6]\n(theme)[dark]\n")
+    counters = Counters(path, interval=60)
+    assert counters.load() == 10
+
+    counters.increment("a")
+    counters.rename("a", "c")
+    counters.remove("b")
+    # another process counted runs meanwhile
+    path.write_text("(executions)15\n(script)[a](executions)[7]\n(script)[b](executions)[8]\n(theme)[dark]\n")
+
+    assert counters.flush()
+    assert counters.total == 16 and counters.get("c") == 8 and counters.get("b") == 0
+    assert path.read_text() == "(executions)16\n(script)[c](executions)[8]\n(theme)[dark]\n"
+    assert counters.flush() and counters.writes == 1  # nothing left to write
+
+
+def test_failed_write_keeps_the_changes(tmp_path):
+    path = tmp_path / "missing" / ".data.txt"
+    counters = Counters(path, interval=60)
+    counters.increment("a")
+    assert not counters.flush()
+
+    path.parent.mkdir()
+    assert counters.flush()
+    assert path.read_text() == "(executions)1\n(script)[a](executions)[1]\n"
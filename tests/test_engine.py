@@ -0,0 +1,36 @@
+# tests/test_engine.py
+
+from controller.engine import Dispatcher, ExecutionEngine
+
+
+def test_callback_added_after_the_run_finished_is_dispatched():
+    dispatcher = Dispatcher()
+    engine = ExecutionEngine(lambda item: "ok", dispatcher, max_workers=2)
+    calls = []
+    try:
+        handles = [engine.submit(("a", "a.py", None), calls.append) for _ in range(50)]
+        for handle in handles:
+            handle.wait(5)
+            handle.add_done_callback(lambda h: calls.append(("late", h)))
+    finally:
+        engine.shutdown(wait=True)
+
+    dispatcher.drain()
+    assert len(calls) == 100
+    for handle in handles:  # the late callback still comes after the one passed to submit
+        assert calls.index(handle) < calls.index(("late", handle))
+
+
+def test_runner_errors_become_the_result():
+    dispatcher = Dispatcher()
+
+    def runner(item):
+        raise RuntimeError("boom")
+
+    engine = ExecutionEngine(runner, dispatcher)
+    try:
+        handle = engine.submit(("a", "a.py", None))
+        assert isinstance(handle.wait(5), RuntimeError)
+        assert handle.done() and not engine.running()
+    finally:
+        engine.shutdown(wait=True)
@@ -0,0 +1,70 @@
+# tests/test_forkserver.py
+
+import pathlib
+import sys
+import time
+
+import pytest
+
+from controller.capture import Capture
+from controller.forkserver import ForkServerPool, parse_modules
+
+SCRIPT = pathlib.Path(__file__).resolve().parent.parent / "menuscript" / "resources" / "data" / "forkserver" / "main.py"
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ForkServerPool(SCRIPT, tmp_path / "run")
+    yield pool
+    pool.shutdown()
+
+
+def wait_ready(pool, interpreter):
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        server = pool.get(interpreter)
+        if server is not None:
+            return server
+        time.sleep(0.05)
+    pytest.fail("fork server did not start")
+
+
+def test_parse_modules():
+    assert parse_modules("pandas, requests  json") == ("pandas", "requests", "json")
+
+
+def test_scripts_are_forked_with_modules_preloaded(pool, tmp_path):
+    pool.configure({sys.executable: ("json",)})
+    server = wait_ready(pool, sys.executable)
+
+    script = tmp_path / "main.py"
+    script.write_text(
+        "import os, sys\n"
+        "print('json' in sys.modules, os.path.basename(os.getcwd()), sys.argv[1:])\n"
+        "sys.stderr.write('warning\\n')\n"
+        "sys.exit(3)\n"
+    )
+    started = []
+    capture = Capture()
+    returncode = server.run([script.name, "x"], tmp_path, capture, started.append)
+
+    assert returncode == 3
+    assert capture.stdout.excerpt() == f"True {tmp_path.name} ['x']\n"
+    assert capture.stderr.excerpt() == "warning\n"
+    assert len(started) == 1 and started[0] > 0
+    assert capture.usage is not None and capture.usage.wall > 0
+
+
+def test_servers_follow_the_configuration(pool):
+    pool.configure({sys.executable: ("json",)})
+    first = wait_ready(pool, sys.executable)
+
+    pool.configure({sys.executable: ("json",)})
+    assert pool.get(sys.executable) is first
+
+    pool.configure({sys.executable: ("csv",)})
+    assert not first.alive
+    assert wait_ready(pool, sys.executable).modules == ("csv",)
+
+    pool.configure({})
+    assert pool.get(sys.executable) is None
@@ -0,0 +1,76 @@
+# tests/test_groups.py
+
+import pytest
+
+from controller.groups import GroupRun, parse_group
+
+
+class Runner:
+    """
+    Collects submitted members so a test decides when and how each one finishes.
+    """
+
+    def __init__(self) -> None:
+        self.started = []
+        self.callbacks = {}
+        self.done = []
+
+    def submit(self, name, on_done) -> None:
+        self.started.append(name)
+        self.callbacks[name] = on_done
+
+    def finish(self, name, ok=True) -> None:
+        self.callbacks.pop(name)(name, ok)
+
+
+def start(members: str, parallel: str = "") -> tuple:
+    runner = Runner()
+    run = GroupRun(parse_group("g", members, parallel), runner.submit, runner.done.append)
+    run.start()
+    return run, runner
+
+
+def test_dependents_start_after_their_dependencies():
+    run, runner = start("a; b: a; c: a, b")
+    assert runner.started == ["a"]
+    runner.finish("a")
+    assert runner.started == ["a", "b"]
+    runner.finish("b")
+    runner.finish("c")
+    assert run.succeeded == ["a", "b", "c"]
+    assert runner.done == [run] and run.ok
+
+
+def test_failure_cancels_transitive_dependents():
+    run, runner = start("a; b: a; c: b; d")
+    runner.finish("a", ok=False)
+    runner.finish("d")
+    assert run.failed == ["a"]
+    assert sorted(run.cancelled) == ["b", "c"]
+    assert runner.done == [run] and not run.ok
+
+
+def test_failed_member_sharing_a_dependent_with_one_that_succeeds():
+    run, runner = start("a; b; d: a, b")
+    runner.finish("a", ok=False)
+    runner.finish("b")
+    assert run.failed == ["a"] and run.succeeded == ["b"]
+    assert run.cancelled == ["d"]
+    assert "d" not in runner.started
+    assert runner.done == [run]
+
+
+def test_parallel_limit():
+    run, runner = start("a; b; c", parallel="2")
+    assert runner.started == ["a", "b"]
+    runner.finish("b")
+    assert runner.started == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize(
+    "members, message",
+    [("a: b", "not in the group"), ("a: b; b: a", "cycle"), ("a; a", "listed twice"), ("", "at least one")],
+)
+def test_parse_group_errors(members, message):
+    with pytest.raises(ValueError, match=message):
+        parse_group("g", members)
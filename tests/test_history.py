@@ -0,0 +1,52 @@
+# tests/test_history.py
+
+import pytest
+
+from controller.history import History, percentile
+
+
+@pytest.mark.parametrize(
+    "p, expected",
+    [(0, 1), (50, 5), (95, 10), (99, 10), (100, 10)],
+)
+def test_percentile_nearest_rank(p, expected):
+    assert percentile(list(range(1, 11)), p) == expected
+
+
+def test_percentile_of_nothing():
+    assert percentile([], 50) is None
+
+
+def test_rows_are_written_in_batches_on_close(tmp_path):
+    history = History(tmp_path / "history.sqlite3", linger=0.05)
+    for i in range(300):
+        history.record("a", 1000 + i, i / 100, "ok")
+    history.close()
+
+    assert history.written == 300
+    [stats] = history.stats()
+    assert stats["runs"] == 300 and stats["failed"] == 0
+    assert stats["p50"] == pytest.approx(1.49)
+
+
+def test_stats_per_item_and_window(tmp_path):
+    history = History(tmp_path / "history.sqlite3", linger=0)
+    history.record("a", 100, 1.0, "ok", 0, cpu=0.5, max_rss=2**20)
+    history.record("a", 200, 3.0, "failed", 1, cpu=1.5, max_rss=2**21)
+    history.record("a", 300, 2.0, "timeout")
+    history.record("b", 300, 9.0, "ok")
+    history.close()
+
+    a, b = history.stats()
+    assert (a["item"], a["runs"], a["failed"]) == ("a", 3, 2)
+    assert a["failure_rate"] == pytest.approx(2 / 3)
+    assert (a["p50"], a["p99"]) == (2.0, 3.0)
+    assert a["mean_cpu"] == 1.0 and a["max_rss"] == 2**21
+    assert b["mean_cpu"] is None and b["max_rss"] is None
+
+    assert [s["runs"] for s in history.stats(since=150, until=300)] == [1]
+    assert history.stats(item="b")[0]["p50"] == 9.0
+
+
+def test_missing_database_has_no_stats(tmp_path):
+    assert History(tmp_path / "history.sqlite3").stats() == []
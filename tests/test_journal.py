@@ -0,0 +1,100 @@
+# tests/test_journal.py
+
+import time
+
+import pytest
+
+from controller.journal import Journal
+from controller.store import ConfigStore
+
+CONFIG = (
+    "(setting)[journal](value)[on]\n"
+    "(name)[a](source)[/a.py](interpreter)[]\n"
+    "(name)[b](source)[/b.py](interpreter)[]\n"
+)
+
+
+def make_store(tmp_path, config=CONFIG) -> ConfigStore:
+    path = tmp_path / ".config.txt"
+    if not path.exists():
+        path.write_text(config)
+    store = ConfigStore(path)
+    store.load()
+    return store
+
+
+def journal_path(store: ConfigStore):
+    return store.path.with_name(".config.journal")
+
+
+def test_records_are_read_back_in_order(tmp_path):
+    journal = Journal(tmp_path / "journal")
+    journal.append("rename", "a", "b")
+    journal.append("set-source", "b", "/b.py")
+    journal.close()
+    assert list(journal.records()) == [("rename", ["a", "b"]), ("set-source", ["b", "/b.py"])]
+
+    with pytest.raises(ValueError):
+        journal.append("truncate")
+
+
+def test_torn_record_is_skipped_and_terminated(tmp_path):
+    path = tmp_path / "journal"
+    path.write_bytes(b'["remove", "a"]\n["rename", "b"')
+    journal = Journal(path)
+    journal.append("remove", "c")
+    journal.close()
+    assert list(journal.records()) == [("remove", ["a"]), ("remove", ["c"])]
+
+
+def test_edits_are_journaled_and_replayed_on_load(tmp_path):
+    store = make_store(tmp_path)
+    assert store.journaled
+    store.rename("a", "c")
+    store.add("d", "/d.py", None)
+    store.remove("b")
+    store.discard()  # nothing is left to flush, the journal already has it all
+    assert store.path.read_text() == CONFIG
+
+    again = make_store(tmp_path)
+    assert again.items() == [("c", "/a.py", ""), ("d", "/d.py", "")]
+
+
+def test_compaction_folds_the_journal_into_the_config(tmp_path):
+    store = make_store(tmp_path)
+    store.set_source("a", "/a2.py")
+    assert store.compact()
+    assert not journal_path(store).exists()
+    assert "(name)[a](source)[/a2.py](interpreter)[]\n" in store.path.read_text()
+
+    # replaying a journal that was already folded in changes nothing
+    Journal(journal_path(store)).append("rename", "a", "x")
+    Journal(journal_path(store)).append("rename", "missing", "y")
+    assert make_store(tmp_path).items() == [("x", "/a2.py", ""), ("b", "/b.py", "")]
+
+
+def test_journal_past_its_limit_is_compacted_in_the_background(tmp_path):
+    store = make_store(tmp_path, CONFIG + "(setting)[journal_limit](value)[100]\n")
+    for i in range(5):
+        store.set_source("a", f"/a{i}.py")
+
+    deadline = time.monotonic() + 5
+    while journal_path(store).exists() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert not journal_path(store).exists()
+    assert "(source)[/a4.py]" in store.path.read_text()
+
+
+def test_turning_journaling_off_folds_the_remaining_records(tmp_path):
+    store = make_store(tmp_path)
+    store.rename("a", "c")
+    store.discard()
+    store.path.write_text(store.path.read_text().replace("[on]", "[off]"))
+
+    store = make_store(tmp_path)
+    assert not store.journaled
+    assert store.items()[0] == ("c", "/a.py", "")
+    deadline = time.monotonic() + 5
+    while journal_path(store).exists() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert "(name)[c]" in store.path.read_text()
@@ -0,0 +1,92 @@
+# tests/test_locks.py
+
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+from controller import locks
+from controller.counters import Counters
+from controller.store import ConfigStore
+
+MENUSCRIPT = pathlib.Path(__file__).resolve().parent.parent / "menuscript"
+
+# one process adding items to the config and counting runs, each edit written
+# as soon as it is made, the way overlapping instances do
+WORKER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from controller.counters import Counters
+from controller.store import ConfigStore
+
+directory, worker, count = sys.argv[2], sys.argv[3], int(sys.argv[4])
+store = ConfigStore(f"{directory}/.config.txt")
+store.load()
+counters = Counters(f"{directory}/.data.txt")
+for i in range(count):
+    store.add(f"{worker}-{i}", f"/{worker}/{i}.py", None)
+    assert store.flush()
+    counters.increment(worker)
+    assert counters.flush()
+"""
+
+
+def test_concurrent_processes_lose_no_edits(tmp_path):
+    (tmp_path / ".config.txt").write_text("# config\n")
+    workers, count = 4, 25
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WORKER, str(MENUSCRIPT), str(tmp_path), f"w{k}", str(count)])
+        for k in range(workers)
+    ]
+    assert [p.wait(timeout=60) for p in processes] == [0] * workers
+
+    store = ConfigStore(tmp_path / ".config.txt")
+    names = {item[0] for item in store.load()}
+    assert names == {f"w{k}-{i}" for k in range(workers) for i in range(count)}
+
+    counters = Counters(tmp_path / ".data.txt")
+    assert counters.load() == workers * count
+    assert all(counters.get(f"w{k}") == count for k in range(workers))
+
+
+def test_lock_held_by_another_process_times_out(tmp_path):
+    path = tmp_path / "file"
+    holder = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import sys, time; sys.path.insert(0, sys.argv[1]); from controller import locks\n"
+            "with locks.locked(sys.argv[2]):\n    print('locked', flush=True); time.sleep(30)",
+            str(MENUSCRIPT),
+            str(path),
+        ],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        assert holder.stdout.readline() == b"locked\n"
+        with pytest.raises(locks.Timeout):
+            with locks.locked(path, timeout=0.1):
+                pass
+    finally:
+        holder.kill()
+        holder.wait()
+
+    with locks.locked(path, timeout=5):
+        with locks.locked(path):  # re-entered by the same thread
+            pass
+
+
+def test_atomic_write_keeps_permissions_and_cleans_up(tmp_path):
+    path = tmp_path / "file"
+    path.write_text("old")
+    path.chmod(0o600)
+    locks.atomic_write(path, b"new")
+    assert path.read_text() == "new"
+    assert path.stat().st_mode & 0o777 == 0o600
+
+    with pytest.raises(TypeError):
+        locks.atomic_write(path, 42)
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["file"]
@@ -0,0 +1,84 @@
+# tests/test_memo.py
+
+import os
+import sys
+import time
+
+import pytest
+
+from controller import memo
+from controller.memo import ResultCache
+
+
+@pytest.fixture
+def script(tmp_path):
+    source = tmp_path / "main.py"
+    source.write_text("print('hi')\n")
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "a.csv").write_text("1\n")
+    return source
+
+
+def key(source, inputs=("data/*.csv",)):
+    return memo.fingerprint(str(source), sys.executable, list(inputs))
+
+
+def test_key_is_stable(script):
+    assert key(script) == key(script)
+
+
+def test_key_changes_with_the_script(script):
+    before = key(script)
+    os.utime(script, ns=(0, 0))  # the content counts, not the mtime
+    assert key(script) == before
+    script.write_text("print('bye')\n")
+    assert key(script) != before
+
+
+def test_key_changes_with_the_inputs(script):
+    before = key(script)
+    (script.parent / "data" / "b.csv").write_text("2\n")
+    added = key(script)
+    assert added != before
+
+    (script.parent / "data" / "a.csv").write_text("1, 2\n")
+    assert key(script) != added
+    assert key(script, ()) == key(script, ())
+    assert key(script, ("other/*.csv",)) != key(script)
+
+
+def test_key_changes_with_the_interpreter(script, tmp_path):
+    interpreter = tmp_path / "python"
+    interpreter.write_text("")
+    before = memo.fingerprint(str(script), str(interpreter), [])
+    os.utime(interpreter, ns=(0, 0))
+    assert memo.fingerprint(str(script), str(interpreter), []) != before
+    assert memo.fingerprint(str(script), sys.executable, []) != before
+
+
+def test_parse_options():
+    assert memo.parse_ttl("") is None
+    assert memo.parse_ttl("10m") == 600
+    assert memo.parse_inputs(" data/*.csv; ;~/notes.txt ") == ["data/*.csv", "~/notes.txt"]
+
+
+def test_entries_expire_after_their_ttl(tmp_path):
+    cache = ResultCache(tmp_path / "results")
+    cache.put("k", {"ok": True})
+    assert cache.get("k")["ok"]
+    assert cache.get("k", ttl=60) is not None
+    assert cache.get("k", ttl=-1) is None
+    assert cache.get("missing") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path / "results", limit=3000)
+    for name in ("a", "b", "c"):
+        cache.put(name, {"output": "x" * 900})
+        time.sleep(0.01)
+    cache.get("a")  # now more recently used than b
+    time.sleep(0.01)
+    cache.put("d", {"output": "x" * 900})
+
+    assert cache.get("b") is None
+    assert all(cache.get(name) is not None for name in ("a", "c", "d"))
@@ -0,0 +1,93 @@
+# tests/test_model.py
+
+from menu.model import INSERT, REBIND, REMOVE, RETITLE, MenuView, Node, diff
+
+
+def nodes(*keys) -> list:
+    return [Node(key, key) for key in keys]
+
+
+def summary(ops: list) -> list:
+    return [(op.kind, op.path, op.after) if op.kind == INSERT else (op.kind, op.path) for op in ops]
+
+
+class Backend:
+    def __init__(self) -> None:
+        self.ops = []
+
+    def apply(self, ops: list) -> None:
+        self.ops.extend(ops)
+
+
+def test_unchanged_menu_needs_no_operations():
+    old = nodes("a", "b", "c")
+    assert diff(old, old) == []
+    assert diff(old, nodes("a", "b", "c")) == []
+
+
+def test_inserts_are_anchored_to_the_previous_sibling():
+    ops = diff(nodes("b"), nodes("a", "b", "c"))
+    assert summary(ops) == [(INSERT, ("a",), None), (INSERT, ("c",), "b")]
+
+
+def test_removals_come_first():
+    ops = diff(nodes("a", "b", "c"), nodes("c", "d"))
+    assert summary(ops) == [(REMOVE, ("a",)), (REMOVE, ("b",)), (INSERT, ("d",), "c")]
+
+
+def test_move_keeps_the_longest_run_in_order():
+    ops = diff(nodes("a", "b", "c", "d", "e"), nodes("b", "c", "d", "e", "a"))
+    assert summary(ops) == [(REMOVE, ("a",)), (INSERT, ("a",), "e")]
+
+
+def test_retitle_and_rebind():
+    old = [Node("a", "A", ("execute", "a")), Node("b", "B", ("execute", "b"))]
+    new = [Node("a", "A2", ("execute", "a")), Node("b", "B", ("execute", "b"), shortcut="b")]
+    assert summary(diff(old, new)) == [(RETITLE, ("a",)), (REBIND, ("b",))]
+
+
+def test_node_changing_kind_is_replaced():
+    old = [Node("a", "A"), Node("s")]
+    new = [Node("a", "A", children=nodes("x")), Node("s", "S")]
+    ops = diff(old, new)
+    assert summary(ops) == [(REMOVE, ("a",)), (REMOVE, ("s",)), (INSERT, ("a",), None), (INSERT, ("s",), "a")]
+
+
+def test_submenus_are_diffed_unless_reused():
+    children = nodes("x", "y")
+    old = [Node("m", "M", children=children)]
+    assert diff(old, [Node("m", "M", children=children)]) == []
+
+    ops = diff(old, [Node("m", "M", children=nodes("x", "z"))])
+    assert summary(ops) == [(REMOVE, ("m", "y")), (INSERT, ("m", "z"), "x")]
+
+
+def test_view_applies_only_the_difference():
+    backend = Backend()
+    view = MenuView(backend)
+    view.update(nodes("a", "b"))
+    assert len(backend.ops) == 2
+
+    view.update(nodes("a", "b", "c"))
+    assert summary(backend.ops[2:]) == [(INSERT, ("c",), "b")]
+    assert view.applied == 3
+
+
+def test_set_title_and_replace_inside_a_submenu():
+    backend = Backend()
+    view = MenuView(backend)
+    shared = [Node("m", "M", children=nodes("x", "y"))]
+    view.update(shared)
+
+    view.set_title(("m", "x"), "X")
+    assert summary(backend.ops[1:]) == [(RETITLE, ("m", "x"))]
+    assert view.find(("m", "x")).title == "X"
+    assert shared[0].children[0].title == "x"  # the app's tree is not changed
+
+    view.set_title(("m", "x"), "X")
+    assert len(backend.ops) == 2
+
+    ops = view.replace(("m", "y"), Node("y", "Y", children=nodes("z")))
+    assert summary(ops) == [(REMOVE, ("m", "y")), (INSERT, ("m", "y"), "x")]
+    assert view.find(("m", "y", "z")) is not None
+    assert view.replace(("missing",), Node("missing")) == []
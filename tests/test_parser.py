@@ -0,0 +1,58 @@
+# tests/test_parser.py
+
+import pytest
+
+from controller.parser import ConfigSyntaxError, format_line, iter_items, tokenize_line
+
+CONFIG = [
+    "# comment\n",
+    "(setting)[precompile](value)[off]\n",
+    "(name)[a](source)[/a.py](interpreter)[]\n",
+    "  (name)[b](source)[/b.py](interpreter)[/usr/bin/python3](flags)[forkserver]\n",
+    "(group)[g](members)[a; b: a]\n",
+    "(name)[c](source)[/c.py]\n",
+    "(name)[d](source)[/d.py](interpreter\n",
+    "\n",
+    format_line("e", "/e.py", None),
+]
+
+
+def test_items_are_yielded_with_their_line_numbers():
+    errors = []
+    items = list(iter_items(CONFIG, errors))
+    assert items == [
+        (3, "a", "/a.py", ""),
+        (4, "b", "/b.py", "/usr/bin/python3"),
+        (9, "e", "/e.py", ""),
+    ]
+    assert [(e.lineno, e.col) for e in errors] == [(6, 25), (7, 37)]
+
+
+def test_iter_items_is_lazy():
+    errors = []
+    items = iter_items(iter(CONFIG), errors)
+    assert next(items)[0] == 3
+    assert errors == []
+
+
+@pytest.mark.parametrize(
+    "line, col, message",
+    [
+        ("(name)[c](source)[/c.py]", 25, "found 2 field(s)"),
+        ("(name)[d](source)[/d.py](interpreter", 37, "unterminated '(' label"),
+        ("(name)[d](source)[/d.py](interpreter)x", 38, "expected '[' after label"),
+        ("(name)[d](source)[/d.py](interpreter)[", 38, "unterminated '[' value"),
+        ("(name)[d](source)[/d.py] (interpreter)[]", 25, "expected '(' but found ' '"),
+    ],
+)
+def test_syntax_errors_point_at_the_column(line, col, message):
+    with pytest.raises(ConfigSyntaxError) as info:
+        tokenize_line(line, 5)
+    assert (info.value.lineno, info.value.col) == (5, col)
+    assert message in info.value.message
+    assert str(info.value).startswith(f"line 5, column {col}: ")
+
+
+def test_lines_that_are_not_items_are_ignored():
+    for line in CONFIG[:2] + CONFIG[4:5] + CONFIG[7:8]:
+        assert tokenize_line(line) is None
@@ -0,0 +1,46 @@
+# tests/test_pathcache.py
+
+import os
+import sys
+
+from controller.pathcache import PathCache
+
+
+def test_only_executable_files_are_interpreters(tmp_path):
+    script = tmp_path / "python"
+    script.write_text("#!/bin/sh\n")
+    script.chmod(0o644)
+    cache = PathCache(ttl=0)
+
+    assert cache.lookup(sys.executable).executable
+    assert not cache.lookup(tmp_path).executable  # e.g. a sys.path lib directory
+    assert not cache.lookup(tmp_path / "missing").executable
+
+    info = cache.lookup(script)
+    assert info.is_file and not info.executable
+    script.chmod(0o755)
+    os.utime(script, ns=(0, 0))  # the cache revalidates by mtime
+    assert cache.lookup(script).executable
+
+
+def test_entries_are_trusted_for_the_ttl(tmp_path):
+    now = [0.0]
+    cache = PathCache(ttl=5, clock=lambda: now[0])
+    path = tmp_path / "a.py"
+
+    assert not cache.lookup(path).exists
+    path.write_text("")
+    assert not cache.lookup(path).exists
+    assert cache.hits == 1
+
+    now[0] = 6.0
+    assert cache.lookup(path).is_file
+    assert cache.stats()["misses"] == 2
+
+
+def test_bulk_validate_looks_each_path_up_once(tmp_path):
+    cache = PathCache()
+    paths = [tmp_path / str(i) for i in range(8)] * 2
+    found = cache.bulk_validate(paths)
+    assert len(found) == 8
+    assert cache.misses == 8
@@ -0,0 +1,31 @@
+# tests/test_runlogs.py
+
+import subprocess
+import sys
+
+from controller.capture import Capture
+from controller.runlogs import RunLogs
+
+
+def test_new_path_leaves_no_directory_until_the_log_is_opened(tmp_path):
+    logs = RunLogs(tmp_path / "runs")
+    path = logs.new_path("a/b")
+    assert not path.parent.exists()
+
+    logs.finished(path)
+    logs.shutdown()
+    assert not (tmp_path / "runs").exists()
+    assert logs.latest("a/b") is None
+
+
+def test_capture_creates_the_log_directory(tmp_path):
+    logs = RunLogs(tmp_path / "runs")
+    path = logs.new_path("item")
+    capture = Capture(log=path)
+    process = subprocess.Popen([sys.executable, "-c", "print('hi')"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    capture.attach(process.stdout, process.stderr)
+    capture.wait(process)
+    logs.finished(path)
+    logs.shutdown()
+    assert logs.latest("item") == path
+    assert path.read_bytes().strip() == b"hi"
@@ -0,0 +1,24 @@
+# tests/test_runner.py
+
+import sys
+
+import pytest
+
+from controller import runner
+
+
+@pytest.mark.parametrize("interpreter", [None, "", "/nonexistent/python", "{lib}"])
+def test_invalid_interpreters_fall_back_to_the_global_one(tmp_path, interpreter):
+    source = tmp_path / "main.py"
+    source.write_text("import sys; print(sys.executable)\n")
+    if interpreter == "{lib}":  # a directory, as sys.path entries are
+        interpreter = str(tmp_path)
+
+    result = runner.run(("main", str(source), interpreter))
+    assert result.ok, result.message
+    assert result.stdout.strip() == sys.executable
+
+
+def test_executable_interpreter_is_used(tmp_path):
+    assert runner.resolve_interpreter(sys.executable) is not None
+    assert runner.build_command(runner.resolve_interpreter(sys.executable), "main.py")[0] == sys.executable
@@ -0,0 +1,82 @@
+# tests/test_scheduler.py
+
+import datetime
+
+import pytest
+
+from controller.scheduler import CronExpression, Scheduler
+
+
+def at(*args) -> float:
+    # local time, as cron expressions are; January has no DST change
+    return datetime.datetime(2026, 1, *args).timestamp()
+
+
+@pytest.mark.parametrize(
+    "expression, after, expected",
+    [
+        ("*/15 * * * *", at(5, 10, 7), at(5, 10, 15)),
+        ("0 9 * * 1-5", at(9, 17, 0), at(12, 9, 0)),  # Friday evening -> Monday
+        ("30 8 1 * *", at(1, 8, 30), datetime.datetime(2026, 2, 1, 8, 30).timestamp()),
+        ("@daily", at(5, 23, 59), at(6, 0, 0)),
+        ("0 0 13 * 5", at(1), at(2)),  # day of the month or Friday
+        ("0 12 * * 7", at(5), at(11, 12, 0)),  # 7 is Sunday
+    ],
+)
+def test_next_after(expression, after, expected):
+    assert CronExpression(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("* * * *", "expected 5 fields"),
+        ("60 * * * *", "minute '60' is out of range"),
+        ("* * * 0 *", "month '0' is out of range"),
+        ("*/0 * * * *", "out of range"),
+        ("a * * * *", "invalid minute 'a'"),
+    ],
+)
+def test_malformed_expressions(expression, message):
+    with pytest.raises(ValueError, match=message):
+        CronExpression(expression)
+
+
+def test_impossible_date_never_fires():
+    with pytest.raises(ValueError, match="never fires"):
+        CronExpression("0 0 31 2 *").next_after(at(1))
+
+
+@pytest.mark.parametrize(
+    "policy, now, expected",
+    [
+        ("skip", at(5, 15, 30), 0),
+        ("once", at(5, 15, 30), 1),
+        ("all", at(5, 15, 30), 5),
+        ("skip", at(5, 15, 0, 30), 1),  # the 15:00 firing is still on time
+        ("all", at(5, 15, 0, 30), 5),
+    ],
+)
+def test_catch_up_after_sleep(policy, now, expected):
+    fired = []
+    clock = [at(5, 10, 30)]
+    scheduler = Scheduler(fired.append, policy=policy, clock=lambda: clock[0])
+    scheduler.add("job", "0 * * * *")
+
+    assert scheduler.run_pending(at(5, 10, 59)) == at(5, 11, 0)
+    assert fired == []
+
+    assert scheduler.run_pending(now) == at(5, 16, 0)
+    assert fired == ["job"] * expected
+    assert scheduler.get("job").last == now
+
+
+def test_schedule_policy_overrides_the_default():
+    fired = []
+    scheduler = Scheduler(fired.append, policy="all", clock=lambda: at(5, 10, 30))
+    scheduler.add("job", "0 * * * *", catchup="skip")
+    scheduler.run_pending(at(5, 15, 30))
+    assert fired == []
+
+    with pytest.raises(ValueError, match="unknown catch-up policy"):
+        scheduler.add("job", "0 * * * *", catchup="never")
@@ -0,0 +1,96 @@
+# tests/test_store.py
+
+import time
+
+from controller.store import ConfigStore
+
+CONFIG = (
+    "# MenuScript config\n"
+    "(setting)[precompile](value)[off]\n"
+    "(name)[a](source)[/a.py](interpreter)[]\n"
+    "(name)[b](source)[/b.py](interpreter)[/usr/bin/python3](timeout)[5s]\n"
+)
+
+
+def make_store(tmp_path, delay=60.0) -> ConfigStore:
+    path = tmp_path / ".config.txt"
+    path.write_text(CONFIG)
+    store = ConfigStore(path, delay=delay)
+    store.load()
+    return store
+
+
+def test_load_indexes_items_settings_and_options(tmp_path):
+    store = make_store(tmp_path)
+    assert store.items() == [("a", "/a.py", ""), ("b", "/b.py", "/usr/bin/python3")]
+    assert store.entries()[0] == (3, "a", "/a.py", "")
+    assert store.settings == {"precompile": "off"}
+    assert store.options("b") == {"timeout": "5s"}
+    assert store.get("missing") is None
+
+
+def test_edits_stay_in_memory_until_flushed(tmp_path):
+    store = make_store(tmp_path)
+    assert store.rename("a", "c")
+    assert store.set_source("b", "/b2.py")
+    assert store.add("d", "/d.py", None)
+    assert not store.add("d", "/d.py", None)
+    assert store.remove("c")
+    assert store.path.read_text() == CONFIG
+
+    assert store.flush()
+    assert store.path.read_text() == (
+        "# MenuScript config\n"
+        "(setting)[precompile](value)[off]\n"
+        "(name)[b](source)[/b2.py](interpreter)[/usr/bin/python3](timeout)[5s]\n"
+        "(name)[d](source)[/d.py](interpreter)[]\n"
+    )
+
+
+def test_edits_are_flushed_once_after_the_delay(tmp_path):
+    store = make_store(tmp_path, delay=0.2)
+    store.set_interpreter("a", "/usr/bin/python3")
+    time.sleep(0.1)
+    store.set_source("a", "/a2.py")  # restarts the delay
+    time.sleep(0.15)
+    assert store.path.read_text() == CONFIG
+
+    deadline = time.monotonic() + 5
+    while store.path.read_text() == CONFIG and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert "(name)[a](source)[/a2.py](interpreter)[/usr/bin/python3]\n" in store.path.read_text()
+
+
+def test_unchanged_values_do_not_dirty_the_store(tmp_path):
+    store = make_store(tmp_path)
+    store.set_source("a", "/a.py")
+    before = store.path.stat().st_mtime_ns
+    assert store.flush()
+    assert store.path.stat().st_mtime_ns == before
+
+
+def test_edits_are_merged_into_a_config_changed_on_disk(tmp_path):
+    store = make_store(tmp_path)
+    other = ConfigStore(store.path)
+    other.load()
+
+    store.rename("a", "renamed")
+    other.add("new", "/new.py", None)
+    other.set_source("b", "/other.py")
+    assert other.flush()
+    assert store.flush()
+
+    store.load()
+    assert store.items() == [
+        ("renamed", "/a.py", ""),
+        ("b", "/other.py", "/usr/bin/python3"),
+        ("new", "/new.py", ""),
+    ]
+
+
+def test_discard_drops_pending_edits(tmp_path):
+    store = make_store(tmp_path)
+    store.remove("a")
+    store.discard()
+    assert store.flush()
+    assert store.path.read_text() == CONFIG
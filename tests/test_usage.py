@@ -0,0 +1,39 @@
+# tests/test_usage.py
+
+import sys
+
+from controller import capture
+from controller.usage import Usage, format_line, max_rss_bytes
+
+# holds 64 MiB and burns some CPU
+SCRIPT = """
+import time
+data = bytearray(64 * 2**20)
+end = time.process_time() + 0.2
+while time.process_time() < end:
+    pass
+"""
+
+
+def test_run_usage_is_measured_for_the_child_only(tmp_path):
+    result = capture.run([sys.executable, "-c", SCRIPT], tmp_path)
+    usage = result.usage
+    assert result.returncode == 0
+    assert usage.max_rss >= 64 * 2**20
+    assert usage.cpu >= 0.15
+    assert usage.wall >= usage.user
+
+    small = capture.run([sys.executable, "-c", "pass"], tmp_path).usage
+    assert small.max_rss < usage.max_rss  # not the peak of an earlier child
+
+
+def test_max_rss_units():
+    assert max_rss_bytes(1024) == (1024 if sys.platform == "darwin" else 1024 * 1024)
+
+
+def test_format_line():
+    usage = Usage(1.2041, 0.83, 0.112, 48562176)
+    assert usage.cpu == 0.83 + 0.112
+    assert format_line('Re"port', False, None, usage) == (
+        'Run usage: name="Re\\"port" ok=0 returncode=None wall=1.204 user=0.830 sys=0.112 maxrss=48562176'
+    )